@@ -14,7 +14,9 @@ backlog = 2048
 
 # Worker processes
 workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
-worker_class = "sync"
+# gthread mantém o heartbeat do worker ativo durante respostas longas (streaming SSE)
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 8))
 worker_connections = 1000
 timeout = 60
 keepalive = 2
@@ -52,7 +54,7 @@ limit_request_fields = 100
 limit_request_field_size = 8190
 
 # Performance tuning
-worker_tmp_dir = '/dev/shm' if os.path.exists('/dev/shm') else None None
+worker_tmp_dir = '/dev/shm' if os.path.exists('/dev/shm') else None
 
 def when_ready(server):
     """Called just after the server is started"""
@@ -21,6 +21,8 @@ from services.attachment_service import attachment_service
 from database import db_manager
 from routes.progress import get_progress_tracker, update_analysis_progress
 from services.auto_save_manager import auto_save_manager, salvar_etapa, salvar_erro
+from services.stream_broker import stream_broker
+from services.cassette import cassette
 
 logger = logging.getLogger(__name__)
 
@@ -56,6 +58,8 @@ def analyze_market():
         
         # Inicia sessão de salvamento automático
         session_id = data['session_id']
+        # Cassete da sessão cobre todo o pipeline da rota (record/replay)
+        cassette_handle = cassette.begin(session_id)
         auto_save_manager.iniciar_sessao(session_id)
         
         # Salva dados de entrada imediatamente
@@ -281,6 +285,12 @@ def analyze_market():
                 'search_status': production_search_manager.get_provider_status()
             }
         }), 500
+    finally:
+        # Encerra o stream SSE da sessão (sucesso ou erro) para liberar os assinantes
+        if 'session_id' in locals():
+            stream_broker.close(session_id)
+        if 'cassette_handle' in locals():
+            cassette.end(cassette_handle)
 
 @analysis_bp.route('/status', methods=['GET'])
 def get_analysis_status():
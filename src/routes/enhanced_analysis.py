@@ -23,6 +23,8 @@ from services.enhanced_ui_manager import enhanced_ui_manager
 from database import db_manager
 from routes.progress import get_progress_tracker, update_analysis_progress
 from services.auto_save_manager import auto_save_manager, salvar_etapa, salvar_erro
+from services.stream_broker import stream_broker
+from services.cassette import cassette
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +59,8 @@ def analyze_ultra_enhanced():
             data['session_id'] = f"archaeological_{int(time.time())}_{os.urandom(4).hex()}"
         
         session_id = data['session_id']
+        # Cassete da sessão cobre todo o pipeline da rota (record/replay)
+        cassette_handle = cassette.begin(session_id)
         auto_save_manager.iniciar_sessao(session_id)
         
         # Salva dados de entrada
@@ -272,6 +276,12 @@ def analyze_ultra_enhanced():
                 'MESTRE DO PRÉ-PITCH INVISÍVEL'
             ]
         }), 500
+    finally:
+        # Encerra o stream SSE da sessão (sucesso ou erro) para liberar os assinantes
+        if 'session_id' in locals():
+            stream_broker.close(session_id)
+        if 'cassette_handle' in locals():
+            cassette.end(cassette_handle)
 
 def _calculate_comprehensive_forensic_metrics(analysis: Dict[str, Any]) -> Dict[str, Any]:
     """Calcula métricas forenses abrangentes"""
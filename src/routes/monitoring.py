@@ -130,3 +130,130 @@ def health_check():
             'error': str(e),
             'timestamp': datetime.now().isoformat()
         }), 500
+
+
+@monitoring_bp.route('/api/search_cache/stats', methods=['GET'])
+def get_search_cache_stats():
+    """Retorna estatísticas do cache de resultados de busca"""
+    try:
+        from services.search_cache import search_cache
+        return jsonify({
+            'success': True,
+            'stats': search_cache.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"❌ Erro ao obter estatísticas do cache de busca: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@monitoring_bp.route('/api/search_cache/purge', methods=['POST'])
+def purge_search_cache():
+    """Limpa o cache de resultados de busca (expired_only=true remove apenas expirados)"""
+    try:
+        from services.search_cache import search_cache
+        data = request.get_json(silent=True) or {}
+        expired_only = str(data.get('expired_only', request.args.get('expired_only', 'false'))).lower() == 'true'
+        removed = search_cache.purge(expired_only=expired_only)
+        return jsonify({
+            'success': True,
+            'removed': removed,
+            'expired_only': expired_only
+        })
+    except Exception as e:
+        logger.error(f"❌ Erro ao limpar cache de busca: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@monitoring_bp.route('/api/page_cache/stats', methods=['GET'])
+def get_page_cache_stats():
+    """Retorna estatísticas do cache de páginas baixadas"""
+    try:
+        from services.page_cache import page_cache
+        return jsonify({
+            'success': True,
+            'stats': page_cache.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"❌ Erro ao obter estatísticas do cache de páginas: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@monitoring_bp.route('/api/page_cache/purge', methods=['POST'])
+def purge_page_cache():
+    """Limpa o cache de páginas baixadas (expired_only=true remove apenas expirados)"""
+    try:
+        from services.page_cache import page_cache
+        data = request.get_json(silent=True) or {}
+        expired_only = str(data.get('expired_only', request.args.get('expired_only', 'false'))).lower() == 'true'
+        removed = page_cache.purge(expired_only=expired_only)
+        return jsonify({
+            'success': True,
+            'removed': removed,
+            'expired_only': expired_only
+        })
+    except Exception as e:
+        logger.error(f"❌ Erro ao limpar cache de páginas: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@monitoring_bp.route('/api/parse_pool/stats', methods=['GET'])
+def get_parse_pool_stats():
+    """Retorna tarefas, timeouts e reciclagens do pool de parsing"""
+    try:
+        from services.parse_pool import parse_pool
+        return jsonify({
+            'success': True,
+            'stats': parse_pool.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"❌ Erro ao obter estatísticas do pool de parsing: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@monitoring_bp.route('/api/rate_limiter/stats', methods=['GET'])
+def get_rate_limiter_stats():
+    """Retorna requisições e esperas por host e por provedor de busca"""
+    try:
+        from services.rate_limiter import rate_limiter
+        return jsonify({
+            'success': True,
+            'stats': rate_limiter.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"❌ Erro ao obter estatísticas do rate limiter: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@monitoring_bp.route('/api/http_fetcher/stats', methods=['GET'])
+def get_http_fetcher_stats():
+    """Retorna downloads, tentativas e cache de DNS do HTTP Fetcher"""
+    try:
+        from services.http_fetcher import http_fetcher
+        return jsonify({
+            'success': True,
+            'stats': http_fetcher.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"❌ Erro ao obter estatísticas do HTTP Fetcher: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
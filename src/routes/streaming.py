@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Streaming Routes
+Endpoint SSE que repassa ao navegador os trechos gerados pelas IAs
+"""
+
+import json
+import logging
+from flask import Blueprint, Response, request, stream_with_context
+from services.stream_broker import stream_broker
+
+logger = logging.getLogger(__name__)
+
+# Cria blueprint
+streaming_bp = Blueprint('streaming', __name__)
+
+@streaming_bp.route('/stream/<session_id>', methods=['GET'])
+def stream_session(session_id):
+    """Transmite via Server-Sent Events os tokens gerados para a sessão"""
+
+    # Permite retomar do último evento recebido (reconexão automática do EventSource);
+    # conexões novas começam após a última execução encerrada da sessão
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id is not None else None
+    except (TypeError, ValueError):
+        last_event_id = None
+
+    def event_stream():
+        logger.info(f"📡 Cliente conectado ao streaming da sessão {session_id}")
+        yield "retry: 2000\n\n"
+        for item in stream_broker.subscribe(session_id, last_event_id=last_event_id):
+            if item['event'] == 'keepalive':
+                yield ": keepalive\n\n"
+                continue
+            payload = json.dumps(item['data'], ensure_ascii=False)
+            yield f"id: {item['id']}\nevent: {item['event']}\ndata: {payload}\n\n"
+
+    return Response(
+        stream_with_context(event_stream()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -19,6 +19,8 @@ from services.attachment_service import attachment_service
 from database import db_manager
 from routes.progress import get_progress_tracker, update_analysis_progress
 from services.auto_save_manager import auto_save_manager, salvar_etapa, salvar_erro
+from services.stream_broker import stream_broker
+from services.cassette import cassette
 
 logger = logging.getLogger(__name__)
 
@@ -56,6 +58,8 @@ def analyze_unified():
             data['session_id'] = f"unified_{int(time.time())}_{os.urandom(4).hex()}"
         
         session_id = data['session_id']
+        # Cassete da sessão cobre todo o pipeline da rota (record/replay)
+        cassette_handle = cassette.begin(session_id)
         auto_save_manager.iniciar_sessao(session_id)
         
         # Salva dados de entrada
@@ -148,6 +152,12 @@ def analyze_unified():
             'analysis_type': locals().get('analysis_type', 'unknown'),
             'capabilities': unified_analysis_engine.get_analysis_capabilities()
         }), 500
+    finally:
+        # Encerra o stream SSE da sessão (sucesso ou erro) para liberar os assinantes
+        if 'session_id' in locals():
+            stream_broker.close(session_id)
+        if 'cassette_handle' in locals():
+            cassette.end(cassette_handle)
 
 @unified_bp.route('/capabilities', methods=['GET'])
 def get_capabilities():
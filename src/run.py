@@ -53,6 +53,7 @@ def create_app():
     from routes.pdf_generator import pdf_bp
     from routes.monitoring import monitoring_bp
     from routes.forensic_analysis import forensic_bp
+    from routes.streaming import streaming_bp
     
     app.register_blueprint(analysis_bp, url_prefix='/api')
     app.register_blueprint(enhanced_analysis_bp, url_prefix='/api')
@@ -63,6 +64,7 @@ def create_app():
     app.register_blueprint(pdf_bp, url_prefix='/api')
     app.register_blueprint(monitoring_bp, url_prefix='/api')
     app.register_blueprint(forensic_bp, url_prefix='/api/forensic')
+    app.register_blueprint(streaming_bp, url_prefix='/api')
     
     @app.route('/')
     def index():
@@ -104,6 +106,7 @@ def create_app():
                     'ai_providers': {
                         'available': len([p for p in ai_status.values() if p['available']]),
                         'total': len(ai_status),
+                        'routing_policy': ai_manager.routing_policy,
                         'providers': ai_status
                     },
                     'search_providers': {
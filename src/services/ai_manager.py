@@ -9,9 +9,29 @@ import os
 import logging
 import time
 import json
-from typing import Dict, List, Optional, Any
+import asyncio
+import weakref
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeoutError
+from datetime import timedelta
+from typing import Dict, List, Optional, Any, Iterator, Tuple, Callable
 import requests
 
+from services.persistent_cache import PersistentCache
+from services.stream_broker import stream_broker
+from services.provider_admission import provider_admission, estimate_tokens, is_rate_limit_error, is_quota_exhausted_error
+from services.prompt_budgeter import prompt_budgeter, is_context_overflow
+from services.circuit_breaker import CircuitBreaker, is_circuit_open_error
+from services.session_context import SessionContext, ContextualPrompt
+from services.single_flight import SingleFlight
+from services.semantic_cache import SemanticCache
+from services.output_budget import output_budget_tuner
+from services.cassette import cassette
+from services.structured_output import (
+    StructuredPrompt, IncrementalJSONParser, with_schema, json_schema_of, parse_structured, schema_instruction
+)
+
 # Imports condicionais para os clientes de IA
 try:
     import google.generativeai as genai
@@ -19,12 +39,30 @@ try:
 except ImportError:
     HAS_GEMINI = False
 
+# Cache de contexto (CachedContent) só existe a partir do google-generativeai 0.7: com a versão
+# fixada em requirements.txt (0.3.2) o import falha e todos os provedores, inclusive o Gemini,
+# recebem o resumo compartilhado da sessão
+try:
+    from google.generativeai import caching as genai_caching
+    HAS_GEMINI_CACHING = True
+except ImportError:
+    HAS_GEMINI_CACHING = False
+
+# response_mime_type (modo JSON) só existe a partir do google-generativeai 0.5
+HAS_GEMINI_JSON_MODE = HAS_GEMINI and 'response_mime_type' in getattr(genai.types.GenerationConfig, '__annotations__', {})
+
 try:
     import openai
     HAS_OPENAI = True
 except ImportError:
     HAS_OPENAI = False
 
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
 try:
     from services.groq_client import groq_client
     HAS_GROQ_CLIENT = True
@@ -33,6 +71,14 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+def _percentile(samples, pct: float) -> Optional[float]:
+    """Percentil (nearest-rank) de uma sequência de amostras"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
 class AIManager:
     """Gerenciador de IAs com sistema de fallback automático"""
 
@@ -82,7 +128,85 @@ class AIManager:
             }
         }
 
+        # Métricas de latência: chamadas diretas ao provedor e latência efetiva vista pelo chamador
+        for provider in self.providers.values():
+            provider['latencies'] = deque(maxlen=200)
+            provider['effective_latencies'] = deque(maxlen=200)
+            provider['hedges_fired'] = 0
+            provider['hedges_won'] = 0
+            provider['ewma_latency'] = None
+            provider['ewma_success'] = 1.0
+            provider['routing_attempts'] = 0
+            provider['ewma_throughput'] = None
+        self._stats_lock = threading.Lock()
+
+        # Roteamento: 'priority' (ordem estática) ou 'latency' (menor tempo esperado de conclusão)
+        self.routing_policy = os.getenv('AI_ROUTING_POLICY', 'priority').lower()
+        self.ewma_alpha = float(os.getenv('AI_ROUTING_EWMA_ALPHA', 0.3))
+        self.quality_floor = float(os.getenv('AI_ROUTING_QUALITY_FLOOR', 0.7))
+        # Falhas entram na latência EWMA com ao menos esta penalidade (segundos, o timeout das chamadas)
+        self.failure_latency_penalty = float(os.getenv('AI_ROUTING_FAILURE_PENALTY', 60))
+        # Tentativas em que um provedor ainda sem medições é priorizado para exploração
+        self.exploration_attempts = int(os.getenv('AI_ROUTING_EXPLORATION_ATTEMPTS', 3))
+        self.provider_quality = {'gemini': 1.0, 'openai': 0.9, 'groq': 0.85, 'huggingface': 0.5}
+
+        # Hedging: dispara o mesmo prompt no próximo provedor se o primário demorar demais
+        self.hedging_enabled = os.getenv('AI_HEDGING_ENABLED', 'false').lower() == 'true'
+        self.hedge_percentile = float(os.getenv('AI_HEDGE_PERCENTILE', 95))
+        self.hedge_min_delay = float(os.getenv('AI_HEDGE_MIN_DELAY', 5))
+        self.hedge_default_delay = float(os.getenv('AI_HEDGE_DEFAULT_DELAY', 30))
+        self.hedge_min_samples = 5
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('AI_HEDGE_WORKERS', 16)),
+            thread_name_prefix='ai_hedge'
+        )
+
+        # Clientes assíncronos (pools de conexão) por event loop
+        self._async_clients = weakref.WeakKeyDictionary()
+        # Event loop dedicado das chamadas em lote (generate_parallel_analysis)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_pid: Optional[int] = None
+        self._loop_lock = threading.Lock()
+
+        # Cache persistente de respostas, compartilhado entre workers do gunicorn
+        self.response_cache = PersistentCache(
+            'llm_responses',
+            ttl=int(os.getenv('LLM_CACHE_TTL', 86400)),
+            max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', 2000)),
+            max_bytes=int(os.getenv('LLM_CACHE_MAX_MB', 200)) * 1024 * 1024,
+            enabled=os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+        )
+
+        # Contextos compartilhados por sessão (prefixo comum a vários agentes);
+        # nomes de cache do Gemini ficam no cache persistente, visíveis a todos os workers
+        self._session_contexts: Dict[str, SessionContext] = {}
+        self._session_lock = threading.Lock()
+        self.context_store = PersistentCache(
+            'session_contexts',
+            ttl=int(os.getenv('SESSION_CONTEXT_TTL', 3600)),
+            enabled=os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+        )
+        # Fatia do contexto enviada a provedores sem cache de prefixo (mesmo porte do bloco de dados dos agentes)
+        self.context_fallback_chars = int(os.getenv('SESSION_CONTEXT_FALLBACK_CHARS', 3000))
+
+        # Chamadas idênticas simultâneas compartilham uma única requisição ao provedor
+        self.single_flight = SingleFlight('llm')
+
+        # Respostas reaproveitadas para prompts quase idênticos (opcional, LLM_SEMANTIC_CACHE_ENABLED)
+        self.semantic_cache = SemanticCache()
+
+        # Saúde dos provedores compartilhada entre workers (circuit breaker em SQLite)
+        self.circuit_breaker = CircuitBreaker('ai', failure_threshold=2, failure_window=120)
+
         self.initialize_providers()
+
+        # Em replay as respostas vêm do cassete: não exige chaves de API e não depende
+        # do estado de saúde gravado em disco por execuções reais
+        if cassette.replaying:
+            self.circuit_breaker.enabled = False
+            for provider in self.providers.values():
+                provider['available'] = True
+
         available_count = len([p for p in self.providers.values() if p['available']])
         logger.info(f"🤖 AI Manager inicializado com {available_count} provedores disponíveis.")
 
@@ -141,47 +265,157 @@ class AIManager:
             logger.info(f"ℹ️ HuggingFace não disponível: {str(e)}")
 
     def get_best_provider(self) -> Optional[str]:
-        """Retorna o melhor provedor disponível com base na prioridade e contagem de erros."""
-        current_time = time.time()
-        
-        # Primeiro, tenta reabilitar provedores que podem ter se recuperado
-        for name, provider in self.providers.items():
-            if (not provider['available'] and 
-                provider.get('last_success') and 
-                current_time - provider['last_success'] > 300):  # 5 minutos
-                logger.info(f"🔄 Tentando reabilitar provedor {name} após cooldown")
-                provider['error_count'] = 0
-                provider['consecutive_failures'] = 0
-                if name == 'gemini' and HAS_GEMINI:
-                    provider['available'] = True
-                elif name == 'groq' and HAS_GROQ_CLIENT:
-                    provider['available'] = True
-                elif name == 'openai' and HAS_OPENAI:
-                    provider['available'] = True
-                elif name == 'huggingface':
-                    provider['available'] = True
-        
+        """Retorna o melhor provedor disponível com base na prioridade e no estado do circuito."""
         available_providers = [
-            (name, provider) for name, provider in self.providers.items() 
-            if provider['available'] and provider['consecutive_failures'] < provider.get('max_errors', 2)
+            (name, provider) for name, provider in self.providers.items()
+            if provider['available'] and self.circuit_breaker.available(name)
         ]
 
         if not available_providers:
-            logger.warning("🔄 Nenhum provedor saudável disponível. Resetando contadores.")
-            for provider in self.providers.values():
-                provider['error_count'] = 0
-                provider['consecutive_failures'] = 0
+            logger.warning("🔄 Todos os circuitos de IA abertos. Considerando provedores configurados.")
             available_providers = [(name, p) for name, p in self.providers.items() if p['available']]
 
         if available_providers:
-            # Ordena por prioridade e falhas consecutivas
-            available_providers.sort(key=lambda x: (x[1]['priority'], x[1]['consecutive_failures']))
+            # Ordena conforme a política de roteamento (prioridade estática ou latência esperada)
+            available_providers.sort(key=lambda x: self._routing_key(x[0], x[1]))
             return available_providers[0][0]
 
         return None
 
-    def generate_analysis(self, prompt: str, max_tokens: int = 8192, provider: Optional[str] = None) -> Optional[str]:
-        """Gera análise usando um provedor específico ou o melhor disponível com fallback."""
+    def set_routing_policy(self, policy: str):
+        """Define a política de roteamento: 'priority' ou 'latency'"""
+        if policy not in ('priority', 'latency'):
+            raise ValueError(f"Política de roteamento inválida: {policy}")
+        self.routing_policy = policy
+        logger.info(f"🧭 Política de roteamento de IA: {policy}")
+
+    def _expected_completion(self, provider: Dict[str, Any]) -> float:
+        """Tempo esperado de conclusão: latência EWMA ajustada pela taxa de sucesso.
+
+        Provedores ainda sem medições recebem 0 para serem explorados, mas só nas
+        primeiras AI_ROUTING_EXPLORATION_ATTEMPTS tentativas; depois disso contam
+        com a penalidade de falha até que alguma chamada seja medida.
+        """
+        if provider['ewma_latency'] is None:
+            if provider['routing_attempts'] < self.exploration_attempts:
+                return 0.0
+            return self.failure_latency_penalty
+        return provider['ewma_latency'] / max(provider['ewma_success'], 0.05)
+
+    def _routing_key(self, name: str, provider: Dict[str, Any]):
+        """Chave de ordenação de provedores segundo a política de roteamento ativa"""
+        if self.routing_policy == 'latency':
+            below_floor = self.provider_quality.get(name, 0.5) < self.quality_floor
+            expected = self._expected_completion(provider) * (1 + provider['consecutive_failures'])
+            return (below_floor, expected, provider['priority'])
+        return (provider['priority'], provider['consecutive_failures'])
+
+    def generate_analysis(
+        self,
+        prompt: str,
+        max_tokens: int = 8192,
+        provider: Optional[str] = None,
+        use_cache: bool = True,
+        hedge: Optional[bool] = None,
+        component: Optional[str] = None
+    ) -> Optional[str]:
+        """Gera análise usando um provedor específico ou o melhor disponível com fallback.
+
+        Pedidos idênticos em andamento (mesmo prompt normalizado, provedor e max_tokens)
+        aguardam a mesma chamada em vez de repeti-la.
+
+        Args:
+            use_cache (bool): Se False, ignora o cache de respostas e força nova chamada.
+            hedge (bool): Força (True) ou desativa (False) o hedging; None usa AI_HEDGING_ENABLED.
+            component (str): Agente/etapa que faz o pedido; limita o cache semântico a esse escopo
+                e identifica as amostras usadas no ajuste automático de max_tokens (ADAPTIVE_MAX_TOKENS).
+        """
+        cached, scope, planned, budget = self._plan_generation(prompt, max_tokens, provider, use_cache, component)
+        if cached is not None:
+            return cached
+
+        result = self._generate_once(prompt, budget, provider, use_cache, hedge)
+
+        truncated = self._budget_truncated(component, result, budget, max_tokens, planned)
+        if truncated:
+            result = self._generate_once(prompt, max_tokens, provider, use_cache, hedge) or result
+        self._finish_generation(prompt, result, scope, component, planned, truncated, use_cache)
+        return result
+
+    def _plan_generation(
+        self,
+        prompt: str,
+        max_tokens: int,
+        provider: Optional[str],
+        use_cache: bool,
+        component: Optional[str]
+    ) -> Tuple[Optional[str], str, Optional[str], int]:
+        """Pré-processamento comum às versões síncrona e assíncrona de generate_analysis.
+
+        Returns:
+            (resposta do cache semântico ou None, escopo semântico, provedor previsto, max_tokens ajustado)
+        """
+        scope = self._semantic_scope(component, provider, max_tokens)
+        if use_cache:
+            cached = self._semantic_lookup(prompt, scope)
+            if cached is not None:
+                return cached, scope, None, max_tokens
+
+        planned = (provider or self.get_best_provider()) if component else provider
+        return None, scope, planned, output_budget_tuner.suggest(component, planned, max_tokens)
+
+    def _budget_truncated(self, component: Optional[str], result: Optional[str], budget: int, max_tokens: int,
+                          planned: Optional[str]) -> bool:
+        """A resposta parou no orçamento ajustado e precisa ser repetida com o max_tokens pedido"""
+        truncated = budget < max_tokens and output_budget_tuner.is_truncated(result, budget, planned)
+        if truncated:
+            logger.warning(f"✂️ Resposta de '{component}' atingiu o orçamento ajustado ({budget} tokens); repetindo com {max_tokens}")
+        return truncated
+
+    def _finish_generation(self, prompt: str, result: Optional[str], scope: str, component: Optional[str],
+                           planned: Optional[str], truncated: bool, use_cache: bool):
+        """Pós-processamento comum: amostra do orçamento de saída e cache semântico"""
+        output_budget_tuner.record(component, planned, result, truncated)
+        if result and use_cache:
+            self.semantic_cache.store(prompt, result, scope)
+
+    def _generate_once(
+        self,
+        prompt: str,
+        max_tokens: int,
+        provider: Optional[str],
+        use_cache: bool,
+        hedge: Optional[bool]
+    ) -> Optional[str]:
+        """Uma geração, compartilhada com pedidos idênticos em andamento (exceto com use_cache=False)"""
+        if not use_cache:
+            return self._generate_analysis(prompt, max_tokens, provider, use_cache, hedge)
+
+        key = SingleFlight.make_key('generate_analysis', prompt, max_tokens, provider)
+        return self.single_flight.do(
+            key, lambda: self._generate_analysis(prompt, max_tokens, provider, use_cache, hedge)
+        )
+
+    @staticmethod
+    def _semantic_scope(component: Optional[str], provider: Optional[str], max_tokens: int) -> str:
+        return f"{component or 'default'}:{provider or '*'}:{max_tokens}"
+
+    def _semantic_lookup(self, prompt: str, scope: str) -> Optional[str]:
+        """Resposta de um prompt quase idêntico do mesmo escopo, se houver"""
+        cached, similarity = self.semantic_cache.lookup(prompt, scope)
+        if cached is not None:
+            logger.info(f"♻️ Resposta servida do cache semântico (similaridade {similarity:.3f}, escopo {scope})")
+        return cached
+
+    def _generate_analysis(
+        self,
+        prompt: str,
+        max_tokens: int,
+        provider: Optional[str],
+        use_cache: bool,
+        hedge: Optional[bool]
+    ) -> Optional[str]:
+        """Implementação de generate_analysis (sem deduplicação)"""
         
         start_time = time.time()
         
@@ -190,9 +424,8 @@ class AIManager:
             if self.providers.get(provider) and self.providers[provider]['available']:
                 logger.info(f"🤖 Usando provedor solicitado: {provider.upper()}")
                 try:
-                    result = self._call_provider(provider, prompt, max_tokens)
+                    result = self._call_provider_cached(provider, prompt, max_tokens, use_cache)
                     if result:
-                        self._record_success(provider)
                         return result
                     else:
                         raise Exception("Resposta vazia")
@@ -209,63 +442,693 @@ class AIManager:
         if not provider_name:
             raise Exception("❌ NENHUM PROVEDOR DE IA DISPONÍVEL: Configure pelo menos uma API de IA (Gemini, Groq, OpenAI ou HuggingFace)")
 
+        if hedge if hedge is not None else self.hedging_enabled:
+            result = self._generate_hedged(provider_name, prompt, max_tokens, use_cache)
+            if result:
+                self._record_effective_latency(provider_name, time.time() - start_time)
+            return result
+
         try:
-            result = self._call_provider(provider_name, prompt, max_tokens)
+            result = self._call_provider_cached(provider_name, prompt, max_tokens, use_cache)
             if result:
-                self._record_success(provider_name)
+                self._record_effective_latency(provider_name, time.time() - start_time)
                 return result
             else:
                 raise Exception("Resposta vazia do provedor")
         except Exception as e:
             logger.error(f"❌ Erro no provedor {provider_name}: {e}")
             self._record_failure(provider_name, str(e))
-            return self._try_fallback(prompt, max_tokens, exclude=[provider_name])
+            result = self._try_fallback(prompt, max_tokens, exclude=[provider_name], use_cache=use_cache)
+            if result:
+                self._record_effective_latency(provider_name, time.time() - start_time)
+            return result
+
+    def _hedge_delay(self, provider_name: str) -> float:
+        """Tempo de espera antes do hedge: percentil configurado da latência recente do provedor"""
+        latencies = list(self.providers[provider_name]['latencies'])
+        if len(latencies) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, _percentile(latencies, self.hedge_percentile))
+
+    def _generate_hedged(self, primary: str, prompt: str, max_tokens: int, use_cache: bool = True) -> Optional[str]:
+        """Chama o primário e, se ele passar do limiar de latência, dispara o próximo provedor saudável.
+
+        A primeira resposta válida vence; a chamada perdedora é cancelada se ainda não começou,
+        ou tem o resultado ignorado (apenas a contabilidade de saúde é registrada).
+        """
+        delay = self._hedge_delay(primary)
+        futures = {self._hedge_executor.submit(cassette.bind(self._call_provider_cached), primary, prompt, max_tokens, use_cache): primary}
+        tried = [primary]
+        hedged = False
+        winner = None
+        result = None
+
+        while futures and not winner:
+            done, _ = wait(list(futures), timeout=None if hedged else delay, return_when=FIRST_COMPLETED)
+
+            if not done:
+                hedged = True
+                candidates = self._healthy_providers(exclude=tried)
+                if candidates:
+                    secondary = candidates[0]
+                    tried.append(secondary)
+                    with self._stats_lock:
+                        self.providers[primary]['hedges_fired'] += 1
+                    logger.info(f"⏱️ {primary.upper()} sem resposta após {delay:.1f}s - hedge com {secondary.upper()}")
+                    futures[self._hedge_executor.submit(cassette.bind(self._call_provider_cached), secondary, prompt, max_tokens, use_cache)] = secondary
+                continue
+
+            for future in done:
+                name = futures.pop(future)
+                try:
+                    content = future.result()
+                    if not content:
+                        raise Exception("Resposta vazia do provedor")
+                    if not winner:
+                        winner, result = name, content
+                except Exception as e:
+                    logger.error(f"❌ Erro no provedor {name} (hedge): {e}")
+                    self._record_failure(name, str(e))
+
+        # Chamadas perdedoras: cancela se possível, senão só registra o desfecho ao terminar
+        for future, name in futures.items():
+            if not future.cancel():
+                future.add_done_callback(lambda f, n=name: self._record_late_outcome(n, f))
+
+        if winner:
+            if winner != primary:
+                with self._stats_lock:
+                    self.providers[primary]['hedges_won'] += 1
+                logger.info(f"🏁 Hedge vencido por {winner.upper()} (primário: {primary.upper()})")
+            return result
+
+        return self._try_fallback(prompt, max_tokens, exclude=tried, use_cache=use_cache)
+
+    def _record_late_outcome(self, provider_name: str, future):
+        """Registra a falha de uma chamada de hedge cujo resultado foi descartado (o sucesso é registrado pela própria chamada)"""
+        try:
+            if not future.result():
+                self._record_failure(provider_name, "Resposta vazia do provedor")
+        except Exception as e:
+            self._record_failure(provider_name, str(e))
+
+    def _record_latency(self, provider_name: str, elapsed: float, output_text: Optional[str] = None):
+        """Registra latência e vazão (tokens/s) de uma chamada real ao provedor"""
+        provider = self.providers[provider_name]
+        provider['latencies'].append(elapsed)
+
+        alpha = self.ewma_alpha
+        with self._stats_lock:
+            self._update_ewma_latency(provider, elapsed)
+
+            if output_text and elapsed > 0:
+                throughput = estimate_tokens(output_text) / elapsed
+                if provider['ewma_throughput'] is None:
+                    provider['ewma_throughput'] = throughput
+                else:
+                    provider['ewma_throughput'] = alpha * throughput + (1 - alpha) * provider['ewma_throughput']
+
+    def _update_ewma_latency(self, provider: Dict[str, Any], elapsed: float):
+        """Atualiza a latência EWMA do provedor (chamar com _stats_lock)"""
+        if provider['ewma_latency'] is None:
+            provider['ewma_latency'] = elapsed
+        else:
+            provider['ewma_latency'] = self.ewma_alpha * elapsed + (1 - self.ewma_alpha) * provider['ewma_latency']
+
+    def _record_failed_latency(self, provider_name: str, elapsed: float, error: Optional[BaseException] = None):
+        """Registra a latência de uma chamada que falhou, com a penalidade mínima de falha.
+
+        Só alimenta o EWMA de roteamento (não os percentis do hedging). Prompts
+        grandes demais para a janela do provedor não penalizam o provedor.
+        """
+        if error is not None and is_context_overflow(str(error)):
+            return
+        with self._stats_lock:
+            self._update_ewma_latency(self.providers[provider_name], max(elapsed, self.failure_latency_penalty))
+
+    def _record_outcome(self, provider_name: str, success: bool):
+        """Atualiza a taxa de sucesso EWMA do provedor"""
+        provider = self.providers[provider_name]
+        with self._stats_lock:
+            provider['ewma_success'] = self.ewma_alpha * (1.0 if success else 0.0) + (1 - self.ewma_alpha) * provider['ewma_success']
+
+    def _record_effective_latency(self, provider_name: str, elapsed: float):
+        """Registra latência ponta a ponta vista pelo chamador (inclui hedge/fallback)"""
+        self.providers[provider_name]['effective_latencies'].append(elapsed)
+
+    def _healthy_providers(self, exclude: Optional[List[str]] = None) -> List[str]:
+        """Provedores saudáveis ordenados por prioridade, excluindo os informados"""
+        exclude = exclude or []
+        available_providers = [
+            (name, provider) for name, provider in self.providers.items()
+            if (provider['available'] and
+                name not in exclude and
+                self.circuit_breaker.available(name))
+        ]
+        available_providers.sort(key=lambda x: self._routing_key(x[0], x[1]))
+        return [name for name, _ in available_providers]
     
-    def generate_parallel_analysis(self, prompts: List[Dict[str, Any]], max_tokens: int = 8192) -> Dict[str, Any]:
-        """Gera múltiplas análises em paralelo usando diferentes provedores"""
-        
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        
-        results = {}
-        
-        with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
-            future_to_prompt = {}
-            
-            for prompt_data in prompts:
-                prompt_id = prompt_data['id']
-                prompt_text = prompt_data['prompt']
-                preferred_provider = prompt_data.get('provider')
-                
-                future = executor.submit(
-                    self.generate_analysis, 
-                    prompt_text, 
-                    max_tokens, 
-                    preferred_provider
-                )
-                future_to_prompt[future] = prompt_id
-            
-            # Coleta resultados
-            for future in as_completed(future_to_prompt, timeout=600):
-                prompt_id = future_to_prompt[future]
+    def generate_analysis_stream(
+        self,
+        prompt: str,
+        max_tokens: int = 8192,
+        provider: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Iterator[str]:
+        """Gera análise em streaming, emitindo trechos de texto à medida que chegam.
+
+        O fallback para o próximo provedor só acontece se a falha ocorrer antes do
+        primeiro trecho; depois disso o texto parcial já foi entregue e o erro é propagado.
+        """
+        if provider:
+            if not (self.providers.get(provider) and self.providers[provider]['available']):
+                logger.error(f"❌ Provedor solicitado '{provider}' não está disponível.")
+                return
+            candidates = [provider]
+        else:
+            best = self.get_best_provider()
+            if not best:
+                raise Exception("❌ NENHUM PROVEDOR DE IA DISPONÍVEL: Configure pelo menos uma API de IA (Gemini, Groq, OpenAI ou HuggingFace)")
+            candidates = [best] + self._healthy_providers(exclude=[best])
+
+        for provider_name in candidates:
+            cache_key = self._cache_key(provider_name, prompt, max_tokens)
+            if use_cache and self.response_cache.enabled:
+                cached = self.response_cache.get(cache_key, label=provider_name)
+                if cached:
+                    logger.info(f"♻️ Resposta de {provider_name} servida do cache ({len(cached)} caracteres)")
+                    yield cached
+                    return
+
+            chunks = []
+            try:
+                logger.info(f"📡 Streaming com {provider_name.upper()}")
+                self.providers[provider_name]['routing_attempts'] += 1
+                self.circuit_breaker.check(provider_name)
+                with provider_admission.admit(provider_name, estimate_tokens(prompt)) as admission:
+                    call_start = time.time()
+                    try:
+                        for chunk in self._stream_provider(provider_name, prompt, max_tokens):
+                            chunks.append(chunk)
+                            yield chunk
+                    except Exception as e:
+                        self._record_failed_latency(provider_name, time.time() - call_start, e)
+                        raise
+                    admission['output_tokens'] = sum(estimate_tokens(c) for c in chunks)
+
+                result = ''.join(chunks)
+                if not result:
+                    self._record_failed_latency(provider_name, time.time() - call_start)
+                    raise Exception("Resposta vazia do provedor")
+
+                self._record_latency(provider_name, time.time() - call_start, result)
+                self._record_success(provider_name)
+                if use_cache:
+                    self.response_cache.set(cache_key, result, label=provider_name)
+                return
+
+            except Exception as e:
+                logger.error(f"❌ Erro no streaming com {provider_name}: {e}")
+                self._record_failure(provider_name, str(e))
+                if chunks:
+                    raise
+
+        logger.critical("❌ Todos os provedores falharam no streaming.")
+
+    def stream_analysis_to_session(
+        self,
+        prompt: str,
+        session_id: Optional[str],
+        component: str,
+        max_tokens: int = 8192,
+        provider: Optional[str] = None,
+        use_cache: bool = True,
+        on_section: Optional[Callable[[Any, Any], None]] = None
+    ) -> Optional[str]:
+        """Gera análise transmitindo os trechos para a sessão (SSE) e retorna o texto completo.
+
+        Sem session_id, equivale a generate_analysis.
+
+        Args:
+            on_section: Para respostas em JSON, chamado com (chave, valor) de cada seção de
+                primeiro nível assim que ela se fecha, enquanto o restante ainda é gerado;
+                a seção também é publicada na sessão como evento 'section'.
+        """
+        if not session_id or not stream_broker.enabled:
+            result = self.generate_analysis(prompt, max_tokens, provider, use_cache, component=component)
+            if result and on_section:
+                self._section_feeder(None, component, on_section)(result)
+            return result
+
+        stream_broker.publish(session_id, 'start', {'component': component})
+
+        scope = self._semantic_scope(component, provider, max_tokens)
+        cached = self._semantic_lookup(prompt, scope) if use_cache else None
+        if cached is not None:
+            stream_broker.publish(session_id, 'chunk', {'component': component, 'text': cached})
+            if on_section:
+                self._section_feeder(session_id, component, on_section)(cached)
+            stream_broker.publish(session_id, 'end', {'component': component, 'chars': len(cached)})
+            return cached
+
+        planned = provider or self.get_best_provider()
+        budget = output_budget_tuner.suggest(component, planned, max_tokens)
+        result = self._stream_to_session(prompt, session_id, component, budget, provider, use_cache, on_section)
+
+        truncated = budget < max_tokens and output_budget_tuner.is_truncated(result, budget, planned)
+        if truncated:
+            logger.warning(f"✂️ Resposta de '{component}' atingiu o orçamento ajustado ({budget} tokens); repetindo com {max_tokens}")
+            # Novo 'start' faz o cliente descartar o texto parcial do componente
+            stream_broker.publish(session_id, 'start', {'component': component, 'retry': True})
+            result = self._stream_to_session(prompt, session_id, component, max_tokens, provider, use_cache, on_section) or result
+        output_budget_tuner.record(component, planned, result, truncated)
+
+        stream_broker.publish(session_id, 'end', {'component': component, 'chars': len(result or '')})
+        if result and use_cache:
+            self.semantic_cache.store(prompt, result, scope)
+        return result or None
+
+    def _stream_to_session(
+        self,
+        prompt: str,
+        session_id: str,
+        component: str,
+        max_tokens: int,
+        provider: Optional[str],
+        use_cache: bool,
+        on_section: Optional[Callable[[Any, Any], None]] = None
+    ) -> str:
+        """Transmite uma geração para a sessão em trechos agrupados e retorna o texto completo"""
+        feed_sections = self._section_feeder(session_id, component, on_section) if on_section else None
+        parts = []
+        buffer = []
+        buffered_chars = 0
+        last_flush = time.time()
+
+        def flush():
+            if buffer:
+                stream_broker.publish(session_id, 'chunk', {'component': component, 'text': ''.join(buffer)})
+                buffer.clear()
+
+        try:
+            for chunk in self.generate_analysis_stream(prompt, max_tokens, provider, use_cache):
+                parts.append(chunk)
+                buffer.append(chunk)
+                buffered_chars += len(chunk)
+                if feed_sections:
+                    feed_sections(chunk)
+
+                # Agrupa tokens pequenos para não gerar um evento por token
+                if buffered_chars >= 256 or time.time() - last_flush >= 0.1:
+                    flush()
+                    buffered_chars = 0
+                    last_flush = time.time()
+            flush()
+
+        except Exception as e:
+            flush()
+            stream_broker.publish(session_id, 'error', {'component': component, 'error': str(e)})
+            raise
+
+        return ''.join(parts)
+
+    def _section_feeder(
+        self,
+        session_id: Optional[str],
+        component: str,
+        on_section: Callable[[Any, Any], None]
+    ) -> Callable[[str], None]:
+        """Função que consome trechos da resposta e notifica cada seção JSON concluída"""
+        parser = IncrementalJSONParser()
+
+        def feed(chunk: str):
+            for key, value in parser.feed(chunk):
+                if session_id:
+                    stream_broker.publish(session_id, 'section', {'component': component, 'key': key, 'value': value})
                 try:
-                    result = future.result()
-                    results[prompt_id] = {
-                        'success': bool(result),
-                        'content': result,
-                        'error': None
-                    }
+                    on_section(key, value)
                 except Exception as e:
-                    results[prompt_id] = {
-                        'success': False,
-                        'content': None,
-                        'error': str(e)
-                    }
-        
-        return results
+                    logger.warning(f"⚠️ Falha ao processar a seção '{key}' de {component}: {e}")
+
+        return feed
+
+    def generate_structured(
+        self,
+        prompt: str,
+        schema: Dict[str, Any],
+        max_tokens: int = 8192,
+        provider: Optional[str] = None,
+        use_cache: bool = True,
+        component: Optional[str] = None,
+        session_id: Optional[str] = None,
+        max_repairs: Optional[int] = None
+    ) -> Optional[Any]:
+        """Gera uma resposta JSON que segue o JSON Schema informado.
+
+        Usa o modo JSON nativo do provedor quando existe (Gemini, OpenAI, Groq). A
+        resposta é extraída e reparada localmente (cercas markdown, texto em volta,
+        vírgulas sobrando, corte por max_tokens) antes da validação; só se continuar
+        inválida o modelo é chamado de novo para corrigi-la, até max_repairs vezes
+        (STRUCTURED_OUTPUT_MAX_REPAIRS, padrão 1).
+
+        Args:
+            session_id (str): Se informado, transmite a geração para a sessão (SSE).
+
+        Returns:
+            O valor JSON validado, ou None se a IA não respondeu ou não produziu JSON válido.
+        """
+        if max_repairs is None:
+            max_repairs = int(os.getenv('STRUCTURED_OUTPUT_MAX_REPAIRS', 1))
+
+        structured = with_schema(prompt, schema)
+        if session_id:
+            text = self.stream_analysis_to_session(structured, session_id, component or 'structured', max_tokens, provider, use_cache)
+        else:
+            text = self.generate_analysis(structured, max_tokens, provider, use_cache, component=component)
+
+        for attempt in range(max_repairs + 1):
+            if not text:
+                return None
+            value, errors = parse_structured(text, schema)
+            if not errors:
+                return value
+            if attempt == max_repairs:
+                break
+
+            logger.warning(f"⚠️ JSON inválido de '{component or 'structured'}' ({len(errors)} erros); pedindo correção à IA")
+            repair_prompt = StructuredPrompt(
+                "Corrija o JSON abaixo para que seja válido e siga o schema. "
+                "Mantenha o conteúdo, complete o que faltar e não acrescente explicações.\n\n"
+                "ERROS ENCONTRADOS:\n" + "\n".join(f"- {e}" for e in errors[:20]) +
+                f"\n\nJSON A CORRIGIR:\n{text}\n\n" + schema_instruction(schema),
+                schema
+            )
+            text = self.generate_analysis(repair_prompt, max_tokens, provider, use_cache, component=f"{component or 'structured'}_repair")
+
+        logger.error(f"❌ '{component or 'structured'}' não produziu JSON válido: {errors[:5]}")
+        return None
+
+    def generate_parallel_analysis(self, prompts: List[Dict[str, Any]], max_tokens: int = 8192,
+                                   component: Optional[str] = None, timeout: float = 600) -> Dict[str, Any]:
+        """Gera múltiplas análises em paralelo usando diferentes provedores.
+
+        As chamadas rodam como corrotinas (agenerate_parallel) no event loop dedicado
+        do AIManager, sem uma thread por prompt.
+
+        Args:
+            prompts (list): Itens {'id', 'prompt', 'provider' (opcional)}.
+            component (str): Agente/etapa (cache semântico e ajuste de max_tokens).
+            timeout (float): Tempo máximo para o lote inteiro, em segundos.
+        """
+        if not prompts:
+            return {}
+
+        future = asyncio.run_coroutine_threadsafe(
+            cassette.bind_async(self.agenerate_parallel(prompts, max_tokens, component)), self._ensure_loop()
+        )
+        try:
+            return future.result(timeout=timeout)
+        except FuturesTimeoutError:
+            future.cancel()
+            raise
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop dedicado; recriado após fork (gunicorn preload_app)"""
+        with self._loop_lock:
+            if self._loop is None or self._loop_pid != os.getpid():
+                self._loop_pid = os.getpid()
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='ai-manager-loop', daemon=True).start()
+            return self._loop
     
+    async def agenerate_analysis(
+        self,
+        prompt: str,
+        max_tokens: int = 8192,
+        provider: Optional[str] = None,
+        use_cache: bool = True,
+        hedge: Optional[bool] = None,
+        component: Optional[str] = None
+    ) -> Optional[str]:
+        """Versão assíncrona de generate_analysis, com o mesmo cache semântico, deduplicação,
+        ajuste de max_tokens, hedging e fallback.
+
+        Não ocupa uma thread por chamada: as requisições usam clientes assíncronos com
+        conexões reaproveitadas por event loop; o acesso ao SQLite (caches, circuito)
+        roda fora do event loop.
+        """
+        cached, scope, planned, budget = await asyncio.to_thread(
+            self._plan_generation, prompt, max_tokens, provider, use_cache, component
+        )
+        if cached is not None:
+            return cached
+
+        result = await self._agenerate_once(prompt, budget, provider, use_cache, hedge)
+
+        truncated = self._budget_truncated(component, result, budget, max_tokens, planned)
+        if truncated:
+            result = await self._agenerate_once(prompt, max_tokens, provider, use_cache, hedge) or result
+        await asyncio.to_thread(self._finish_generation, prompt, result, scope, component, planned, truncated, use_cache)
+        return result
+
+    async def _agenerate_once(
+        self,
+        prompt: str,
+        max_tokens: int,
+        provider: Optional[str],
+        use_cache: bool,
+        hedge: Optional[bool]
+    ) -> Optional[str]:
+        """Versão assíncrona de _generate_once (deduplica também contra chamadas síncronas)"""
+        if not use_cache:
+            return await self._agenerate_analysis(prompt, max_tokens, provider, use_cache, hedge)
+
+        key = SingleFlight.make_key('generate_analysis', prompt, max_tokens, provider)
+        return await self.single_flight.ado(
+            key, lambda: self._agenerate_analysis(prompt, max_tokens, provider, use_cache, hedge)
+        )
+
+    async def _agenerate_analysis(
+        self,
+        prompt: str,
+        max_tokens: int,
+        provider: Optional[str],
+        use_cache: bool,
+        hedge: Optional[bool]
+    ) -> Optional[str]:
+        """Versão assíncrona de _generate_analysis"""
+        start_time = time.time()
+
+        if provider:
+            if not (self.providers.get(provider) and self.providers[provider]['available']):
+                logger.error(f"❌ Provedor solicitado '{provider}' não está disponível.")
+                return None
+            logger.info(f"🤖 Usando provedor solicitado: {provider.upper()}")
+            try:
+                result = await self._acall_provider_cached(provider, prompt, max_tokens, use_cache)
+                if not result:
+                    raise Exception("Resposta vazia")
+                return result
+            except Exception as e:
+                logger.error(f"❌ Provedor solicitado {provider.upper()} falhou: {e}")
+                await asyncio.to_thread(self._record_failure, provider, str(e))
+                return None
+
+        provider_name = await asyncio.to_thread(self.get_best_provider)
+        if not provider_name:
+            raise Exception("❌ NENHUM PROVEDOR DE IA DISPONÍVEL: Configure pelo menos uma API de IA (Gemini, Groq, OpenAI ou HuggingFace)")
+
+        if hedge if hedge is not None else self.hedging_enabled:
+            result = await self._agenerate_hedged(provider_name, prompt, max_tokens, use_cache)
+            if result:
+                self._record_effective_latency(provider_name, time.time() - start_time)
+            return result
+
+        try:
+            result = await self._acall_provider_cached(provider_name, prompt, max_tokens, use_cache)
+            if not result:
+                raise Exception("Resposta vazia do provedor")
+            self._record_effective_latency(provider_name, time.time() - start_time)
+            return result
+        except Exception as e:
+            logger.error(f"❌ Erro no provedor {provider_name}: {e}")
+            await asyncio.to_thread(self._record_failure, provider_name, str(e))
+
+        result = await self._atry_fallback(prompt, max_tokens, exclude=[provider_name], use_cache=use_cache)
+        if result:
+            self._record_effective_latency(provider_name, time.time() - start_time)
+        return result
+
+    async def _agenerate_hedged(self, primary: str, prompt: str, max_tokens: int, use_cache: bool = True) -> Optional[str]:
+        """Versão assíncrona de _generate_hedged.
+
+        A chamada perdedora não é cancelada (já pode ter reservado o teste do
+        circuito meio-aberto): termina em segundo plano e só tem o desfecho registrado.
+        """
+        delay = self._hedge_delay(primary)
+        tasks = {asyncio.ensure_future(self._acall_provider_cached(primary, prompt, max_tokens, use_cache)): primary}
+        tried = [primary]
+        hedged = False
+        winner = None
+        result = None
+
+        while tasks and not winner:
+            done, _ = await asyncio.wait(list(tasks), timeout=None if hedged else delay, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                hedged = True
+                candidates = await asyncio.to_thread(self._healthy_providers, tried)
+                if candidates:
+                    secondary = candidates[0]
+                    tried.append(secondary)
+                    with self._stats_lock:
+                        self.providers[primary]['hedges_fired'] += 1
+                    logger.info(f"⏱️ {primary.upper()} sem resposta após {delay:.1f}s - hedge com {secondary.upper()}")
+                    tasks[asyncio.ensure_future(self._acall_provider_cached(secondary, prompt, max_tokens, use_cache))] = secondary
+                continue
+
+            for task in done:
+                name = tasks.pop(task)
+                try:
+                    content = task.result()
+                    if not content:
+                        raise Exception("Resposta vazia do provedor")
+                    if not winner:
+                        winner, result = name, content
+                except Exception as e:
+                    logger.error(f"❌ Erro no provedor {name} (hedge): {e}")
+                    await asyncio.to_thread(self._record_failure, name, str(e))
+
+        for task, name in tasks.items():
+            task.add_done_callback(lambda t, n=name: asyncio.ensure_future(asyncio.to_thread(self._record_late_outcome, n, t)))
+
+        if winner:
+            if winner != primary:
+                with self._stats_lock:
+                    self.providers[primary]['hedges_won'] += 1
+                logger.info(f"🏁 Hedge vencido por {winner.upper()} (primário: {primary.upper()})")
+            return result
+
+        return await self._atry_fallback(prompt, max_tokens, exclude=tried, use_cache=use_cache)
+
+    async def _atry_fallback(self, prompt: str, max_tokens: int, exclude: List[str], use_cache: bool = True) -> Optional[str]:
+        """Versão assíncrona de _try_fallback"""
+        logger.info(f"🔄 Acionando fallback, excluindo: {', '.join(exclude)}")
+        for next_provider in await asyncio.to_thread(self._healthy_providers, exclude):
+            logger.info(f"🔄 Tentando fallback para: {next_provider.upper()}")
+            try:
+                result = await self._acall_provider_cached(next_provider, prompt, max_tokens, use_cache)
+                if result:
+                    return result
+                raise Exception("Resposta vazia do fallback")
+            except Exception as e:
+                logger.error(f"❌ Fallback para {next_provider} também falhou: {e}")
+                await asyncio.to_thread(self._record_failure, next_provider, str(e))
+
+        logger.critical("❌ Todos os provedores de fallback falharam.")
+        return None
+
+    async def agenerate_parallel(self, prompts: List[Dict[str, Any]], max_tokens: int = 8192,
+                                 component: Optional[str] = None) -> Dict[str, Any]:
+        """Versão assíncrona de generate_parallel_analysis (mesmo formato de resultado)"""
+
+        async def run(prompt_data: Dict[str, Any]):
+            try:
+                result = await self.agenerate_analysis(
+                    prompt_data['prompt'], max_tokens, prompt_data.get('provider'), component=component
+                )
+                return prompt_data['id'], {'success': bool(result), 'content': result, 'error': None}
+            except Exception as e:
+                return prompt_data['id'], {'success': False, 'content': None, 'error': str(e)}
+
+        # A concorrência efetiva é limitada pela fila de admissão de cada provedor
+        pairs = await asyncio.gather(*(run(prompt_data) for prompt_data in prompts))
+        return dict(pairs)
+
+    async def _acall_provider_cached(self, provider_name: str, prompt: str, max_tokens: int, use_cache: bool = True) -> Optional[str]:
+        """Versão assíncrona de _call_provider_cached (SQLite fora do event loop)."""
+        if not use_cache or not self.response_cache.enabled:
+            return await self._atimed_call(provider_name, prompt, max_tokens)
+
+        cache_key = self._cache_key(provider_name, prompt, max_tokens)
+        cached = await asyncio.to_thread(self.response_cache.get, cache_key, label=provider_name)
+        if cached:
+            logger.info(f"♻️ Resposta de {provider_name} servida do cache ({len(cached)} caracteres)")
+            return cached
+
+        result = await self._atimed_call(provider_name, prompt, max_tokens)
+        if result:
+            await asyncio.to_thread(self.response_cache.set, cache_key, result, label=provider_name)
+        return result
+
+    async def _atimed_call(self, provider_name: str, prompt: str, max_tokens: int) -> Optional[str]:
+        """Versão assíncrona de _timed_call."""
+        self.providers[provider_name]['routing_attempts'] += 1
+        await asyncio.to_thread(self.circuit_breaker.check, provider_name)
+        async with provider_admission.aadmit(provider_name, estimate_tokens(prompt)) as admission:
+            call_start = time.time()
+            try:
+                result = await self._acall_provider(provider_name, prompt, max_tokens)
+            except Exception as e:
+                self._record_failed_latency(provider_name, time.time() - call_start, e)
+                raise
+            admission['output_tokens'] = estimate_tokens(result)
+        if result:
+            self._record_latency(provider_name, time.time() - call_start, result)
+            await asyncio.to_thread(self._record_success, provider_name)
+        else:
+            self._record_failed_latency(provider_name, time.time() - call_start)
+        return result
+
+    def _async_client(self, kind: str):
+        """Retorna o cliente assíncrono do event loop atual, criando-o na primeira chamada."""
+        loop = asyncio.get_running_loop()
+        clients = self._async_clients.setdefault(loop, {})
+        if kind not in clients:
+            if kind == 'openai':
+                clients[kind] = openai.AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+            elif kind == 'http':
+                clients[kind] = httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+                    timeout=60
+                )
+        return clients[kind]
+
+    async def _acall_provider(self, provider_name: str, prompt: str, max_tokens: int) -> Optional[str]:
+        """Chama a função assíncrona de geração do provedor especificado (gravada/reproduzida pelo cassete)."""
+        return await cassette.aintercept(
+            'llm', {'prompt': prompt, 'max_tokens': max_tokens},
+            lambda: self._ainvoke_provider(provider_name, prompt, max_tokens)
+        )
+
+    async def _ainvoke_provider(self, provider_name: str, prompt: str, max_tokens: int) -> Optional[str]:
+        """Chamada assíncrona real ao provedor."""
+        json_mode = json_schema_of(prompt) is not None
+        if isinstance(prompt, ContextualPrompt):
+            prompt, gemini_model = await asyncio.to_thread(self._resolve_contextual_prompt, provider_name, prompt)
+        else:
+            gemini_model = None
+        max_tokens = prompt_budgeter.fit_max_tokens(provider_name, prompt, max_tokens)
+        if provider_name == 'gemini':
+            return await self._agenerate_with_gemini(prompt, max_tokens, gemini_model, json_mode)
+        elif provider_name == 'groq':
+            content = await self.providers['groq']['client'].agenerate(prompt, max_tokens=min(max_tokens, 8192), json_mode=json_mode)
+            if content:
+                return content
+            raise Exception("Resposta vazia do Groq")
+        elif provider_name == 'openai':
+            return await self._agenerate_with_openai(prompt, max_tokens, json_mode)
+        elif provider_name == 'huggingface':
+            if not HAS_HTTPX:
+                return await asyncio.to_thread(self._generate_with_huggingface, prompt, max_tokens)
+            return await self._agenerate_with_huggingface(prompt, max_tokens)
+        return None
+
     def _record_success(self, provider_name: str):
         """Registra sucesso do provedor"""
         if provider_name in self.providers:
+            self._record_outcome(provider_name, True)
+            self.circuit_breaker.record_success(provider_name)
             self.providers[provider_name]['consecutive_failures'] = 0
             self.providers[provider_name]['last_success'] = time.time()
             logger.info(f"✅ Sucesso registrado para {provider_name}")
@@ -273,57 +1136,205 @@ class AIManager:
     def _record_failure(self, provider_name: str, error_msg: str):
         """Registra falha do provedor"""
         if provider_name in self.providers:
+            # Prompt grande demais para a janela do provedor não indica falha do provedor
+            if is_context_overflow(error_msg):
+                logger.warning(f"⚠️ {provider_name} ignorado para este prompt: {error_msg}")
+                self.circuit_breaker.release(provider_name)
+                return
+
+            # Chamada evitada pelo circuito aberto: a falha já foi contabilizada
+            if is_circuit_open_error(error_msg):
+                logger.info(f"⏭️ {error_msg}")
+                self.circuit_breaker.release(provider_name)
+                return
+
+            self._record_outcome(provider_name, False)
             self.providers[provider_name]['error_count'] += 1
+
+            # Limite de taxa é tratado pelo controle de admissão (AIMD), não desabilita o provedor
+            if is_rate_limit_error(error_msg):
+                logger.warning(f"⚠️ Limite de taxa em {provider_name}: {error_msg}")
+                self.circuit_breaker.release(provider_name)
+                return
+
             self.providers[provider_name]['consecutive_failures'] += 1
-            
-            # Desabilita temporariamente se muitas falhas consecutivas
-            if self.providers[provider_name]['consecutive_failures'] >= self.providers[provider_name]['max_errors']:
-                logger.warning(f"⚠️ Desabilitando {provider_name} temporariamente após {self.providers[provider_name]['consecutive_failures']} falhas consecutivas")
-                self.providers[provider_name]['available'] = False
+
+            # Falhas contam para o circuito compartilhado: ao abrir, todos os workers deixam de usar o provedor.
+            # Cota ou crédito esgotado não se resolve em segundos: abre o circuito na hora.
+            threshold = 1 if is_quota_exhausted_error(error_msg) else self.providers[provider_name]['max_errors']
+            self.circuit_breaker.record_failure(provider_name, threshold=threshold)
             
             logger.error(f"❌ Falha registrada para {provider_name}: {error_msg}")
 
+    def _cache_key(self, provider_name: str, prompt: str, max_tokens: int) -> str:
+        """Chave do cache de respostas: hash de (provedor, modelo, prompt, max_tokens)"""
+        provider = self.providers[provider_name]
+        model = provider.get('model') or ','.join(provider.get('models', []))
+        return PersistentCache.make_key(provider_name, model, prompt, max_tokens)
+
+    def _call_provider_cached(self, provider_name: str, prompt: str, max_tokens: int, use_cache: bool = True) -> Optional[str]:
+        """Chama o provedor consultando antes o cache persistente de respostas."""
+        if not use_cache or not self.response_cache.enabled:
+            return self._timed_call(provider_name, prompt, max_tokens)
+
+        cache_key = self._cache_key(provider_name, prompt, max_tokens)
+        cached = self.response_cache.get(cache_key, label=provider_name)
+        if cached:
+            logger.info(f"♻️ Resposta de {provider_name} servida do cache ({len(cached)} caracteres)")
+            return cached
+
+        result = self._timed_call(provider_name, prompt, max_tokens)
+        if result:
+            self.response_cache.set(cache_key, result, label=provider_name)
+        return result
+
+    def _timed_call(self, provider_name: str, prompt: str, max_tokens: int) -> Optional[str]:
+        """Chama o provedor (via fila de admissão) registrando a latência da chamada.
+
+        Falhas e respostas vazias também entram no EWMA de roteamento, com a
+        penalidade de falha, para que um provedor que só falha não fique à frente.
+        O sucesso (que fecha o circuito) é registrado aqui, só para chamadas reais:
+        respostas servidas do cache não dizem nada sobre a saúde do provedor.
+        """
+        self.providers[provider_name]['routing_attempts'] += 1
+        self.circuit_breaker.check(provider_name)
+        with provider_admission.admit(provider_name, estimate_tokens(prompt)) as admission:
+            call_start = time.time()
+            try:
+                result = self._call_provider(provider_name, prompt, max_tokens)
+            except Exception as e:
+                self._record_failed_latency(provider_name, time.time() - call_start, e)
+                raise
+            admission['output_tokens'] = estimate_tokens(result)
+        if result:
+            self._record_latency(provider_name, time.time() - call_start, result)
+            self._record_success(provider_name)
+        else:
+            self._record_failed_latency(provider_name, time.time() - call_start)
+        return result
+
     def _call_provider(self, provider_name: str, prompt: str, max_tokens: int) -> Optional[str]:
-        """Chama a função de geração do provedor especificado."""
+        """Chama a função de geração do provedor especificado (gravada/reproduzida pelo cassete)."""
+        return cassette.intercept(
+            'llm', {'prompt': prompt, 'max_tokens': max_tokens},
+            lambda: self._invoke_provider(provider_name, prompt, max_tokens)
+        )
+
+    def _invoke_provider(self, provider_name: str, prompt: str, max_tokens: int) -> Optional[str]:
+        """Chamada real ao provedor."""
+        json_mode = json_schema_of(prompt) is not None
+        prompt, gemini_model = self._resolve_contextual_prompt(provider_name, prompt)
+        max_tokens = prompt_budgeter.fit_max_tokens(provider_name, prompt, max_tokens)
         if provider_name == 'gemini':
-            return self._generate_with_gemini(prompt, max_tokens)
+            return self._generate_with_gemini(prompt, max_tokens, gemini_model, json_mode)
         elif provider_name == 'groq':
-            return self._generate_with_groq(prompt, max_tokens)
+            return self._generate_with_groq(prompt, max_tokens, json_mode)
         elif provider_name == 'openai':
-            return self._generate_with_openai(prompt, max_tokens)
+            return self._generate_with_openai(prompt, max_tokens, json_mode)
         elif provider_name == 'huggingface':
             return self._generate_with_huggingface(prompt, max_tokens)
         return None
 
-    def _generate_with_gemini(self, prompt: str, max_tokens: int) -> Optional[str]:
-        """Gera conteúdo usando Gemini."""
-        client = self.providers['gemini']['client']
+    def _stream_provider(self, provider_name: str, prompt: str, max_tokens: int) -> Iterator[str]:
+        """Transmite trechos de texto do provedor especificado (gravados/reproduzidos pelo cassete)."""
+        if not cassette.active:
+            yield from self._stream_live(provider_name, prompt, max_tokens)
+            return
+
+        key_parts = {'prompt': prompt, 'max_tokens': max_tokens}
+        if cassette.replaying:
+            yield cassette.replay('llm', key_parts)
+            return
+
+        chunks = []
+        start = time.time()
+        for chunk in self._stream_live(provider_name, prompt, max_tokens):
+            chunks.append(chunk)
+            yield chunk
+        cassette.record('llm', key_parts, ''.join(chunks), time.time() - start)
+
+    def _stream_live(self, provider_name: str, prompt: str, max_tokens: int) -> Iterator[str]:
+        """Streaming real do provedor."""
+        json_mode = json_schema_of(prompt) is not None
+        prompt, gemini_model = self._resolve_contextual_prompt(provider_name, prompt)
+        max_tokens = prompt_budgeter.fit_max_tokens(provider_name, prompt, max_tokens)
+        if provider_name == 'gemini':
+            yield from self._stream_with_gemini(prompt, max_tokens, gemini_model, json_mode)
+        elif provider_name == 'groq':
+            yield from self.providers['groq']['client'].generate_stream(prompt, max_tokens=min(max_tokens, 8192), json_mode=json_mode)
+        elif provider_name == 'openai':
+            yield from self._stream_with_openai(prompt, max_tokens, json_mode)
+        else:
+            # Provedores sem streaming entregam a resposta completa em um único trecho
+            result = self._invoke_provider(provider_name, prompt, max_tokens)
+            if result:
+                yield result
+
+    def _gemini_params(self, max_tokens: int, json_mode: bool = False):
+        """Retorna configuração de geração e de segurança do Gemini."""
         config = {
             "temperature": 0.8,  # Criatividade controlada
             "max_output_tokens": min(max_tokens, 8192),
             "top_p": 0.95,
             "top_k": 64
         }
+        if json_mode and HAS_GEMINI_JSON_MODE:
+            config["response_mime_type"] = "application/json"
         safety = [
             {"category": c, "threshold": "BLOCK_NONE"} 
             for c in ["HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH", "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT"]
         ]
+        return config, safety
+
+    def _generate_with_gemini(self, prompt: str, max_tokens: int, model: Any = None, json_mode: bool = False) -> Optional[str]:
+        """Gera conteúdo usando Gemini (model: cliente ligado a um contexto em cache, se houver)."""
+        client = model or self.providers['gemini']['client']
+        config, safety = self._gemini_params(max_tokens, json_mode)
         response = client.generate_content(prompt, generation_config=config, safety_settings=safety)
         if response.text:
             logger.info(f"✅ Gemini 2.5 Pro gerou {len(response.text)} caracteres")
             return response.text
         raise Exception("Resposta vazia do Gemini 2.5 Pro")
 
-    def _generate_with_groq(self, prompt: str, max_tokens: int) -> Optional[str]:
+    async def _agenerate_with_gemini(self, prompt: str, max_tokens: int, model: Any = None, json_mode: bool = False) -> Optional[str]:
+        """Gera conteúdo usando Gemini (assíncrono)."""
+        client = model or self.providers['gemini']['client']
+        config, safety = self._gemini_params(max_tokens, json_mode)
+        response = await client.generate_content_async(prompt, generation_config=config, safety_settings=safety)
+        if response.text:
+            logger.info(f"✅ Gemini 2.5 Pro (async) gerou {len(response.text)} caracteres")
+            return response.text
+        raise Exception("Resposta vazia do Gemini 2.5 Pro")
+
+    def _stream_with_gemini(self, prompt: str, max_tokens: int, model: Any = None, json_mode: bool = False) -> Iterator[str]:
+        """Transmite conteúdo gerado pelo Gemini."""
+        client = model or self.providers['gemini']['client']
+        config, safety = self._gemini_params(max_tokens, json_mode)
+        response = client.generate_content(prompt, generation_config=config, safety_settings=safety, stream=True)
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Trecho sem partes de texto (ex.: bloqueio de segurança)
+                continue
+            if text:
+                yield text
+
+    def _generate_with_groq(self, prompt: str, max_tokens: int, json_mode: bool = False) -> Optional[str]:
         """Gera conteúdo usando Groq."""
         client = self.providers['groq']['client']
-        content = client.generate(prompt, max_tokens=min(max_tokens, 8192))
+        content = client.generate(prompt, max_tokens=min(max_tokens, 8192), json_mode=json_mode)
         if content:
             logger.info(f"✅ Groq gerou {len(content)} caracteres")
             return content
         raise Exception("Resposta vazia do Groq")
 
-    def _generate_with_openai(self, prompt: str, max_tokens: int) -> Optional[str]:
+    @staticmethod
+    def _openai_format(json_mode: bool) -> Dict[str, Any]:
+        """Parâmetro response_format do modo JSON (OpenAI e Groq)"""
+        return {"response_format": {"type": "json_object"}} if json_mode else {}
+
+    def _generate_with_openai(self, prompt: str, max_tokens: int, json_mode: bool = False) -> Optional[str]:
         """Gera conteúdo usando OpenAI."""
         client = self.providers['openai']['client']
         response = client.chat.completions.create(
@@ -333,7 +1344,8 @@ class AIManager:
                 {"role": "user", "content": prompt}
             ],
             max_tokens=min(max_tokens, 4096),
-            temperature=0.7
+            temperature=0.7,
+            **self._openai_format(json_mode)
         )
         content = response.choices[0].message.content
         if content:
@@ -341,6 +1353,44 @@ class AIManager:
             return content
         raise Exception("Resposta vazia do OpenAI")
 
+    async def _agenerate_with_openai(self, prompt: str, max_tokens: int, json_mode: bool = False) -> Optional[str]:
+        """Gera conteúdo usando OpenAI (assíncrono)."""
+        client = self._async_client('openai')
+        response = await client.chat.completions.create(
+            model=self.providers['openai']['model'],
+            messages=[
+                {"role": "system", "content": "Você é um especialista em análise de mercado ultra-detalhada."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=min(max_tokens, 4096),
+            temperature=0.7,
+            **self._openai_format(json_mode)
+        )
+        content = response.choices[0].message.content
+        if content:
+            logger.info(f"✅ OpenAI (async) gerou {len(content)} caracteres")
+            return content
+        raise Exception("Resposta vazia do OpenAI")
+
+    def _stream_with_openai(self, prompt: str, max_tokens: int, json_mode: bool = False) -> Iterator[str]:
+        """Transmite conteúdo gerado pelo OpenAI."""
+        client = self.providers['openai']['client']
+        stream = client.chat.completions.create(
+            model=self.providers['openai']['model'],
+            messages=[
+                {"role": "system", "content": "Você é um especialista em análise de mercado ultra-detalhada."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=min(max_tokens, 4096),
+            temperature=0.7,
+            stream=True,
+            **self._openai_format(json_mode)
+        )
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
     def _generate_with_huggingface(self, prompt: str, max_tokens: int) -> Optional[str]:
         """Gera conteúdo usando HuggingFace com rotação de modelos."""
         config = self.providers['huggingface']
@@ -372,6 +1422,34 @@ class AIManager:
                 continue
         raise Exception("Todos os modelos HuggingFace falharam")
 
+    async def _agenerate_with_huggingface(self, prompt: str, max_tokens: int) -> Optional[str]:
+        """Gera conteúdo usando HuggingFace (assíncrono) com rotação de modelos."""
+        config = self.providers['huggingface']
+        client = self._async_client('http')
+        for _ in range(len(config['models'])):
+            model_index = config['current_model_index']
+            model = config['models'][model_index]
+            config['current_model_index'] = (model_index + 1) % len(config['models'])
+
+            try:
+                url = f"{config['client']['base_url']}{model}"
+                headers = {"Authorization": f"Bearer {config['client']['api_key']}"}
+                payload = {"inputs": prompt, "parameters": {"max_new_tokens": min(max_tokens, 1024)}}
+                response = await client.post(url, headers=headers, json=payload)
+
+                if response.status_code == 200:
+                    content = response.json()[0].get("generated_text", "")
+                    if content:
+                        logger.info(f"✅ HuggingFace ({model}) gerou {len(content)} caracteres")
+                        return content
+                elif response.status_code == 503:
+                    logger.warning(f"⚠️ Modelo HuggingFace {model} está carregando (503), tentando próximo...")
+                else:
+                    logger.warning(f"⚠️ Erro {response.status_code} no modelo {model}")
+            except Exception as e:
+                logger.warning(f"⚠️ Erro no modelo {model}: {e}")
+        raise Exception("Todos os modelos HuggingFace falharam")
+
     def reset_provider_errors(self, provider_name: str = None):
         """Reset contadores de erro dos provedores"""
         if provider_name:
@@ -379,6 +1457,7 @@ class AIManager:
                 self.providers[provider_name]['error_count'] = 0
                 self.providers[provider_name]['consecutive_failures'] = 0
                 self.providers[provider_name]['available'] = True
+                self.circuit_breaker.reset(provider_name)
                 logger.info(f"🔄 Reset erros do provedor: {provider_name}")
         else:
             for provider in self.providers.values():
@@ -386,45 +1465,39 @@ class AIManager:
                 provider['consecutive_failures'] = 0
                 if provider.get('client'):  # Só reabilita se tem cliente configurado
                     provider['available'] = True
+            self.circuit_breaker.reset()
             logger.info("🔄 Reset erros de todos os provedores")
 
-    def _try_fallback(self, prompt: str, max_tokens: int, exclude: List[str]) -> Optional[str]:
+    def _try_fallback(self, prompt: str, max_tokens: int, exclude: List[str], use_cache: bool = True) -> Optional[str]:
         """Tenta usar o próximo provedor disponível como fallback."""
         logger.info(f"🔄 Acionando fallback, excluindo: {', '.join(exclude)}")
         
-        # Ordena provedores por prioridade, excluindo os que já falharam
-        available_providers = [
-            (name, provider) for name, provider in self.providers.items()
-            if (provider['available'] and 
-                name not in exclude and 
-                provider['consecutive_failures'] < provider.get('max_errors', 2))
-        ]
+        # Provedores por prioridade, excluindo os que já falharam
+        available_providers = self._healthy_providers(exclude=exclude)
         
         if not available_providers:
             logger.critical("❌ Todos os provedores de fallback falharam.")
             return None
         
-        # Ordena por prioridade
-        available_providers.sort(key=lambda x: (x[1]['priority'], x[1]['consecutive_failures']))
-        next_provider = available_providers[0][0]
+        next_provider = available_providers[0]
         
         logger.info(f"🔄 Tentando fallback para: {next_provider.upper()}")
         
         try:
-            result = self._call_provider(next_provider, prompt, max_tokens)
+            result = self._call_provider_cached(next_provider, prompt, max_tokens, use_cache)
             if result:
-                self._record_success(next_provider)
                 return result
             else:
                 raise Exception("Resposta vazia do fallback")
         except Exception as e:
             logger.error(f"❌ Fallback para {next_provider} também falhou: {e}")
             self._record_failure(next_provider, str(e))
-            return self._try_fallback(prompt, max_tokens, exclude + [next_provider])
+            return self._try_fallback(prompt, max_tokens, exclude + [next_provider], use_cache)
     
     def get_provider_status(self) -> Dict[str, Any]:
         """Retorna status detalhado dos provedores"""
         status = {}
+        admission_metrics = provider_admission.get_metrics()
         
         for name, provider in self.providers.items():
             status[name] = {
@@ -434,10 +1507,145 @@ class AIManager:
                 'consecutive_failures': provider['consecutive_failures'],
                 'last_success': provider.get('last_success'),
                 'max_errors': provider['max_errors'],
-                'model': provider.get('model', 'N/A')
+                'model': provider.get('model', 'N/A'),
+                'cache': self.response_cache.get_label_stats(name),
+                'latency': self._latency_summary(provider['latencies']),
+                'effective_latency': self._latency_summary(provider['effective_latencies']),
+                'hedging': {
+                    'enabled': self.hedging_enabled,
+                    'fired': provider['hedges_fired'],
+                    'won_by_hedge': provider['hedges_won']
+                },
+                'admission': admission_metrics.get(name, {}),
+                'circuit': self.circuit_breaker.get_state(name),
+                'routing': {
+                    'policy': self.routing_policy,
+                    'quality': self.provider_quality.get(name),
+                    'ewma_latency': round(provider['ewma_latency'], 3) if provider['ewma_latency'] is not None else None,
+                    'success_rate': round(provider['ewma_success'], 3),
+                    'attempts': provider['routing_attempts'],
+                    'throughput_tps': round(provider['ewma_throughput'], 1) if provider['ewma_throughput'] is not None else None,
+                    'expected_completion': round(self._expected_completion(provider), 3)
+                }
             }
         
         return status
 
+    def _latency_summary(self, samples) -> Dict[str, Any]:
+        """Resumo p50/p95/p99 (segundos) de uma janela de latências"""
+        samples = list(samples)
+        summary = {'samples': len(samples)}
+        for pct in (50, 95, 99):
+            value = _percentile(samples, pct)
+            summary[f'p{pct}'] = round(value, 3) if value is not None else None
+        return summary
+
+    def create_session_context(self, session_id: str, context_text: str, ttl: Optional[int] = None) -> Optional[SessionContext]:
+        """Registra o contexto comum às chamadas de uma sessão, se houver cache de prefixo no provedor.
+
+        Só vale a pena quando o provedor preferido guarda o prefixo (conteúdo em
+        cache do Gemini): o contexto é enviado uma vez e cada prompt leva só a
+        instrução. Sem esse cache retorna None e nada é registrado, então os
+        agentes seguem com o bloco de dados truncado de cada prompt.
+        """
+        if self.get_best_provider() != 'gemini':
+            return None
+        context = SessionContext(session_id, context_text, ttl or self.context_store.ttl)
+        if self._gemini_context_model(context) is None:
+            return None
+        with self._session_lock:
+            self._session_contexts[session_id] = context
+        logger.info(f"🧩 Contexto de sessão registrado para {session_id} ({len(context_text)} caracteres)")
+        return context
+
+    def get_session_context(self, session_id: Optional[str]) -> Optional[SessionContext]:
+        """Retorna o contexto registrado para a sessão, se houver"""
+        if not session_id:
+            return None
+        return self._session_contexts.get(session_id)
+
+    def release_session_context(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Descarta o contexto da sessão e retorna suas estatísticas de uso"""
+        with self._session_lock:
+            context = self._session_contexts.pop(session_id, None)
+        if context:
+            stats = context.get_stats()
+            logger.info(f"🧩 Contexto de sessão {session_id} liberado: {stats}")
+            return stats
+        return None
+
+    def _resolve_contextual_prompt(self, provider_name: str, prompt: str) -> Tuple[str, Any]:
+        """Texto a enviar ao provedor e, no Gemini, o modelo ligado ao contexto em cache"""
+        if not isinstance(prompt, ContextualPrompt):
+            return prompt, None
+
+        context = prompt.context
+        context.stats['prompts'] += 1
+        if provider_name == 'gemini':
+            model = self._gemini_context_model(context)
+            if model is not None:
+                context.stats['cached_prefix'] += 1
+                return prompt.instruction, model
+
+        # Fallback para outro provedor: só um corte do contexto, sem chamada extra de IA
+        context.stats['fallback'] += 1
+        return f"{context.text[:self.context_fallback_chars]}\n\n{prompt.instruction}", None
+
+    def _gemini_context_model(self, context: SessionContext) -> Any:
+        """Modelo Gemini ligado ao prefixo em cache (criado uma vez e compartilhado entre workers).
+
+        Exige google-generativeai >= 0.7 (HAS_GEMINI_CACHING); com a versão fixada
+        em requirements.txt retorna None e a sessão não registra contexto compartilhado.
+        """
+        if context.gemini_model is not None or context.gemini_unavailable:
+            return context.gemini_model
+        if not (HAS_GEMINI_CACHING and self.providers['gemini']['client']):
+            context.gemini_unavailable = True
+            return None
+
+        with context.lock:
+            if context.gemini_model is not None or context.gemini_unavailable:
+                return context.gemini_model
+
+            model_name = self.providers['gemini']['model']
+            store_key = PersistentCache.make_key('gemini_cache', model_name, context.fingerprint)
+            try:
+                cache_name = self.context_store.get(store_key, label='gemini_cache')
+                if cache_name:
+                    cached = genai_caching.CachedContent.get(cache_name)
+                else:
+                    cached = genai_caching.CachedContent.create(
+                        model=f"models/{model_name}",
+                        display_name=f"arqv30-{context.session_id}"[:120],
+                        contents=[context.text],
+                        ttl=timedelta(seconds=context.ttl)
+                    )
+                    # Expira do nosso lado antes do Gemini para nunca referenciar cache removido
+                    self.context_store.set(store_key, cached.name, label='gemini_cache', ttl=max(60, context.ttl - 300))
+                    logger.info(f"🧩 Contexto da sessão {context.session_id} enviado ao cache do Gemini: {cached.name}")
+                context.gemini_model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+            except Exception as e:
+                # Ex.: modelo sem suporte a cache ou contexto abaixo do mínimo exigido
+                logger.info(f"ℹ️ Cache de contexto do Gemini indisponível, sem contexto compartilhado: {e}")
+                context.gemini_unavailable = True
+        return context.gemini_model
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas agregadas do cache de respostas e da deduplicação de chamadas"""
+        stats = self.response_cache.get_stats()
+        stats['single_flight'] = self.single_flight.get_stats()
+        stats['semantic'] = self.semantic_cache.get_stats()
+        return stats
+
+    def get_output_budget_stats(self) -> Dict[str, Any]:
+        """Tokens de saída observados e max_tokens sugerido por componente/provedor"""
+        return output_budget_tuner.get_stats()
+
+    def clear_response_cache(self, expired_only: bool = False) -> int:
+        """Limpa o cache de respostas de IA (e o cache semântico, exceto com expired_only)"""
+        if not expired_only:
+            self.semantic_cache.clear()
+        return self.response_cache.purge(expired_only=expired_only)
+
 # Instância global
 ai_manager = AIManager()
\ No newline at end of file
@@ -18,6 +18,9 @@ from datetime import datetime
 import re
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from services.search_cache import search_cache
+from services.rate_limiter import rate_limiter
+from services.http_fetcher import http_fetcher
 
 logger = logging.getLogger(__name__)
 
@@ -70,8 +73,8 @@ class AlibabaWebSailorAgent:
             "mercadolivre.com.br", "olx.com.br", "booking.com", "airbnb.com"
         }
         
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        # Raspagem dos buscadores passa pelo limite de taxa por host
+        self.session = rate_limiter.session(self.headers)
         
         # Estatísticas de navegação
         self.navigation_stats = {
@@ -152,10 +155,6 @@ class AlibabaWebSailorAgent:
                                     "content_length": len(content_data['content']),
                                     "quality_score": content_data['quality_score']
                                 }, categoria="pesquisa_web")
-                            
-                            time.sleep(0.5)  # Rate limiting
-                    
-                    time.sleep(1)  # Delay entre engines
                     
                 except Exception as e:
                     logger.error(f"❌ Erro em {engine_name}: {str(e)}")
@@ -178,8 +177,6 @@ class AlibabaWebSailorAgent:
                             internal_content['search_engine'] = f"{page['search_engine']} (Internal)"
                             internal_content['parent_url'] = page['url']
                             all_content.append(internal_content)
-                            
-                            time.sleep(0.3)
             
             # NÍVEL 3: QUERIES RELACIONADAS INTELIGENTES
             if depth_levels > 2:
@@ -200,8 +197,6 @@ class AlibabaWebSailorAgent:
                                 related_content['search_engine'] = "Google (Related Query)"
                                 related_content['related_query'] = related_query
                                 all_content.append(related_content)
-                                
-                                time.sleep(0.4)
                     except Exception as e:
                         logger.warning(f"⚠️ Erro em query relacionada '{related_query}': {str(e)}")
                         continue
@@ -227,6 +222,8 @@ class AlibabaWebSailorAgent:
             salvar_erro("websailor_critico", e, contexto={"query": query})
             return self._generate_emergency_research(query, context)
     
+    @search_cache.cached('websailor', 'google')
+    @rate_limiter.limited('google')
     def _google_search_deep(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca profunda usando Google Custom Search API"""
         
@@ -283,6 +280,8 @@ class AlibabaWebSailorAgent:
             logger.error(f"❌ Erro no Google Search: {str(e)}")
             return []
     
+    @search_cache.cached('websailor', 'serper')
+    @rate_limiter.limited('serper')
     def _serper_search_deep(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca profunda usando Serper API"""
         
@@ -336,6 +335,8 @@ class AlibabaWebSailorAgent:
             logger.error(f"❌ Erro no Serper: {str(e)}")
             return []
     
+    @search_cache.cached('websailor', 'bing')
+    @rate_limiter.limited('bing')
     def _bing_search_deep(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca profunda usando Bing (scraping inteligente)"""
         
@@ -381,6 +382,8 @@ class AlibabaWebSailorAgent:
             logger.error(f"❌ Erro no Bing: {str(e)}")
             return []
     
+    @search_cache.cached('websailor', 'duckduckgo')
+    @rate_limiter.limited('duckduckgo')
     def _duckduckgo_search_deep(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca profunda usando DuckDuckGo"""
         
@@ -420,6 +423,8 @@ class AlibabaWebSailorAgent:
             logger.error(f"❌ Erro no DuckDuckGo: {str(e)}")
             return []
     
+    @search_cache.cached('websailor', 'yahoo')
+    @rate_limiter.limited('yahoo')
     def _yahoo_search_deep(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca profunda usando Yahoo"""
         
@@ -561,7 +566,7 @@ class AlibabaWebSailorAgent:
             
             jina_url = f"{self.jina_reader_url}{url}"
             
-            response = requests.get(jina_url, headers=headers, timeout=30)
+            response = http_fetcher.fetch(jina_url, headers=headers, timeout=30)
             
             if response.status_code == 200:
                 content = response.text
@@ -607,7 +612,7 @@ class AlibabaWebSailorAgent:
         try:
             from readability import Document
             
-            response = self.session.get(url, timeout=20)
+            response = http_fetcher.fetch(url, headers=self.headers, timeout=20)
             if response.status_code == 200:
                 doc = Document(response.content)
                 content = doc.summary()
@@ -626,7 +631,7 @@ class AlibabaWebSailorAgent:
         """Extrai usando BeautifulSoup"""
         
         try:
-            response = self.session.get(url, timeout=20)
+            response = http_fetcher.fetch(url, headers=self.headers, timeout=20)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -877,7 +882,7 @@ class AlibabaWebSailorAgent:
         """Extrai links internos relevantes"""
         
         try:
-            response = self.session.get(base_url, timeout=10)
+            response = http_fetcher.fetch(base_url, headers=self.headers, timeout=10)
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
                 base_domain = urlparse(base_url).netloc
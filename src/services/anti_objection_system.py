@@ -13,6 +13,19 @@ from typing import Dict, List, Any, Optional
 from services.ai_manager import ai_manager
 from services.auto_save_manager import salvar_etapa, salvar_erro
 
+_SCRIPT_LIST = {"type": "array", "minItems": 1, "items": {"type": "string"}}
+
+PERSONALIZED_SCRIPTS_SCHEMA = {
+    "type": "object",
+    "required": ["scripts_tempo", "scripts_dinheiro", "scripts_confianca", "scripts_emergencia"],
+    "properties": {
+        "scripts_tempo": _SCRIPT_LIST,
+        "scripts_dinheiro": _SCRIPT_LIST,
+        "scripts_confianca": _SCRIPT_LIST,
+        "scripts_emergencia": _SCRIPT_LIST
+    }
+}
+
 logger = logging.getLogger(__name__)
 
 class AntiObjectionSystem:
@@ -518,7 +531,7 @@ PERFIL DO AVATAR:
 OBJEÇÕES IDENTIFICADAS:
 {json.dumps(counter_attacks, indent=2, ensure_ascii=False)[:1000]}
 
-RETORNE APENAS JSON VÁLIDO:
+EXEMPLO DE ESTRUTURA:
 
 ```json
 {{
@@ -542,21 +555,12 @@ RETORNE APENAS JSON VÁLIDO:
 ```
 """
             
-            response = ai_manager.generate_analysis(prompt, max_tokens=1500)
-            
-            if response:
-                clean_response = response.strip()
-                if "```json" in clean_response:
-                    start = clean_response.find("```json") + 7
-                    end = clean_response.rfind("```")
-                    clean_response = clean_response[start:end].strip()
-                
-                try:
-                    scripts = json.loads(clean_response)
-                    logger.info("✅ Scripts personalizados gerados com IA")
-                    return scripts
-                except json.JSONDecodeError:
-                    logger.warning("⚠️ IA retornou JSON inválido para scripts")
+            scripts = ai_manager.generate_structured(
+                prompt, PERSONALIZED_SCRIPTS_SCHEMA, max_tokens=1500, component='anti_objection'
+            )
+            if scripts:
+                logger.info("✅ Scripts personalizados gerados com IA")
+                return scripts
             
             # Fallback para scripts básicos
             return self._create_basic_scripts(avatar_data, context_data)
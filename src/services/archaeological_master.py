@@ -11,10 +11,24 @@ import json
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from services.ai_manager import ai_manager
+from services.prompt_budgeter import prompt_budgeter
+from services.structured_output import with_schema, parse_structured
 from services.auto_save_manager import salvar_etapa, salvar_erro
 
 logger = logging.getLogger(__name__)
 
+# Camadas mínimas exigidas da resposta (o prompt detalha a estrutura completa)
+ARCHAEOLOGICAL_SCHEMA = {
+    "type": "object",
+    "required": ["dna_conversao_completo", "avatar_arqueologico_ultra"],
+    "properties": {
+        "dna_conversao_completo": {"type": "object"},
+        "avatar_arqueologico_ultra": {"type": "object"},
+        "segmentacao_psicologica_avancada": {"type": "array"},
+        "premissas_estabelecidas": {"type": "array"}
+    }
+}
+
 class ArchaeologicalMaster:
     """ARQUEÓLOGO MESTRE DA PERSUASÃO - Análise Forense Completa"""
     
@@ -56,10 +70,15 @@ class ArchaeologicalMaster:
             }, categoria="analise_completa")
             
             # Constrói prompt arqueológico ultra-detalhado
-            archaeological_prompt = self._build_archaeological_prompt(data, research_context)
+            archaeological_prompt = with_schema(
+                self._build_archaeological_prompt(data, research_context), ARCHAEOLOGICAL_SCHEMA
+            )
             
-            # Executa análise com IA
-            response = ai_manager.generate_analysis(archaeological_prompt, max_tokens=8192)
+            # Executa análise com IA (cada seção do JSON é salva assim que se fecha)
+            response = ai_manager.stream_analysis_to_session(
+                archaeological_prompt, session_id, 'arqueologia', max_tokens=8192,
+                on_section=lambda key, value: salvar_etapa(f"arqueologia_secao_{key}", value, categoria="analise_completa")
+            )
             
             if not response:
                 raise Exception("ARQUEÓLOGO FALHOU: IA não respondeu")
@@ -86,6 +105,12 @@ class ArchaeologicalMaster:
             salvar_erro("arqueologia_falha", e, contexto=data)
             return self._generate_archaeological_emergency(data)
     
+    def _fit_research_context(self, research_context: str) -> str:
+        """Corta o contexto de pesquisa no orçamento de tokens do melhor provedor"""
+        provider = ai_manager.get_best_provider()
+        budget = prompt_budgeter.available_budget(provider, max_output_tokens=8192, target=3000)
+        return prompt_budgeter.truncate(research_context, budget, provider)
+
     def _build_archaeological_prompt(self, data: Dict[str, Any], research_context: str) -> str:
         """Constrói prompt arqueológico ultra-detalhado"""
         
@@ -102,7 +127,7 @@ Sua missão é escavar cada detalhe do mercado de {data.get('segmento', 'negóci
 - **Objetivo de Receita**: R$ {data.get('objetivo_receita', 'Não informado')}
 
 ## CONTEXTO DE PESQUISA ARQUEOLÓGICA:
-{research_context[:10000] if research_context else "Pesquisa arqueológica em andamento..."}
+{self._fit_research_context(research_context) if research_context else "Pesquisa arqueológica em andamento..."}
 
 ## DISSECAÇÃO EM 12 CAMADAS PROFUNDAS - ANÁLISE ARQUEOLÓGICA:
 
@@ -473,18 +498,13 @@ CRÍTICO: Use APENAS dados REAIS da pesquisa. Seja cirúrgico, obsessivo e impla
     def _process_archaeological_response(self, response: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Processa resposta arqueológica com validação rigorosa"""
         
-        try:
-            # Extrai JSON da resposta
-            clean_text = response.strip()
-            
-            if "```json" in clean_text:
-                start = clean_text.find("```json") + 7
-                end = clean_text.rfind("```")
-                clean_text = clean_text[start:end].strip()
-            
-            # Parseia JSON
-            archaeological_data = json.loads(clean_text)
-            
+        # Extrai o JSON da resposta, reparando cortes e pequenos erros de sintaxe
+        archaeological_data, errors = parse_structured(response, ARCHAEOLOGICAL_SCHEMA)
+
+        if isinstance(archaeological_data, dict):
+            if errors:
+                logger.warning(f"⚠️ JSON arqueológico incompleto: {errors[:5]}")
+
             # Adiciona metadados arqueológicos
             archaeological_data['metadata_arqueologico'] = {
                 'generated_at': datetime.now().isoformat(),
@@ -492,14 +512,13 @@ CRÍTICO: Use APENAS dados REAIS da pesquisa. Seja cirúrgico, obsessivo e impla
                 'camadas_analisadas': len(self.analysis_layers),
                 'profundidade_escavacao': 'ULTRA-PROFUNDA',
                 'dna_conversao_extraido': True,
-                'analise_forense_completa': True
+                'analise_forense_completa': not errors
             }
             
             return archaeological_data
             
-        except json.JSONDecodeError as e:
-            logger.error(f"❌ Erro ao parsear JSON arqueológico: {e}")
-            return self._extract_archaeological_insights_from_text(response, data)
+        logger.error(f"❌ Erro ao parsear JSON arqueológico: {errors}")
+        return self._extract_archaeological_insights_from_text(response, data)
     
     def _extract_archaeological_insights_from_text(self, text: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Extrai insights arqueológicos do texto quando JSON falha"""
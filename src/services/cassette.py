@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Cassette
+Gravação e reprodução (record/replay) de todo o tráfego HTTP e LLM de uma sessão
+"""
+
+import os
+import gzip
+import asyncio
+import json
+import time
+import base64
+import atexit
+import hashlib
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+try:
+    import requests
+    from requests.structures import CaseInsensitiveDict
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+
+OFF = 'off'
+RECORD = 'record'
+REPLAY = 'replay'
+
+# Parâmetros de URL que carregam credenciais: nunca gravados nem usados na chave
+_SECRET_PARAMS = {'key', 'api_key', 'apikey', 'token', 'access_token', 'auth', 'cx'}
+_KEPT_HEADERS = ('content-type', 'content-encoding', 'content-language', 'location')
+
+
+class CassetteMissError(Exception):
+    """Requisição sem resposta gravada no cassete em modo replay"""
+
+
+class _Tape:
+    """Cassete de uma sessão: respostas gravadas e posição de reprodução de cada chave"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.entries: Dict[str, list] = {}
+        self.cursor: Dict[str, int] = {}
+        self.depth = 0
+        self.recorded = 0
+
+
+# Cassete da sessão em execução no contexto atual (thread ou tarefa asyncio)
+_current_tape: contextvars.ContextVar = contextvars.ContextVar('cassette_tape', default=None)
+
+
+class Cassette:
+    """Grava respostas de saída (HTTP via requests e chamadas de LLM) em um arquivo
+    .json.gz por sessão e as reproduz localmente, de forma determinística.
+
+    Modo definido por CASSETTE_MODE (off, record, replay). Em replay, CASSETTE_NAME
+    escolhe o cassete (por padrão o da própria sessão) e CASSETTE_EMULATE_LATENCY=true
+    reproduz também a latência gravada.
+
+    O cassete ativo é o da sessão do contexto atual (contextvar), então sessões
+    simultâneas no mesmo worker gravam cada uma no seu arquivo. Código que
+    executa partes da sessão em outras threads usa bind()/bind_async(); uma
+    chamada sem sessão associada usa o único cassete aberto, se houver só um.
+    Em replay, com alguma sessão aberta, nenhuma chamada sem cassete vai à rede.
+    """
+
+    def __init__(self, mode: Optional[str] = None, directory: Optional[str] = None):
+        """Inicializa o cassete no modo configurado"""
+        self.mode = (mode or os.getenv('CASSETTE_MODE', OFF)).lower()
+        if self.mode not in (OFF, RECORD, REPLAY):
+            logger.warning(f"⚠️ CASSETTE_MODE inválido '{self.mode}', desativando")
+            self.mode = OFF
+        self.directory = Path(directory or os.getenv('CASSETTE_DIR', 'cassettes'))
+        self.fixed_name = os.getenv('CASSETTE_NAME')
+        self.emulate_latency = os.getenv('CASSETTE_EMULATE_LATENCY', 'false').lower() == 'true'
+
+        self._lock = threading.RLock()
+        self._tapes: Dict[str, _Tape] = {}
+        self._original_send = None
+        self.stats = {'recorded': 0, 'replayed': 0, 'misses': 0, 'unbound': 0}
+
+        if self.mode != OFF:
+            self.install()
+            atexit.register(self.flush)
+            logger.info(f"📼 Cassette em modo {self.mode.upper()} ({self.directory})")
+
+    @property
+    def active(self) -> bool:
+        """Há cassete para a chamada atual (em replay, também quando ela não pôde ser associada)"""
+        if self.mode == OFF:
+            return False
+        return self._tape() is not None or (self.mode == REPLAY and bool(self._tapes))
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    # ------------------------------------------------------------------
+    # Sessões
+    # ------------------------------------------------------------------
+
+    def _path(self, name: str) -> Path:
+        safe = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+        return self.directory / f"{safe}.json.gz"
+
+    def _load(self, tape: _Tape):
+        path = self._path(tape.name)
+        if not path.exists():
+            logger.error(f"❌ Cassete não encontrado para replay: {path}")
+            return
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            tape.entries = json.load(f).get('entries', {})
+        logger.info(f"📼 Cassete carregado: {path} ({sum(len(v) for v in tape.entries.values())} respostas)")
+
+    def begin(self, session_id: str) -> Optional[Tuple[_Tape, contextvars.Token]]:
+        """Ativa o cassete da sessão no contexto atual; devolve o identificador para end().
+
+        Aberturas aninhadas da mesma sessão reaproveitam o cassete já aberto.
+        """
+        if self.mode == OFF:
+            return None
+        name = self.fixed_name or session_id
+        with self._lock:
+            tape = self._tapes.get(name)
+            if tape is None:
+                tape = self._tapes[name] = _Tape(name)
+                if self.mode == REPLAY:
+                    self._load(tape)
+            tape.depth += 1
+        return tape, _current_tape.set(tape)
+
+    def end(self, handle: Optional[Tuple[_Tape, contextvars.Token]]):
+        """Encerra o que begin() abriu; em modo record grava o cassete ao fechar a última abertura"""
+        if handle is None:
+            return
+        tape, token = handle
+        try:
+            _current_tape.reset(token)
+        except ValueError:
+            # Encerrado em outro contexto: apenas deixa de apontar para o cassete
+            _current_tape.set(None)
+        with self._lock:
+            tape.depth -= 1
+            if tape.depth > 0:
+                return
+            self._tapes.pop(tape.name, None)
+        self._flush(tape)
+
+    @contextmanager
+    def session(self, session_id: str):
+        """Context manager que delimita o cassete de uma sessão"""
+        handle = self.begin(session_id)
+        try:
+            yield self
+        finally:
+            self.end(handle)
+
+    def bind(self, fn: Callable) -> Callable:
+        """Leva o cassete da sessão atual para fn executada em outra thread (ex.: executor.submit)"""
+        tape = _current_tape.get()
+        if tape is None:
+            return fn
+
+        @wraps(fn)
+        def run(*args, **kwargs):
+            token = _current_tape.set(tape)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current_tape.reset(token)
+        return run
+
+    def bind_async(self, coro):
+        """Leva o cassete da sessão atual para uma corrotina executada em outro event loop"""
+        tape = _current_tape.get()
+        if tape is None:
+            return coro
+
+        async def run():
+            # A tarefa tem cópia própria do contexto: a atribuição não vaza para o loop
+            _current_tape.set(tape)
+            return await coro
+        return run()
+
+    def _tape(self) -> Optional[_Tape]:
+        """Cassete da sessão do contexto atual (ou o único aberto, para threads sem bind)"""
+        tape = _current_tape.get()
+        if tape is not None:
+            return tape
+        with self._lock:
+            if len(self._tapes) == 1:
+                return next(iter(self._tapes.values()))
+        return None
+
+    def _resolve(self, meta: Dict[str, Any]) -> Optional[_Tape]:
+        """Cassete da chamada; em replay, recusa chamadas que não puderam ser associadas a uma sessão"""
+        tape = self._tape()
+        if tape is None and self._tapes:
+            self.stats['unbound'] += 1
+            if self.mode == REPLAY:
+                self.stats['misses'] += 1
+                raise CassetteMissError(f"Chamada sem sessão associada durante o replay: {meta}")
+            logger.warning(f"⚠️ Cassette: chamada sem sessão associada não gravada: {meta}")
+        return tape
+
+    def _flush(self, tape: _Tape):
+        if self.mode != RECORD or not tape.entries:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(tape.name)
+        with self._lock:
+            payload = {
+                'name': tape.name,
+                'recorded_at': time.time(),
+                'entries': tape.entries
+            }
+            with gzip.open(path, 'wt', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+        logger.info(f"📼 Cassete gravado: {path} ({tape.recorded} respostas)")
+
+    def flush(self):
+        """Grava em disco os cassetes ainda abertos (modo record)"""
+        with self._lock:
+            tapes = list(self._tapes.values())
+        for tape in tapes:
+            self._flush(tape)
+
+    # ------------------------------------------------------------------
+    # Gravação / reprodução
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(kind: str, *parts: Any) -> str:
+        raw = json.dumps([kind, *parts], ensure_ascii=False, sort_keys=True, default=str)
+        return f"{kind}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+    def _record(self, tape: _Tape, key: str, value: Any, elapsed: float, meta: Dict[str, Any]):
+        with self._lock:
+            tape.entries.setdefault(key, []).append({'value': value, 'elapsed': round(elapsed, 4), 'meta': meta})
+            tape.recorded += 1
+            self.stats['recorded'] += 1
+
+    def _replay(self, tape: _Tape, key: str, meta: Dict[str, Any], sleep: bool = True) -> Dict[str, Any]:
+        """Próxima resposta gravada para a chave (repetições são servidas em ordem; a última se repete)"""
+        with self._lock:
+            recorded = tape.entries.get(key)
+            if not recorded:
+                self.stats['misses'] += 1
+                raise CassetteMissError(f"Sem resposta gravada no cassete '{tape.name}' para {meta}")
+            index = tape.cursor.get(key, 0)
+            tape.cursor[key] = index + 1
+            self.stats['replayed'] += 1
+            entry = recorded[min(index, len(recorded) - 1)]
+        if self.emulate_latency and sleep:
+            time.sleep(entry['elapsed'])
+        return entry
+
+    def record(self, kind: str, key_parts: Dict[str, Any], value: Any, elapsed: float):
+        """Grava explicitamente um resultado (ex.: texto acumulado de um streaming)"""
+        if self.mode == RECORD:
+            tape = self._resolve({'kind': kind})
+            if tape is not None:
+                self._record(tape, self.make_key(kind, key_parts), value, elapsed, {'kind': kind})
+
+    def replay(self, kind: str, key_parts: Dict[str, Any]) -> Any:
+        """Resultado gravado para a chamada (levanta CassetteMissError se não houver)"""
+        tape = self._resolve({'kind': kind})
+        if tape is None:
+            raise CassetteMissError(f"Nenhum cassete aberto para {kind}")
+        return self._replay(tape, self.make_key(kind, key_parts), {'kind': kind})['value']
+
+    def intercept(self, kind: str, key_parts: Dict[str, Any], fn: Callable[[], Any]) -> Any:
+        """Executa fn gravando seu resultado (record) ou o substitui pelo gravado (replay).
+
+        O resultado precisa ser serializável em JSON.
+        """
+        tape = self._resolve({'kind': kind}) if self.mode != OFF else None
+        if tape is None:
+            return fn()
+        key = self.make_key(kind, key_parts)
+        if self.mode == REPLAY:
+            return self._replay(tape, key, {'kind': kind})['value']
+        start = time.time()
+        result = fn()
+        self._record(tape, key, result, time.time() - start, {'kind': kind})
+        return result
+
+    async def aintercept(self, kind: str, key_parts: Dict[str, Any], coro_fn: Callable[[], Any]) -> Any:
+        """Versão assíncrona de intercept (coro_fn devolve uma corrotina)"""
+        tape = self._resolve({'kind': kind}) if self.mode != OFF else None
+        if tape is None:
+            return await coro_fn()
+        key = self.make_key(kind, key_parts)
+        if self.mode == REPLAY:
+            entry = self._replay(tape, key, {'kind': kind}, sleep=False)
+            if self.emulate_latency:
+                await asyncio.sleep(entry['elapsed'])
+            return entry['value']
+        start = time.time()
+        result = await coro_fn()
+        self._record(tape, key, result, time.time() - start, {'kind': kind})
+        return result
+
+    # ------------------------------------------------------------------
+    # HTTP (requests)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _redact_url(url: str) -> str:
+        parts = urlsplit(url)
+        query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in _SECRET_PARAMS]
+        return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(sorted(query)), ''))
+
+    def _http_key(self, request) -> str:
+        body = request.body or b''
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        return self.make_key('http', request.method, self._redact_url(request.url), hashlib.sha256(body).hexdigest())
+
+    def _send(self, session, request, **kwargs):
+        """Substituto de requests.Session.send"""
+        meta = {'kind': 'http', 'method': request.method, 'url': self._redact_url(request.url)}
+        tape = self._resolve(meta) if self.mode != OFF else None
+        if tape is None:
+            return self._original_send(session, request, **kwargs)
+
+        key = self._http_key(request)
+
+        if self.mode == REPLAY:
+            entry = self._replay(tape, key, meta)
+            return self._build_response(request, entry['value'], entry['elapsed'])
+
+        start = time.time()
+        response = self._original_send(session, request, **kwargs)
+        elapsed = time.time() - start
+        try:
+            content = response.content  # consome o corpo (inclusive com stream=True)
+            self._record(tape, key, {
+                'status': response.status_code,
+                'reason': response.reason,
+                'url': self._redact_url(response.url),
+                'headers': {k: v for k, v in response.headers.items() if k.lower() in _KEPT_HEADERS},
+                'encoding': response.encoding,
+                'content': base64.b64encode(content or b'').decode('ascii')
+            }, elapsed, meta)
+        except Exception as e:
+            logger.warning(f"⚠️ Cassette não gravou {meta['url']}: {e}")
+        return response
+
+    def _build_response(self, request, data: Dict[str, Any], elapsed: float):
+        response = requests.Response()
+        response.status_code = data['status']
+        response.reason = data.get('reason')
+        response.url = request.url
+        response.request = request
+        response.headers = CaseInsensitiveDict(data.get('headers', {}))
+        response.encoding = data.get('encoding')
+        response._content = base64.b64decode(data['content'])
+        response._content_consumed = True
+        response.elapsed = timedelta(seconds=elapsed)
+        return response
+
+    def install(self):
+        """Intercepta requests.Session.send (usado por requests.get/post e por Sessions)"""
+        if not HAS_REQUESTS or self._original_send is not None:
+            return
+        original = requests.Session.send
+        self._original_send = original
+        cassette = self
+
+        def send(session, request, **kwargs):
+            return cassette._send(session, request, **kwargs)
+
+        requests.Session.send = send
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado e contadores do cassete"""
+        with self._lock:
+            names = sorted(self._tapes)
+        return {'mode': self.mode, 'cassettes': names, 'emulate_latency': self.emulate_latency, **self.stats}
+
+
+# Instância global
+cassette = Cassette()
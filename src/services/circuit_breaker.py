@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Circuit Breaker
+Estado de saúde dos provedores (fechado/aberto/meio-aberto) compartilhado entre workers
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+_CIRCUIT_OPEN_MARKER = 'circuito aberto'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS circuit_state (
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'closed',
+    failures INTEGER NOT NULL DEFAULT 0,
+    window_start REAL NOT NULL DEFAULT 0,
+    opened_at REAL NOT NULL DEFAULT 0,
+    probe_owner TEXT,
+    probe_until REAL NOT NULL DEFAULT 0,
+    total_failures INTEGER NOT NULL DEFAULT 0,
+    times_opened INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, name)
+);
+"""
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada porque o circuito do provedor está aberto"""
+
+
+def is_circuit_open_error(error: Any) -> bool:
+    """Indica se o erro (exceção ou mensagem) é de circuito aberto"""
+    return isinstance(error, CircuitOpenError) or _CIRCUIT_OPEN_MARKER in str(error)
+
+
+class CircuitBreaker:
+    """Circuit breaker por provedor com estado em SQLite.
+
+    Uma falha registrada por qualquer worker conta para todos: quando o circuito
+    abre, todos os processos deixam de chamar o provedor até o reset_timeout.
+    Depois disso apenas um chamador (o "probe") é liberado em meio-aberto; seu
+    sucesso fecha o circuito e sua falha o reabre.
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        failure_threshold: int = 3,
+        failure_window: float = 60,
+        reset_timeout: float = 60,
+        probe_timeout: float = 120,
+        db_path: Optional[str] = None
+    ):
+        """Inicializa o circuit breaker de um escopo (ex.: 'ai', 'search')"""
+        self.scope = scope
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.reset_timeout = float(os.getenv('CIRCUIT_RESET_TIMEOUT', reset_timeout))
+        self.probe_timeout = probe_timeout
+        self.db_path = Path(db_path or os.getenv('CIRCUIT_BREAKER_PATH', 'cache/circuit_breaker.sqlite3'))
+        self._local = threading.local()
+        self.enabled = True
+
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection()
+            logger.info(f"✅ Circuit Breaker '{scope}' inicializado: {self.db_path}")
+        except Exception as e:
+            logger.warning(f"⚠️ Circuit Breaker '{scope}' desabilitado: {e}")
+            self.enabled = False
+
+    def _connection(self) -> sqlite3.Connection:
+        """Retorna conexão da thread atual (recriada após fork)"""
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != pid:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    @staticmethod
+    def _owner() -> str:
+        return f"{os.getpid()}:{threading.get_ident()}"
+
+    def _row(self, conn: sqlite3.Connection, name: str) -> Dict[str, Any]:
+        row = conn.execute(
+            "SELECT state, failures, window_start, opened_at, probe_owner, probe_until "
+            "FROM circuit_state WHERE scope = ? AND name = ?",
+            (self.scope, name)
+        ).fetchone()
+        if not row:
+            return {'state': CLOSED, 'failures': 0, 'window_start': 0.0,
+                    'opened_at': 0.0, 'probe_owner': None, 'probe_until': 0.0}
+        keys = ('state', 'failures', 'window_start', 'opened_at', 'probe_owner', 'probe_until')
+        return dict(zip(keys, row))
+
+    def _ensure(self, conn: sqlite3.Connection, name: str):
+        conn.execute(
+            "INSERT INTO circuit_state (scope, name) VALUES (?, ?) ON CONFLICT(scope, name) DO NOTHING",
+            (self.scope, name)
+        )
+
+    def available(self, name: str) -> bool:
+        """Consulta sem efeitos colaterais: o provedor pode ser considerado para roteamento?"""
+        if not self.enabled:
+            return True
+        try:
+            row = self._row(self._connection(), name)
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao ler circuito {self.scope}/{name}: {e}")
+            return True
+
+        now = time.time()
+        if row['state'] == OPEN:
+            return now - row['opened_at'] >= self.reset_timeout
+        if row['state'] == HALF_OPEN:
+            return row['probe_until'] < now
+        return True
+
+    def allow(self, name: str) -> bool:
+        """Autoriza uma chamada real; em meio-aberto apenas um chamador recebe a vaga de probe"""
+        if not self.enabled:
+            return True
+
+        try:
+            conn = self._connection()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._row(conn, name)
+                state = row['state']
+                allowed = True
+
+                if state == OPEN:
+                    allowed = now - row['opened_at'] >= self.reset_timeout
+                elif state == HALF_OPEN:
+                    allowed = row['probe_until'] < now or row['probe_owner'] == self._owner()
+
+                if allowed and state != CLOSED:
+                    self._ensure(conn, name)
+                    conn.execute(
+                        "UPDATE circuit_state SET state = ?, probe_owner = ?, probe_until = ? "
+                        "WHERE scope = ? AND name = ?",
+                        (HALF_OPEN, self._owner(), now + self.probe_timeout, self.scope, name)
+                    )
+                    logger.info(f"🔌 Circuito {self.scope}/{name} meio-aberto: testando com uma chamada")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return allowed
+
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao consultar circuito {self.scope}/{name}: {e}")
+            return True
+
+    def check(self, name: str):
+        """Levanta CircuitOpenError se a chamada não for autorizada"""
+        if not self.allow(name):
+            raise CircuitOpenError(f"{name}: {_CIRCUIT_OPEN_MARKER}, chamada evitada")
+
+    def record_success(self, name: str):
+        """Fecha o circuito e zera a contagem de falhas"""
+        if not self.enabled:
+            return
+        try:
+            conn = self._connection()
+            row = self._row(conn, name)
+            if row['state'] == CLOSED and not row['failures']:
+                return
+            self._ensure(conn, name)
+            conn.execute(
+                "UPDATE circuit_state SET state = ?, failures = 0, probe_owner = NULL, probe_until = 0 "
+                "WHERE scope = ? AND name = ?",
+                (CLOSED, self.scope, name)
+            )
+            if row['state'] != CLOSED:
+                logger.info(f"✅ Circuito {self.scope}/{name} fechado")
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao registrar sucesso no circuito {self.scope}/{name}: {e}")
+
+    def release(self, name: str):
+        """Devolve a vaga de probe deste chamador sem registrar desfecho.
+
+        Usado quando a chamada terminou por motivo que não diz nada sobre a saúde
+        do provedor (limite de taxa, prompt grande demais): o circuito segue
+        meio-aberto e o próximo chamador pode testar sem esperar o probe_timeout.
+        """
+        if not self.enabled:
+            return
+        try:
+            self._connection().execute(
+                "UPDATE circuit_state SET probe_owner = NULL, probe_until = 0 "
+                "WHERE scope = ? AND name = ? AND state = ? AND probe_owner = ?",
+                (self.scope, name, HALF_OPEN, self._owner())
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao liberar probe do circuito {self.scope}/{name}: {e}")
+
+    def record_failure(self, name: str, threshold: Optional[int] = None):
+        """Conta uma falha na janela corrente; abre o circuito ao atingir o limite"""
+        if not self.enabled:
+            return
+        threshold = threshold or self.failure_threshold
+
+        try:
+            conn = self._connection()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._ensure(conn, name)
+                row = self._row(conn, name)
+
+                if row['state'] == HALF_OPEN or (row['state'] == OPEN and now - row['opened_at'] >= self.reset_timeout):
+                    # Probe falhou: reabre por mais um reset_timeout
+                    failures, window_start, opens = row['failures'] + 1, row['window_start'], True
+                elif row['state'] == OPEN:
+                    failures, window_start, opens = row['failures'] + 1, row['window_start'], False
+                else:
+                    if now - row['window_start'] > self.failure_window:
+                        failures, window_start = 1, now
+                    else:
+                        failures, window_start = row['failures'] + 1, row['window_start']
+                    opens = failures >= threshold
+
+                if opens:
+                    conn.execute(
+                        "UPDATE circuit_state SET state = ?, failures = ?, window_start = ?, opened_at = ?, "
+                        "probe_owner = NULL, probe_until = 0, total_failures = total_failures + 1, "
+                        "times_opened = times_opened + 1 WHERE scope = ? AND name = ?",
+                        (OPEN, failures, window_start, now, self.scope, name)
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE circuit_state SET failures = ?, window_start = ?, "
+                        "total_failures = total_failures + 1 WHERE scope = ? AND name = ?",
+                        (failures, window_start, self.scope, name)
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            if opens:
+                logger.warning(
+                    f"⚠️ Circuito {self.scope}/{name} aberto após {failures} falhas "
+                    f"(nova tentativa em {self.reset_timeout:.0f}s)"
+                )
+
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao registrar falha no circuito {self.scope}/{name}: {e}")
+
+    def reset(self, name: Optional[str] = None):
+        """Fecha o circuito de um provedor (ou de todos do escopo)"""
+        if not self.enabled:
+            return
+        try:
+            conn = self._connection()
+            if name:
+                conn.execute("DELETE FROM circuit_state WHERE scope = ? AND name = ?", (self.scope, name))
+            else:
+                conn.execute("DELETE FROM circuit_state WHERE scope = ?", (self.scope,))
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao resetar circuito {self.scope}/{name or '*'}: {e}")
+
+    def get_state(self, name: str) -> Dict[str, Any]:
+        """Retorna o estado do circuito de um provedor"""
+        state = {'state': CLOSED, 'failures': 0, 'total_failures': 0, 'times_opened': 0, 'retry_in': 0.0}
+        if not self.enabled:
+            return state
+        try:
+            row = self._connection().execute(
+                "SELECT state, failures, opened_at, total_failures, times_opened "
+                "FROM circuit_state WHERE scope = ? AND name = ?",
+                (self.scope, name)
+            ).fetchone()
+            if row:
+                state.update({
+                    'state': row[0],
+                    'failures': row[1],
+                    'total_failures': row[3],
+                    'times_opened': row[4],
+                    'retry_in': round(max(0.0, row[2] + self.reset_timeout - time.time()), 1) if row[0] == OPEN else 0.0
+                })
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao ler circuito {self.scope}/{name}: {e}")
+        return state
@@ -13,6 +13,7 @@ from typing import Optional, Dict, Any
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 import re
+from services.http_fetcher import http_fetcher
 
 logger = logging.getLogger(__name__)
 
@@ -86,11 +87,7 @@ class ContentExtractor:
             
             jina_url = f"{self.jina_reader_url}{url}"
             
-            response = requests.get(
-                jina_url,
-                headers=headers,
-                timeout=60
-            )
+            response = http_fetcher.fetch(jina_url, headers=headers, timeout=60)
             
             if response.status_code == 200:
                 content = response.text
@@ -109,12 +106,7 @@ class ContentExtractor:
     def _extract_direct(self, url: str) -> Optional[str]:
         """Extração direta usando BeautifulSoup"""
         try:
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=20,
-                allow_redirects=True
-            )
+            response = http_fetcher.fetch(url, headers=self.headers, timeout=20)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
@@ -154,12 +146,7 @@ class ContentExtractor:
     def _extract_with_readability(self, url: str) -> Optional[str]:
         """Extração usando algoritmo de readability"""
         try:
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=20,
-                allow_redirects=True
-            )
+            response = http_fetcher.fetch(url, headers=self.headers, timeout=20)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
@@ -201,12 +188,7 @@ class ContentExtractor:
     def _extract_fallback(self, url: str) -> Optional[str]:
         """Extração de fallback mais agressiva"""
         try:
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=15,
-                allow_redirects=True
-            )
+            response = http_fetcher.fetch(url, headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
@@ -267,12 +249,7 @@ class ContentExtractor:
     def extract_metadata(self, url: str) -> Dict[str, Any]:
         """Extrai metadados da página"""
         try:
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=15,
-                allow_redirects=True
-            )
+            response = http_fetcher.fetch(url, headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
@@ -342,12 +319,7 @@ class ContentExtractor:
     def extract_links(self, url: str, internal_only: bool = True) -> list:
         """Extrai links da página"""
         try:
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=15,
-                allow_redirects=True
-            )
+            response = http_fetcher.fetch(url, headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
@@ -15,6 +15,9 @@ import json
 from datetime import datetime
 from bs4 import BeautifulSoup
 import re
+from services.search_cache import search_cache
+from services.rate_limiter import rate_limiter
+from services.http_fetcher import http_fetcher
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +43,8 @@ class DeepSearchService:
             'DNT': '1',
             'Connection': 'keep-alive'
         }
+        # Raspagem dos buscadores passa pelo limite de taxa por host
+        self.session = rate_limiter.session(self.headers)
         
         logger.info("🚀 DeepSearch Service REAL inicializado - SEM CACHE OU SIMULAÇÃO")
     
@@ -63,19 +68,16 @@ class DeepSearchService:
                 logger.info("🌐 Executando Google Custom Search REAL...")
                 google_results = self._google_search_real(query, max_results // 2)
                 search_results.extend(google_results)
-                time.sleep(1)  # Rate limiting
             
             # 2. BUSCA REAL COM BING
             logger.info("🔍 Executando Bing Search REAL...")
             bing_results = self._bing_search_real(query, max_results // 3)
             search_results.extend(bing_results)
-            time.sleep(1)
             
             # 3. BUSCA REAL COM DUCKDUCKGO
             logger.info("🦆 Executando DuckDuckGo Search REAL...")
             ddg_results = self._duckduckgo_search_real(query, max_results // 3)
             search_results.extend(ddg_results)
-            time.sleep(1)
             
             # 4. EXTRAI CONTEÚDO REAL DAS PÁGINAS ENCONTRADAS
             content_results = []
@@ -92,7 +94,6 @@ class DeepSearchService:
                         'relevance_score': self._calculate_real_relevance(content, query, context_data),
                         'source_engine': result.get('source', 'unknown')
                     })
-                    time.sleep(0.5)  # Rate limiting
             
             # 5. PROCESSA COM ANÁLISE REAL
             processed_content = self._process_real_content(query, context_data, content_results)
@@ -107,6 +108,8 @@ class DeepSearchService:
             logger.error(f"❌ ERRO CRÍTICO na busca profunda REAL: {str(e)}", exc_info=True)
             return self._generate_real_emergency_search(query, context_data)
     
+    @search_cache.cached('deep', 'google')
+    @rate_limiter.limited('google')
     def _google_search_real(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca REAL usando Google Custom Search API"""
         
@@ -154,17 +157,15 @@ class DeepSearchService:
             logger.error(f"❌ Erro no Google Search REAL: {str(e)}")
             return []
     
+    @search_cache.cached('deep', 'bing')
+    @rate_limiter.limited('bing')
     def _bing_search_real(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca REAL usando Bing"""
         
         try:
             search_url = f"https://www.bing.com/search?q={quote_plus(query)}&cc=br&setlang=pt-br&count={max_results}"
             
-            response = requests.get(
-                search_url,
-                headers=self.headers,
-                timeout=15
-            )
+            response = self.session.get(search_url, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -199,17 +200,15 @@ class DeepSearchService:
             logger.error(f"❌ Erro no Bing Search REAL: {str(e)}")
             return []
     
+    @search_cache.cached('deep', 'duckduckgo')
+    @rate_limiter.limited('duckduckgo')
     def _duckduckgo_search_real(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca REAL usando DuckDuckGo"""
         
         try:
             search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
             
-            response = requests.get(
-                search_url,
-                headers=self.headers,
-                timeout=15
-            )
+            response = self.session.get(search_url, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -272,11 +271,7 @@ class DeepSearchService:
             
             jina_url = f"{self.jina_reader_url}{url}"
             
-            response = requests.get(
-                jina_url,
-                headers=headers,
-                timeout=30
-            )
+            response = http_fetcher.fetch(jina_url, headers=headers, timeout=30)
             
             if response.status_code == 200:
                 content = response.text
@@ -298,12 +293,7 @@ class DeepSearchService:
         """Extração REAL direta usando requests + BeautifulSoup"""
         
         try:
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=20,
-                allow_redirects=True
-            )
+            response = http_fetcher.fetch(url, headers=self.headers, timeout=20)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
@@ -12,6 +12,7 @@ import json
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from services.ai_manager import ai_manager
+from services.prompt_budgeter import prompt_budgeter
 from services.production_search_manager import production_search_manager
 from services.content_extractor import content_extractor
 from services.ultra_detailed_analysis_engine import ultra_detailed_analysis_engine
@@ -186,21 +187,36 @@ class EnhancedAnalysisEngine:
             # Prepara contexto de pesquisa
             search_context = ""
             
-            # Combina conteúdo extraído
+            # Resumo dos resultados de busca (parte fixa do contexto)
+            search_summary = ""
+            if research_data.get("search_results"):
+                search_summary += f"RESULTADOS DE BUSCA ({len(research_data['search_results'])} fontes):\n"
+                for result in research_data["search_results"][:15]:
+                    search_summary += f"• {result['title']} - {result['snippet'][:200]}\n"
+                search_summary += "\n"
+            
+            # Combina conteúdo extraído dentro do orçamento de tokens do provedor
             if research_data.get("extracted_content"):
-                search_context += "PESQUISA PROFUNDA REALIZADA:\n\n"
+                provider = ai_manager.get_best_provider()
+                reserved = prompt_budgeter.estimate_tokens(
+                    self._build_comprehensive_analysis_prompt(data, search_summary), provider
+                )
+                budget = prompt_budgeter.available_budget(provider, max_output_tokens=8192, reserved_tokens=reserved)
                 
-                for i, content_item in enumerate(research_data["extracted_content"][:10], 1):
-                    search_context += f"--- FONTE {i}: {content_item['title']} ---\n"
-                    search_context += f"URL: {content_item['url']}\n"
-                    search_context += f"Conteúdo: {content_item['content'][:1500]}\n\n"
+                def format_source(i: int, item: Dict[str, Any], content: str) -> str:
+                    return (
+                        f"--- FONTE {i}: {item.get('title', '')} ---\n"
+                        f"URL: {item.get('url', '')}\n"
+                        f"Conteúdo: {content}\n\n"
+                    )
+                
+                search_context += "PESQUISA PROFUNDA REALIZADA:\n\n"
+                search_context += prompt_budgeter.build_context(
+                    research_data["extracted_content"], budget, format_source, provider,
+                    keywords=[data.get('segmento'), data.get('produto'), data.get('publico')]
+                )
             
-            # Adiciona informações dos resultados de busca
-            if research_data.get("search_results"):
-                search_context += f"RESULTADOS DE BUSCA ({len(research_data['search_results'])} fontes):\n"
-                for result in research_data["search_results"][:15]:
-                    search_context += f"• {result['title']} - {result['snippet'][:200]}\n"
-                search_context += "\n"
+            search_context += search_summary
             
             # Constrói prompt ultra-detalhado
             prompt = self._build_comprehensive_analysis_prompt(data, search_context)
@@ -209,7 +225,8 @@ class EnhancedAnalysisEngine:
             logger.info("🤖 Executando análise com AI Manager...")
             ai_response = ai_manager.generate_analysis(
                 prompt,
-                max_tokens=8192
+                max_tokens=8192,
+                component='enhanced_analysis'
             )
             
             if ai_response:
@@ -244,7 +261,7 @@ Você é o DIRETOR SUPREMO DE ANÁLISE DE MERCADO, um especialista de elite com
 - **Dados Adicionais**: {data.get('dados_adicionais', 'Não informado')}
 
 ## CONTEXTO DE PESQUISA REAL:
-{search_context[:12000] if search_context else "Nenhuma pesquisa realizada"}
+{search_context if search_context else "Nenhuma pesquisa realizada"}
 
 ## INSTRUÇÕES CRÍTICAS:
 
@@ -12,6 +12,7 @@ from datetime import datetime
 from services.psychological_agents import psychological_agents
 from services.ultra_detailed_analysis_engine import ultra_detailed_analysis_engine
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from services.cassette import cassette
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +42,16 @@ class EnhancedAnalysisOrchestrator:
         progress_callback: Optional[callable] = None
     ) -> Dict[str, Any]:
         """Executa análise ultra-aprimorada com agentes psicológicos"""
+        # Cassete da sessão cobre também os agentes psicológicos após a análise base
+        with cassette.session(session_id or f"orchestrator_{int(time.time())}"):
+            return self._execute_ultra_enhanced_analysis(data, session_id, progress_callback)
+
+    def _execute_ultra_enhanced_analysis(
+        self,
+        data: Dict[str, Any],
+        session_id: str = None,
+        progress_callback: Optional[callable] = None
+    ) -> Dict[str, Any]:
         
         logger.info("🚀 Iniciando análise ultra-aprimorada com agentes psicológicos")
         start_time = time.time()
@@ -8,11 +8,11 @@ Serviço aprimorado de tendências com múltiplas fontes e fallbacks
 import os
 import logging
 import time
-import requests
 import random
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import json
+from services.rate_limiter import rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +21,8 @@ class EnhancedTrendsService:
     
     def __init__(self):
         """Inicializa o serviço de tendências"""
-        self.session = requests.Session()
+        # Raspagem passa pelo limite de taxa por host
+        self.session = rate_limiter.session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -94,9 +95,6 @@ class EnhancedTrendsService:
                     trends_data['fontes_consultadas'].append(source_name)
                     logger.info(f"✅ {source_name}: {len(source_trends)} tendências encontradas")
                 
-                # Delay entre fontes
-                time.sleep(random.uniform(1.0, 3.0))
-                
             except Exception as e:
                 logger.error(f"❌ Erro em {source_name}: {str(e)}")
                 self._handle_source_error(source_name, e)
@@ -126,9 +124,6 @@ class EnhancedTrendsService:
             
             for query in search_queries:
                 try:
-                    # Delay para evitar rate limiting
-                    time.sleep(random.uniform(2.0, 4.0))
-                    
                     search_url = f"https://www.google.com/search?q={query}&tbm=nws&tbs=qdr:m3"
                     
                     response = self.session.get(search_url, timeout=15)
@@ -151,8 +146,8 @@ class EnhancedTrendsService:
                                 })
                     
                     elif response.status_code == 429:
-                        logger.warning(f"⚠️ Rate limit detectado para Google Trends, aguardando...")
-                        time.sleep(random.uniform(10.0, 20.0))
+                        # O rate limiter já adia as próximas requisições ao host
+                        logger.warning(f"⚠️ Rate limit detectado para Google Trends")
                         continue
                     
                 except Exception as e:
@@ -180,8 +175,6 @@ class EnhancedTrendsService:
             
             for term in search_terms:
                 try:
-                    time.sleep(random.uniform(1.5, 3.0))
-                    
                     # Busca geral para identificar tendências
                     search_url = f"https://www.google.com/search?q={term}+2024"
                     
@@ -232,8 +225,6 @@ class EnhancedTrendsService:
             
             for query in social_queries:
                 try:
-                    time.sleep(random.uniform(1.0, 2.5))
-                    
                     # Busca social trends
                     search_url = f"https://www.google.com/search?q={query}&tbm=nws"
                     
@@ -64,7 +64,9 @@ class ForensicCPLAnalyzer:
             forensic_prompt = self._build_forensic_prompt(transcription, context_data)
             
             # Executa análise forense com IA
-            response = ai_manager.generate_analysis(forensic_prompt, max_tokens=8192)
+            response = ai_manager.stream_analysis_to_session(
+                forensic_prompt, session_id, 'forense_cpl', max_tokens=8192
+            )
             
             if not response:
                 raise Exception("ARQUEÓLOGO FALHOU: IA não respondeu para análise forense")
@@ -7,10 +7,12 @@ Cliente para interagir com a API da Groq, servindo como um provedor de IA de alt
 import os
 import logging
 import time
-from typing import Optional
+import asyncio
+import weakref
+from typing import Optional, Iterator
 
 try:
-    from groq import Groq
+    from groq import Groq, AsyncGroq
     HAS_GROQ = True
 except ImportError:
     HAS_GROQ = False
@@ -25,6 +27,8 @@ class GroqClient:
         self.api_key = os.getenv('GROQ_API_KEY')
         self.client = None
         self.available = False
+        # Clientes assíncronos por event loop (o pool de conexões é ligado ao loop)
+        self._async_clients = weakref.WeakKeyDictionary()
         
         if not self.api_key:
             logger.info("ℹ️ GROQ_API_KEY não configurada - Groq desabilitado")
@@ -61,13 +65,19 @@ class GroqClient:
         """Verifica se o cliente está configurado e pronto para uso."""
         return self.available and self.client is not None
 
-    def generate(self, prompt: str, max_tokens: int = 8192) -> Optional[str]:
+    @staticmethod
+    def _response_format(json_mode: bool) -> dict:
+        """Parâmetro do modo JSON da API (compatível com OpenAI)"""
+        return {"response_format": {"type": "json_object"}} if json_mode else {}
+
+    def generate(self, prompt: str, max_tokens: int = 8192, json_mode: bool = False) -> Optional[str]:
         """
         Gera texto usando um modelo da Groq.
 
         Args:
             prompt (str): O prompt para a geração de texto.
             max_tokens (int): O número máximo de tokens a serem gerados.
+            json_mode (bool): Exige resposta em JSON válido (response_format json_object).
 
         Returns:
             Optional[str]: O texto gerado ou None em caso de falha.
@@ -88,6 +98,7 @@ class GroqClient:
                 model="llama3-70b-8192",
                 max_tokens=max_tokens,
                 temperature=0.4, # Temperatura um pouco mais baixa para consistência
+                **self._response_format(json_mode)
             )
             response_text = chat_completion.choices[0].message.content
             processing_time = time.time() - start_time
@@ -97,5 +108,80 @@ class GroqClient:
             logger.error(f"❌ Erro na chamada da API Groq: {e}", exc_info=True)
             raise
 
+    async def agenerate(self, prompt: str, max_tokens: int = 8192, json_mode: bool = False) -> Optional[str]:
+        """
+        Versão assíncrona de generate, com conexões reaproveitadas por event loop.
+
+        Args:
+            prompt (str): O prompt para a geração de texto.
+            max_tokens (int): O número máximo de tokens a serem gerados.
+            json_mode (bool): Exige resposta em JSON válido (response_format json_object).
+
+        Returns:
+            Optional[str]: O texto gerado.
+        """
+        if not self.is_enabled():
+            raise Exception("Cliente Groq não está habilitado ou configurado corretamente.")
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncGroq(api_key=self.api_key)
+            self._async_clients[loop] = client
+
+        start_time = time.time()
+        chat_completion = await client.chat.completions.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            model="llama3-70b-8192",
+            max_tokens=max_tokens,
+            temperature=0.4,
+            **self._response_format(json_mode)
+        )
+        response_text = chat_completion.choices[0].message.content
+        logger.info(f"✅ Groq (async) gerou {len(response_text)} caracteres em {time.time() - start_time:.2f}s")
+        return response_text
+
+    def generate_stream(self, prompt: str, max_tokens: int = 8192, json_mode: bool = False) -> Iterator[str]:
+        """
+        Gera texto em streaming usando um modelo da Groq.
+
+        Args:
+            prompt (str): O prompt para a geração de texto.
+            max_tokens (int): O número máximo de tokens a serem gerados.
+            json_mode (bool): Exige resposta em JSON válido (response_format json_object).
+
+        Yields:
+            str: Trechos de texto à medida que são gerados.
+        """
+        if not self.is_enabled():
+            raise Exception("Cliente Groq não está habilitado ou configurado corretamente.")
+
+        start_time = time.time()
+        total_chars = 0
+        stream = self.client.chat.completions.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            model="llama3-70b-8192",
+            max_tokens=max_tokens,
+            temperature=0.4,
+            stream=True,
+            **self._response_format(json_mode)
+        )
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                total_chars += len(delta)
+                yield delta
+        logger.info(f"✅ Groq transmitiu {total_chars} caracteres em {time.time() - start_time:.2f}s")
+
 # Instância singleton
 groq_client = GroqClient()
@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - HTTP Fetcher
+Motor único de download de páginas: assíncrono, com pool de conexões, HTTP/2 e limites por host
+"""
+
+import os
+import time
+import base64
+import random
+import socket
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+from services.cassette import cassette
+from services.rate_limiter import rate_limiter
+from services.page_cache import page_cache, CACHED_HEADERS
+
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+    import httpcore
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+try:
+    import h2  # noqa: F401 - habilita http2=True no httpx
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+# Cabeçalhos de conexão (HTTP/1.1) proibidos no HTTP/2; o pool cuida do keep-alive
+_HOP_BY_HOP = {'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'}
+
+# Cabeçalhos de resposta preservados (inclui os usados pelo cache de páginas)
+_KEPT_HEADERS = set(CACHED_HEADERS) | {'content-length', 'retry-after', 'location'}
+
+# Tipos de conteúdo aceitos por padrão (binários como imagens e zips são abortados)
+DEFAULT_ACCEPT = ('html', 'text', 'pdf')
+
+# Bytes iniciais usados para identificar o tipo real do conteúdo
+_SNIFF_BYTES = 1024
+_BINARY_MAGIC = (b'\x89PNG', b'\xff\xd8\xff', b'GIF8', b'RIFF', b'PK\x03\x04', b'\x1f\x8b', b'ID3', b'OggS', b'7z\xbc\xaf')
+_HTML_MARKERS = (b'<!doctype html', b'<html', b'<head', b'<body', b'<meta', b'<title')
+_TEXT_MIMES = ('application/json', 'application/xml', 'application/rss+xml', 'application/atom+xml', 'application/javascript')
+
+_MB = 1024 * 1024
+
+
+def sniff_kind(content_type: Optional[str], head: bytes) -> str:
+    """Tipo real do conteúdo ('html', 'pdf', 'text' ou 'binary') pelos bytes
+    iniciais, com o Content-Type como desempate.
+
+    Um corpo que começa com %PDF- é PDF; a assinatura mais adiante nos bytes
+    iniciais (lixo antes do cabeçalho, tolerado pelos leitores de PDF) só conta
+    se o servidor não declarou HTML, para que uma página citando "%PDF-" não
+    seja tratada como PDF.
+    """
+    mime = (content_type or '').split(';')[0].strip().lower()
+    start = head.lstrip(b'\xef\xbb\xbf \t\r\n')
+    if start.startswith(b'%PDF-'):
+        return 'pdf'
+    if mime not in ('text/html', 'application/xhtml+xml') and b'%PDF-' in head[:_SNIFF_BYTES]:
+        return 'pdf'
+    if start.startswith(_BINARY_MAGIC):
+        return 'binary'
+    if any(marker in start[:512].lower() for marker in _HTML_MARKERS):
+        return 'html'
+    if mime in ('text/html', 'application/xhtml+xml'):
+        return 'html'
+    if mime.startswith('text/') or mime in _TEXT_MIMES:
+        return 'text'
+    if mime in ('', 'application/octet-stream') and b'\x00' not in head[:_SNIFF_BYTES]:
+        return 'text'
+    return 'binary'
+
+# Status que valem nova tentativa (com backoff exponencial)
+_RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """Falha de rede após esgotar as tentativas"""
+
+
+class PayloadRejected(FetchError):
+    """Download abortado: tipo de conteúdo não aceito ou corpo acima do limite"""
+
+
+class FetchResponse:
+    """Resposta de um download (subconjunto da interface de requests.Response)"""
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], content: bytes,
+                 encoding: Optional[str] = None, from_cache: bool = False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    @property
+    def kind(self) -> str:
+        """'html', 'pdf', 'text' ou 'binary' (ver sniff_kind)"""
+        return sniff_kind(self.headers.get('content-type'), self.content[:_SNIFF_BYTES])
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise FetchError(f"HTTP {self.status_code} para {self.url}")
+
+
+class _DNSCache:
+    """Cache com TTL das resoluções de nome feitas pelo transporte do fetcher"""
+
+    def __init__(self, ttl: float, max_entries: int = 2048):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, list]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        """Endereços IP do host (resolução do sistema, fora do event loop)"""
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (now + self.ttl, addresses)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return addresses
+
+
+if HAS_HTTPX:
+    class _CachedDNSBackend(httpcore.AsyncNetworkBackend):
+        """Backend de rede do pool httpx que resolve nomes pelo _DNSCache.
+
+        Conecta direto ao IP; o TLS continua usando o nome do host (SNI e
+        verificação do certificado), então só o getaddrinfo é evitado. Vale
+        apenas para o cliente do fetcher, não para o resto do processo.
+        """
+
+        def __init__(self, dns_cache: _DNSCache):
+            self.dns_cache = dns_cache
+            self._backend = httpcore.AnyIOBackend()
+
+        async def connect_tcp(self, host: str, port: int, timeout: Optional[float] = None, **kwargs):
+            last_error: Optional[BaseException] = None
+            for address in await self.dns_cache.resolve(host, port):
+                try:
+                    return await self._backend.connect_tcp(address, port, timeout=timeout, **kwargs)
+                except (httpcore.ConnectError, httpcore.ConnectTimeout, OSError) as e:
+                    last_error = e
+            raise httpcore.ConnectError(f"Não foi possível conectar a {host}:{port}: {last_error}")
+
+        async def connect_unix_socket(self, path: str, timeout: Optional[float] = None, **kwargs):
+            return await self._backend.connect_unix_socket(path, timeout=timeout, **kwargs)
+
+        async def sleep(self, seconds: float) -> None:
+            await self._backend.sleep(seconds)
+
+
+class _BodyReader:
+    """Acumula o corpo em streaming: decide o tipo pelos primeiros bytes e
+    aborta cedo conteúdos não aceitos ou maiores que o limite"""
+
+    def __init__(self, headers, accept: Optional[Tuple[str, ...]], limits: Dict[str, int], max_bytes: Optional[int]):
+        self.content_type = headers.get('content-type')
+        length = headers.get('content-length') or ''
+        self.content_length = int(length) if length.isdigit() else None
+        self.accept = accept
+        self.limits = limits
+        self.max_bytes = max_bytes
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.kind: Optional[str] = None
+        self.limit: Optional[int] = None
+        self.rejected: Optional[str] = None
+
+    def _decide(self):
+        self.kind = sniff_kind(self.content_type, b''.join(self.chunks)[:_SNIFF_BYTES])
+        self.limit = self.max_bytes or self.limits.get(self.kind, self.limits['default'])
+        if self.accept is not None and self.kind not in self.accept:
+            self.rejected = f"tipo {self.kind} ({self.content_type or 'sem Content-Type'}) não aceito"
+        elif self.content_length is not None and self.content_length > self.limit:
+            self.rejected = f"Content-Length de {self.content_length // 1024} KB acima do limite de {self.limit // 1024} KB"
+
+    def feed(self, chunk: bytes) -> bool:
+        """Adiciona um trecho; False quando o download deve ser abortado"""
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        if self.kind is None and self.size >= _SNIFF_BYTES:
+            self._decide()
+        if self.rejected is None and self.limit is not None and self.size > self.limit:
+            self.rejected = f"corpo acima do limite de {self.limit // 1024} KB"
+        return self.rejected is None
+
+    def finish(self):
+        if self.kind is None:
+            self._decide()
+
+    def body(self) -> bytes:
+        return b'' if self.rejected else b''.join(self.chunks)
+
+
+class HttpFetcher:
+    """Downloads de páginas compartilhados por todos os extratores.
+
+    Um event loop dedicado (thread própria) mantém um httpx.AsyncClient com
+    conexões keep-alive reaproveitadas e HTTP/2 quando o pacote h2 existe.
+    Cada host tem um limite de downloads simultâneos e passa pelo rate limiter;
+    falhas transitórias (rede, 429, 5xx) são repetidas com backoff exponencial
+    com jitter. Sem httpx, usa um requests.Session com pool e as mesmas regras.
+    Respostas passam pelo page_cache: cópias válidas não vão à rede e cópias
+    vencidas são revalidadas com GET condicional.
+
+    Os corpos são lidos em streaming: o tipo real vem dos primeiros bytes
+    (sniff_kind) e o download é abortado cedo (PayloadRejected) para tipos
+    fora de `accept` ou corpos acima de FETCH_MAX_MB (FETCH_MAX_PDF_MB para
+    PDFs), limitando memória e banda por URL.
+
+    fetch() é síncrono (para os extratores existentes) e fetch_many() baixa um
+    lote inteiro de URLs concorrentemente.
+    """
+
+    def __init__(self):
+        """Inicializa o motor de download"""
+        self.timeout = float(os.getenv('FETCH_TIMEOUT', 30))
+        self.max_retries = int(os.getenv('FETCH_MAX_RETRIES', 3))
+        self.backoff_base = float(os.getenv('FETCH_BACKOFF_BASE', 0.5))
+        self.backoff_max = float(os.getenv('FETCH_BACKOFF_MAX', 8))
+        self.per_host = int(os.getenv('FETCH_PER_HOST_CONCURRENCY', 4))
+        self.max_connections = int(os.getenv('FETCH_MAX_CONNECTIONS', 100))
+        # Certificados são verificados por padrão; FETCH_VERIFY_SSL=false desativa (só para ambientes controlados)
+        self.verify = os.getenv('FETCH_VERIFY_SSL', 'true').lower() == 'true'
+        if not self.verify:
+            logger.warning("⚠️ HTTP Fetcher com verificação de certificados SSL desativada (FETCH_VERIFY_SSL=false)")
+        self.http2 = HAS_HTTP2 and os.getenv('FETCH_HTTP2', 'true').lower() == 'true'
+        self.size_limits = {
+            'default': int(float(os.getenv('FETCH_MAX_MB', 5)) * _MB),
+            'pdf': int(float(os.getenv('FETCH_MAX_PDF_MB', 30)) * _MB)
+        }
+
+        # Cache de DNS só no transporte httpx do fetcher (não altera socket.getaddrinfo do processo)
+        dns_ttl = float(os.getenv('DNS_CACHE_TTL', 300))
+        self.dns_cache = _DNSCache(dns_ttl) if dns_ttl > 0 and HAS_HTTPX else None
+        # Folga além de tentativas + backoffs para a espera na fila do host e no rate limiter
+        self.queue_margin = float(os.getenv('FETCH_QUEUE_MARGIN', 60))
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+        self._host_slots: Dict[str, Any] = {}
+        self._session = None
+        self._sync_pool: Optional[ThreadPoolExecutor] = None
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'rejected': 0, 'bytes': 0}
+
+        mode = 'httpx' + (' (HTTP/2)' if self.http2 else '') if HAS_HTTPX else 'requests'
+        logger.info(f"🌐 HTTP Fetcher inicializado: {mode}, {self.per_host} conexões por host")
+
+    # ------------------------------------------------------------------
+    # Infraestrutura (event loop, cliente, pool)
+    # ------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop dedicado; recriado após fork (gunicorn preload_app)"""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._client = None
+                self._host_slots = {}
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='http-fetcher', daemon=True).start()
+            return self._loop
+
+    def _async_client(self):
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections // 2)
+            transport = httpx.AsyncHTTPTransport(http2=self.http2, verify=self.verify, limits=limits)
+            if self.dns_cache:
+                # httpx não expõe o backend de rede do pool; httpx/httpcore estão fixados em requirements.txt
+                transport._pool._network_backend = _CachedDNSBackend(self.dns_cache)
+            self._client = httpx.AsyncClient(
+                transport=transport,
+                follow_redirects=True,
+                headers=DEFAULT_HEADERS,
+                timeout=self.timeout
+            )
+        return self._client
+
+    def _sync_session(self):
+        with self._lock:
+            if self._session is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                session = rate_limiter.session(DEFAULT_HEADERS)
+                adapter = HTTPAdapter(pool_connections=self.max_connections, pool_maxsize=self.per_host)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+                self._sync_pool = ThreadPoolExecutor(max_workers=self.max_connections // 4 or 1, thread_name_prefix='http-fetcher')
+                self._host_slots = {}
+            return self._session
+
+    def _host_slot(self, host: str):
+        """Semáforo de downloads simultâneos do host (asyncio no modo httpx)"""
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = asyncio.Semaphore(self.per_host) if HAS_HTTPX else threading.BoundedSemaphore(self.per_host)
+                self._host_slots[host] = slot
+            return slot
+
+    def _deadline(self, timeout: float) -> float:
+        """Tempo máximo de um download: todas as tentativas e backoffs, mais a folga de fila"""
+        return self.max_retries * (timeout + self.backoff_max) + self.queue_margin
+
+    def _backoff(self, attempt: int) -> float:
+        """Backoff exponencial com jitter completo"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _to_payload(url: str, status: int, headers, content: bytes, encoding: Optional[str], rejected: Optional[str] = None) -> Dict[str, Any]:
+        payload = {
+            'url': url,
+            'status': status,
+            'headers': {k.lower(): v for k, v in headers.items() if k.lower() in _KEPT_HEADERS},
+            'content': base64.b64encode(content or b'').decode('ascii'),
+            'encoding': encoding
+        }
+        if rejected:
+            payload['rejected'] = rejected
+        return payload
+
+    def _body_reader(self, status: int, headers, accept: Optional[Tuple[str, ...]], max_bytes: Optional[int]) -> _BodyReader:
+        # O tipo só importa para respostas de sucesso; erros seguem apenas o limite de tamanho
+        return _BodyReader(headers, accept if 200 <= status < 300 else None, self.size_limits, max_bytes)
+
+    @staticmethod
+    def _from_payload(payload: Dict[str, Any]) -> FetchResponse:
+        return FetchResponse(
+            payload['url'], payload['status'], payload['headers'],
+            base64.b64decode(payload['content']), payload.get('encoding')
+        )
+
+    # ------------------------------------------------------------------
+    # Download assíncrono (httpx)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _clean_headers(headers: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        if not headers:
+            return None
+        return {k: v for k, v in headers.items() if k.lower() not in _HOP_BY_HOP}
+
+    async def _afetch_once(self, url: str, headers: Optional[Dict[str, str]], timeout: float,
+                           accept: Optional[Tuple[str, ...]], max_bytes: Optional[int]) -> Dict[str, Any]:
+        host = (urlsplit(url).hostname or '').lower()
+        async with self._host_slot(host):
+            await rate_limiter.aacquire_host(url)
+            async with self._async_client().stream('GET', url, headers=self._clean_headers(headers), timeout=timeout) as response:
+                reader = self._body_reader(response.status_code, response.headers, accept, max_bytes)
+                async for chunk in response.aiter_bytes():
+                    if not reader.feed(chunk):
+                        break
+                reader.finish()
+        if response.status_code == 429:
+            rate_limiter.backoff(url, rate_limiter.retry_after(response.headers))
+        return self._to_payload(str(response.url), response.status_code, response.headers, reader.body(), response.encoding, reader.rejected)
+
+    async def _afetch_payload(self, url: str, headers: Optional[Dict[str, str]], timeout: float,
+                              accept: Optional[Tuple[str, ...]], max_bytes: Optional[int]) -> Dict[str, Any]:
+        last_error = None
+        for attempt in range(self.max_retries):
+            if attempt:
+                self.stats['retries'] += 1
+                await asyncio.sleep(self._backoff(attempt))
+            try:
+                self.stats['requests'] += 1
+                payload = await self._afetch_once(url, headers, timeout, accept, max_bytes)
+                if payload['status'] in _RETRY_STATUS and attempt < self.max_retries - 1:
+                    logger.warning(f"⚠️ HTTP {payload['status']} em {url} (tentativa {attempt + 1})")
+                    continue
+                return payload
+            except httpx.HTTPError as e:
+                last_error = e
+                logger.warning(f"⚠️ Erro ao baixar {url} (tentativa {attempt + 1}): {e}")
+        self.stats['failures'] += 1
+        raise FetchError(f"Falha ao baixar {url}: {last_error}")
+
+    async def afetch(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+                     max_age: Optional[float] = None, use_cache: bool = True,
+                     accept: Optional[Tuple[str, ...]] = DEFAULT_ACCEPT, max_bytes: Optional[int] = None) -> FetchResponse:
+        """Baixa a URL (deve rodar no event loop do fetcher; use fetch/fetch_many fora dele)
+
+        O cache de páginas (SQLite, hash e compressão) é consultado e gravado em
+        threads auxiliares para não travar os demais downloads do event loop.
+        """
+        timeout = timeout or self.timeout
+        entry, cached, headers = await asyncio.to_thread(self._from_page_cache, url, headers, max_age, use_cache, accept)
+        if cached:
+            return cached
+        payload = await cassette.aintercept(
+            'fetch', self._cassette_key(url, headers, accept),
+            lambda: self._afetch_payload(url, headers, timeout, accept, max_bytes)
+        )
+        return await asyncio.to_thread(self._complete, url, entry, payload, use_cache, accept)
+
+    # ------------------------------------------------------------------
+    # Cache de páginas
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _cached_response(entry: Dict[str, Any]) -> FetchResponse:
+        return FetchResponse(entry['url'], entry['status'], entry['headers'], entry['content'], entry.get('encoding'), from_cache=True)
+
+    @staticmethod
+    def _cassette_key(url: str, headers: Optional[Dict[str, str]], accept: Optional[Tuple[str, ...]]) -> Dict[str, Any]:
+        key = {'url': url, 'headers': sorted((headers or {}).keys())}
+        if accept != DEFAULT_ACCEPT:
+            key['accept'] = list(accept) if accept else None
+        return key
+
+    def _reject(self, url: str, reason: str):
+        self.stats['rejected'] += 1
+        raise PayloadRejected(f"Download de {url} abortado: {reason}")
+
+    def _accepted(self, url: str, response: FetchResponse, accept: Optional[Tuple[str, ...]]) -> FetchResponse:
+        """Resposta do cache, se o tipo dela estiver em `accept` (senão PayloadRejected)"""
+        if accept is not None and response.kind not in accept:
+            self._reject(url, f"tipo {response.kind} não aceito")
+        return response
+
+    def _from_page_cache(self, url: str, headers: Optional[Dict[str, str]], max_age: Optional[float], use_cache: bool,
+                         accept: Optional[Tuple[str, ...]] = DEFAULT_ACCEPT):
+        """Retorna (entrada em cache, resposta pronta se ainda válida, cabeçalhos da requisição)"""
+        entry = page_cache.lookup(url) if use_cache else None
+        if entry and page_cache.is_fresh(entry, max_age):
+            page_cache.stats['fresh_hits'] += 1
+            return entry, self._accepted(url, self._cached_response(entry), accept), headers
+        if entry:
+            # Entrada vencida: GET condicional (304 reaproveita o corpo guardado)
+            headers = {**(headers or {}), **page_cache.conditional_headers(entry)}
+        return entry, None, headers
+
+    def _complete(self, url: str, entry: Optional[Dict[str, Any]], payload: Dict[str, Any], use_cache: bool,
+                  accept: Optional[Tuple[str, ...]] = DEFAULT_ACCEPT) -> FetchResponse:
+        if entry and payload['status'] == 304:
+            page_cache.refresh(url, entry, payload['headers'])
+            # O corpo revalidado não passou pelo leitor: aplica o filtro de tipos aqui
+            return self._accepted(url, self._cached_response(entry), accept)
+        if payload.get('rejected'):
+            logger.warning(f"✋ Download de {url} abortado: {payload['rejected']}")
+            self._reject(url, payload['rejected'])
+        response = self._from_payload(payload)
+        self.stats['bytes'] += len(response.content)
+        if use_cache:
+            page_cache.store(url, response.status_code, response.headers, response.content, response.encoding)
+        return response
+
+    # ------------------------------------------------------------------
+    # Download síncrono (fallback sem httpx)
+    # ------------------------------------------------------------------
+
+    def _fetch_payload_sync(self, url: str, headers: Optional[Dict[str, str]], timeout: float,
+                            accept: Optional[Tuple[str, ...]], max_bytes: Optional[int]) -> Dict[str, Any]:
+        session = self._sync_session()
+        host = (urlsplit(url).hostname or '').lower()
+        last_error = None
+        for attempt in range(self.max_retries):
+            if attempt:
+                self.stats['retries'] += 1
+                time.sleep(self._backoff(attempt))
+            try:
+                self.stats['requests'] += 1
+                # O rate limiter por host (e o backoff em 429) é aplicado pela sessão
+                with self._host_slot(host):
+                    response = session.get(url, headers=self._clean_headers(headers), timeout=timeout,
+                                           verify=self.verify, allow_redirects=True, stream=True)
+                    try:
+                        if response.status_code in _RETRY_STATUS and attempt < self.max_retries - 1:
+                            logger.warning(f"⚠️ HTTP {response.status_code} em {url} (tentativa {attempt + 1})")
+                            continue
+                        reader = self._body_reader(response.status_code, response.headers, accept, max_bytes)
+                        for chunk in response.iter_content(chunk_size=64 * 1024):
+                            if not reader.feed(chunk):
+                                break
+                        reader.finish()
+                    finally:
+                        response.close()
+                return self._to_payload(response.url, response.status_code, response.headers, reader.body(), response.encoding, reader.rejected)
+            except requests.exceptions.RequestException as e:
+                last_error = e
+                logger.warning(f"⚠️ Erro ao baixar {url} (tentativa {attempt + 1}): {e}")
+        self.stats['failures'] += 1
+        raise FetchError(f"Falha ao baixar {url}: {last_error}")
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+              max_age: Optional[float] = None, use_cache: bool = True,
+              accept: Optional[Tuple[str, ...]] = DEFAULT_ACCEPT, max_bytes: Optional[int] = None) -> FetchResponse:
+        """Baixa a URL e retorna a resposta (FetchError após esgotar as tentativas)
+
+        Args:
+            max_age (float): Idade máxima aceita de uma cópia do cache de páginas
+                (0 força revalidação); None segue os cabeçalhos do servidor.
+            use_cache (bool): False ignora o cache de páginas.
+            accept (tuple): Tipos aceitos ('html', 'text', 'pdf', 'binary'); None aceita todos.
+            max_bytes (int): Tamanho máximo do corpo; None usa FETCH_MAX_MB/FETCH_MAX_PDF_MB.
+        """
+        timeout = timeout or self.timeout
+        if HAS_HTTPX:
+            coro = self.afetch(url, headers, timeout, max_age, use_cache, accept, max_bytes)
+            future = asyncio.run_coroutine_threadsafe(cassette.bind_async(coro), self._ensure_loop())
+            try:
+                return future.result(timeout=self._deadline(timeout))
+            except FuturesTimeoutError:
+                future.cancel()
+                self.stats['failures'] += 1
+                raise FetchError(f"Tempo esgotado ao baixar {url}")
+
+        entry, cached, headers = self._from_page_cache(url, headers, max_age, use_cache, accept)
+        if cached:
+            return cached
+        payload = cassette.intercept(
+            'fetch', self._cassette_key(url, headers, accept),
+            lambda: self._fetch_payload_sync(url, headers, timeout, accept, max_bytes)
+        )
+        return self._complete(url, entry, payload, use_cache, accept)
+
+    def fetch_many(self, urls: List[str], headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+                   max_age: Optional[float] = None, use_cache: bool = True,
+                   accept: Optional[Tuple[str, ...]] = DEFAULT_ACCEPT, max_bytes: Optional[int] = None) -> Dict[str, Optional[FetchResponse]]:
+        """Baixa todas as URLs concorrentemente; falhas viram None"""
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+
+        if HAS_HTTPX:
+            # Downloads do mesmo host esperam em fila (per_host por vez); o lote tem prazo proporcional
+            rounds = max(len(urls) // self.per_host, 1) + 1
+            deadline = self._deadline(timeout or self.timeout) * rounds
+
+            async def run_all():
+                tasks = [asyncio.ensure_future(self.afetch(url, headers, timeout, max_age, use_cache, accept, max_bytes)) for url in urls]
+                _, pending = await asyncio.wait(tasks, timeout=deadline)
+                for task in pending:
+                    task.cancel()
+                return [
+                    FetchError("Tempo esgotado no lote de downloads") if task in pending
+                    else (task.exception() or task.result())
+                    for task in tasks
+                ]
+            future = asyncio.run_coroutine_threadsafe(cassette.bind_async(run_all()), self._ensure_loop())
+            try:
+                results = future.result(timeout=deadline + self.queue_margin)
+            except FuturesTimeoutError:
+                future.cancel()
+                results = [FetchError("Tempo esgotado no lote de downloads")] * len(urls)
+        else:
+            self._sync_session()
+            futures = [self._sync_pool.submit(cassette.bind(self.fetch), url, headers, timeout, max_age, use_cache, accept, max_bytes) for url in urls]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+
+        responses = {}
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                logger.warning(f"⚠️ Download falhou para {url}: {result}")
+                result = None
+            responses[url] = result
+        return responses
+
+    def close(self):
+        """Fecha as conexões abertas (o pool é recriado no próximo download)"""
+        with self._lock:
+            loop, client, session = self._loop, self._client, self._session
+            self._client = None
+            self._session = None
+        if client is not None and loop is not None and self._pid == os.getpid():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=self.timeout)
+        if session is not None:
+            session.close()
+        logger.info("🧹 Conexões do HTTP Fetcher fechadas")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de downloads, tentativas e cache de DNS"""
+        return {
+            'backend': 'httpx' if HAS_HTTPX else 'requests',
+            'http2': self.http2,
+            'per_host_concurrency': self.per_host,
+            'size_limits': self.size_limits,
+            'dns_cache': {'hits': self.dns_cache.hits, 'misses': self.dns_cache.misses} if self.dns_cache else None,
+            **self.stats
+        }
+
+
+# Instância global
+http_fetcher = HttpFetcher()
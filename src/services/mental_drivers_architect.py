@@ -13,6 +13,32 @@ from typing import Dict, List, Any, Optional
 from services.ai_manager import ai_manager
 from services.auto_save_manager import salvar_etapa, salvar_erro
 
+CUSTOM_DRIVERS_SCHEMA = {
+    "type": "array",
+    "minItems": 1,
+    "items": {
+        "type": "object",
+        "required": ["nome", "gatilho_central", "definicao_visceral", "roteiro_ativacao", "frases_ancoragem"],
+        "properties": {
+            "nome": {"type": "string"},
+            "gatilho_central": {"type": "string"},
+            "definicao_visceral": {"type": "string"},
+            "roteiro_ativacao": {
+                "type": "object",
+                "required": ["pergunta_abertura", "historia_analogia", "metafora_visual", "comando_acao"],
+                "properties": {
+                    "pergunta_abertura": {"type": "string"},
+                    "historia_analogia": {"type": "string"},
+                    "metafora_visual": {"type": "string"},
+                    "comando_acao": {"type": "string"}
+                }
+            },
+            "frases_ancoragem": {"type": "array", "items": {"type": "string"}},
+            "prova_logica": {"type": "string"}
+        }
+    }
+}
+
 logger = logging.getLogger(__name__)
 
 class MentalDriversArchitect:
@@ -184,7 +210,7 @@ AVATAR:
 DRIVERS IDEAIS:
 {json.dumps(ideal_drivers, indent=2, ensure_ascii=False)[:1000]}
 
-RETORNE APENAS JSON VÁLIDO:
+EXEMPLO DE ESTRUTURA:
 
 ```json
 [
@@ -209,24 +235,12 @@ RETORNE APENAS JSON VÁLIDO:
 ```
 """
             
-            response = ai_manager.generate_analysis(prompt, max_tokens=2000)
-            
-            if response:
-                clean_response = response.strip()
-                if "```json" in clean_response:
-                    start = clean_response.find("```json") + 7
-                    end = clean_response.rfind("```")
-                    clean_response = clean_response[start:end].strip()
-                
-                try:
-                    drivers = json.loads(clean_response)
-                    if isinstance(drivers, list) and len(drivers) > 0:
-                        logger.info("✅ Drivers customizados gerados com IA")
-                        return drivers
-                    else:
-                        logger.warning("⚠️ IA retornou formato inválido")
-                except json.JSONDecodeError:
-                    logger.warning("⚠️ IA retornou JSON inválido")
+            drivers = ai_manager.generate_structured(
+                prompt, CUSTOM_DRIVERS_SCHEMA, max_tokens=2000, component='mental_drivers'
+            )
+            if drivers:
+                logger.info("✅ Drivers customizados gerados com IA")
+                return drivers
             
             # Fallback para drivers básicos
             return self._create_basic_drivers(context_data)
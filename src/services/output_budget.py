@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Output Budget
+Ajuste automático de max_tokens por componente a partir do tamanho real das respostas
+"""
+
+import os
+import math
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+from services.persistent_cache import PersistentCache
+from services.prompt_budgeter import prompt_budgeter
+
+logger = logging.getLogger(__name__)
+
+
+class OutputBudgetTuner:
+    """Registra quantos tokens cada componente (agente/etapa) realmente gera por
+    provedor e, no modo automático (ADAPTIVE_MAX_TOKENS=true), sugere max_tokens
+    igual a um percentil alto do uso observado mais uma folga.
+
+    As amostras ficam no cache persistente, compartilhadas entre workers e
+    preservadas entre reinícios: cada registro acrescenta a amostra à janela
+    gravada numa única transação, sem sobrescrever as dos outros workers. Respostas que parecem truncadas contam como
+    truncamento e o chamador repete a chamada com o orçamento original.
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        percentile: Optional[float] = None,
+        headroom: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        window: int = 200,
+        floor: int = 512
+    ):
+        """Inicializa o ajuste de orçamento de saída"""
+        if enabled is None:
+            enabled = os.getenv('ADAPTIVE_MAX_TOKENS', 'false').lower() == 'true'
+        self.enabled = enabled
+        self.percentile = percentile or float(os.getenv('ADAPTIVE_MAX_TOKENS_PERCENTILE', 95))
+        self.headroom = headroom or float(os.getenv('ADAPTIVE_MAX_TOKENS_HEADROOM', 1.25))
+        self.min_samples = min_samples or int(os.getenv('ADAPTIVE_MAX_TOKENS_MIN_SAMPLES', 10))
+        self.window = window
+        self.floor = floor
+        # Fração do orçamento a partir da qual a resposta é tratada como cortada
+        self.truncation_ratio = 0.85
+
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {}
+        self._truncations: Dict[str, int] = {}
+        self.store = PersistentCache('output_budget', ttl=30 * 86400)
+
+    @staticmethod
+    def _key(component: str, provider: Optional[str]) -> str:
+        return f"{component}:{provider or '*'}"
+
+    def _load(self, key: str) -> deque:
+        samples = self._samples.get(key)
+        if samples is None:
+            stored = self.store.get(key, label='samples') or {}
+            samples = deque(stored.get('samples', []), maxlen=self.window)
+            self._samples[key] = samples
+            self._truncations[key] = stored.get('truncations', 0)
+        return samples
+
+    def _percentile(self, samples) -> int:
+        """Percentil (nearest-rank) configurado das amostras"""
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, max(0, int(math.ceil(self.percentile / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+    def suggest(self, component: Optional[str], provider: Optional[str], max_tokens: int) -> int:
+        """max_tokens a usar: o solicitado, ou o ajustado se houver amostras suficientes"""
+        if not self.enabled or not component:
+            return max_tokens
+
+        with self._lock:
+            samples = list(self._load(self._key(component, provider)))
+        tuned = self._tuned(samples)
+        return min(max_tokens, tuned) if tuned else max_tokens
+
+    def _tuned(self, samples) -> Optional[int]:
+        """Percentil com folga, arredondado para múltiplos de 256 (None sem amostras suficientes)"""
+        if len(samples) < self.min_samples:
+            return None
+        tuned = int(self._percentile(samples) * self.headroom)
+        return max(self.floor, int(math.ceil(tuned / 256.0)) * 256)
+
+    def is_truncated(self, text: Optional[str], max_tokens: int, provider: Optional[str]) -> bool:
+        """Heurística de truncamento: a resposta ocupou quase todo o orçamento"""
+        if not text:
+            return False
+        return prompt_budgeter.estimate_tokens(text, provider) >= self.truncation_ratio * max_tokens
+
+    def record(self, component: Optional[str], provider: Optional[str], text: Optional[str], truncated: bool = False):
+        """Registra o tamanho (em tokens) de uma resposta completa do componente"""
+        if not component or not text:
+            return
+
+        key = self._key(component, provider)
+        tokens = prompt_budgeter.estimate_tokens(text, provider)
+
+        def merge(stored: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            stored = stored or {}
+            return {
+                'samples': (stored.get('samples', []) + [tokens])[-self.window:],
+                'truncations': stored.get('truncations', 0) + (1 if truncated else 0)
+            }
+
+        if self.store.enabled:
+            payload = self.store.update(key, merge, label='samples')
+        else:
+            with self._lock:
+                payload = merge({'samples': list(self._load(key)), 'truncations': self._truncations.get(key, 0)})
+
+        # A cópia local passa a refletir também as amostras gravadas pelos outros workers
+        with self._lock:
+            self._samples[key] = deque(payload['samples'], maxlen=self.window)
+            self._truncations[key] = payload['truncations']
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Uso observado e orçamento sugerido por componente/provedor (neste processo)"""
+        with self._lock:
+            snapshot = {key: (list(samples), self._truncations.get(key, 0)) for key, samples in self._samples.items()}
+
+        components = {}
+        for key, (samples, truncations) in snapshot.items():
+            if not samples:
+                continue
+            components[key] = {
+                'samples': len(samples),
+                'p50': sorted(samples)[len(samples) // 2],
+                f'p{int(self.percentile)}': self._percentile(samples),
+                'max': max(samples),
+                'truncations': truncations,
+                'suggested': self._tuned(samples)
+            }
+        return {
+            'enabled': self.enabled,
+            'percentile': self.percentile,
+            'headroom': self.headroom,
+            'min_samples': self.min_samples,
+            'components': components
+        }
+
+
+# Instância global
+output_budget_tuner = OutputBudgetTuner()
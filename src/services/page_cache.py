@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Page Cache
+Cache HTTP em disco das páginas e PDFs baixados, com revalidação condicional
+"""
+
+import os
+import re
+import time
+import hashlib
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from services.persistent_cache import PersistentCache
+from services.cassette import cassette
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros de rastreamento que não mudam o conteúdo da página
+_TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|ref_src)$', re.I)
+
+# Cabeçalhos guardados com a página (servem para validar e revalidar)
+CACHED_HEADERS = ('content-type', 'etag', 'last-modified', 'cache-control', 'expires', 'date')
+
+
+def canonical_url(url: str) -> str:
+    """URL canônica: esquema/host em minúsculas, sem porta padrão, fragmento
+    e parâmetros de rastreamento, e com a query ordenada"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _TRACKING_PARAMS.match(k))
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+def _cache_control(headers: Dict[str, str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    for item in (headers.get('cache-control') or '').split(','):
+        name, _, value = item.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class PageCache:
+    """Cache compartilhado das respostas GET 200 do http_fetcher.
+
+    Metadados ficam por URL canônica; os corpos ficam comprimidos e endereçados
+    pelo sha256 do conteúdo, então a mesma página em URLs diferentes ocupa
+    espaço uma única vez. A validade segue Cache-Control (no-store, no-cache,
+    max-age/s-maxage) ou Expires, com PAGE_CACHE_DEFAULT_TTL quando o servidor
+    não diz nada. Entradas vencidas com ETag/Last-Modified são revalidadas com
+    GET condicional (304 reaproveita o corpo). Cotas de tamanho com LRU.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        """Inicializa o cache de páginas"""
+        if enabled is None:
+            enabled = os.getenv('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+        # Em replay, todo download deve vir do cassete
+        enabled = enabled and not cassette.replaying
+
+        self.default_ttl = int(os.getenv('PAGE_CACHE_DEFAULT_TTL', 3600))
+        self.max_ttl = int(os.getenv('PAGE_CACHE_MAX_TTL', 7 * 86400))
+        # Metadados vencidos continuam guardados para permitir revalidação
+        retention = int(os.getenv('PAGE_CACHE_RETENTION', 30 * 86400))
+
+        self.meta = PersistentCache(
+            'page_meta',
+            ttl=retention,
+            max_entries=int(os.getenv('PAGE_CACHE_MAX_ENTRIES', 20000)),
+            max_bytes=64 * 1024 * 1024,
+            enabled=enabled
+        )
+        # Corpos em arquivo próprio: gravações grandes não disputam o lock de escrita dos demais caches
+        self.bodies = PersistentCache(
+            'page_bodies',
+            db_path=os.getenv('PAGE_CACHE_BODIES_PATH', 'cache/arqv30_pages.sqlite3'),
+            ttl=retention,
+            max_entries=int(os.getenv('PAGE_CACHE_MAX_ENTRIES', 20000)),
+            max_bytes=int(float(os.getenv('PAGE_CACHE_MAX_MB', 500)) * 1024 * 1024),
+            enabled=enabled
+        )
+        self.stats = {'fresh_hits': 0, 'revalidated': 0, 'stored': 0, 'not_stored': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.meta.enabled and self.bodies.enabled
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Entrada guardada para a URL (metadados + corpo), ou None"""
+        if not self.enabled:
+            return None
+        entry = self.meta.get(canonical_url(url), label='pages')
+        if not entry:
+            return None
+        body = self.bodies.get_bytes(entry['body'], label='bodies')
+        if body is None:
+            return None
+        entry['content'] = body
+        return entry
+
+    def is_fresh(self, entry: Dict[str, Any], max_age: Optional[float] = None) -> bool:
+        """Se a entrada pode ser usada sem falar com o servidor.
+
+        max_age sobrepõe a validade do servidor para esta requisição
+        (0 força revalidação; N aceita cópias com até N segundos).
+        """
+        age = time.time() - entry['stored_at']
+        if max_age is not None:
+            return age <= max_age
+        return not entry.get('no_cache') and time.time() < entry['fresh_until']
+
+    @staticmethod
+    def conditional_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+        """Cabeçalhos If-None-Match / If-Modified-Since para revalidar a entrada"""
+        headers = {}
+        if entry['headers'].get('etag'):
+            headers['If-None-Match'] = entry['headers']['etag']
+        if entry['headers'].get('last-modified'):
+            headers['If-Modified-Since'] = entry['headers']['last-modified']
+        return headers
+
+    def _freshness(self, headers: Dict[str, str], now: float) -> Optional[float]:
+        """Instante até o qual a resposta é válida (None se não pode ser guardada)"""
+        directives = _cache_control(headers)
+        if 'no-store' in directives:
+            return None
+        for name in ('s-maxage', 'max-age'):
+            value = directives.get(name)
+            if value and value.isdigit():
+                return now + min(int(value), self.max_ttl)
+        expires = _http_date(headers.get('expires'))
+        if expires is not None:
+            date = _http_date(headers.get('date')) or now
+            return now + max(0.0, min(expires - date, self.max_ttl))
+        return now + self.default_ttl
+
+    def store(self, url: str, status: int, headers: Dict[str, str], content: bytes, encoding: Optional[str]) -> bool:
+        """Guarda uma resposta 200 (respeitando no-store)"""
+        if not self.enabled or status != 200 or not content:
+            return False
+        now = time.time()
+        headers = {k.lower(): v for k, v in headers.items() if k.lower() in CACHED_HEADERS}
+        fresh_until = self._freshness(headers, now)
+        if fresh_until is None:
+            self.stats['not_stored'] += 1
+            return False
+
+        body_key = hashlib.sha256(content).hexdigest()
+        if self.bodies.get_bytes(body_key, label='dedup') is None:
+            self.bodies.set_bytes(body_key, content, label='bodies')
+        self.meta.set(canonical_url(url), {
+            'url': url,
+            'status': status,
+            'headers': headers,
+            'encoding': encoding,
+            'body': body_key,
+            'stored_at': now,
+            'fresh_until': fresh_until,
+            'no_cache': 'no-cache' in _cache_control(headers)
+        }, label='pages')
+        self.stats['stored'] += 1
+        return True
+
+    def refresh(self, url: str, entry: Dict[str, Any], headers: Dict[str, str]):
+        """Atualiza a validade após um 304 Not Modified"""
+        if not self.enabled:
+            return
+        now = time.time()
+        merged = {**entry['headers'], **{k.lower(): v for k, v in headers.items() if k.lower() in CACHED_HEADERS}}
+        fresh_until = self._freshness(merged, now) or now
+        meta = {k: v for k, v in entry.items() if k != 'content'}
+        meta.update({'headers': merged, 'stored_at': now, 'fresh_until': fresh_until})
+        self.meta.set(canonical_url(url), meta, label='pages')
+        self.stats['revalidated'] += 1
+
+    def purge(self, expired_only: bool = False) -> int:
+        """Remove as páginas guardadas (ou só as expiradas)"""
+        return self.meta.purge(expired_only=expired_only) + self.bodies.purge(expired_only=expired_only)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas de metadados, corpos e revalidações"""
+        return {
+            'enabled': self.enabled,
+            **self.stats,
+            'pages': self.meta.get_stats(),
+            'bodies': self.bodies.get_stats()
+        }
+
+
+# Instância global
+page_cache = PageCache()
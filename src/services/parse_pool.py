@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Parse Pool
+Pool persistente de processos para a etapa de CPU (parsing) da extração de conteúdo
+"""
+
+import os
+import sys
+import signal
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ParseTimeout(BaseException):
+    """Tarefa de parsing passou do tempo limite.
+
+    Herda de BaseException para não ser engolida pelos `except Exception`
+    da cascata de extratores enquanto o alarme interrompe a tarefa.
+    """
+
+
+def _on_alarm(signum, frame):
+    raise ParseTimeout("tempo limite de parsing excedido")
+
+
+def _run_with_deadline(timeout: float, fn: Callable, args: tuple) -> Any:
+    """Executa a tarefa no processo filho com um alarme (SIGALRM) de timeout"""
+    if not timeout or not hasattr(signal, 'setitimer'):
+        return fn(*args)
+    previous = signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+class ParsePool:
+    """Processos de parsing compartilhados por todos os extratores.
+
+    trafilatura, readability, newspaper e BeautifulSoup seguram o GIL, então o
+    parsing roda em um ProcessPoolExecutor persistente (criado no primeiro uso,
+    por processo, com contexto spawn por segurança com as threads do servidor)
+    alimentado com os bytes do HTML já baixado.
+
+    - Backpressure: submit() bloqueia enquanto houver PARSE_MAX_PENDING tarefas
+      em andamento, sem acumular páginas na memória.
+    - Timeout por tarefa: um alarme no processo filho interrompe a tarefa após
+      PARSE_TASK_TIMEOUT; se o processo travar em código C e não responder, o
+      pool é reciclado (processos encerrados) e as demais tarefas são
+      reenviadas uma vez.
+    - Processos são renovados a cada PARSE_MAX_TASKS_PER_CHILD tarefas para
+      conter vazamentos de memória das bibliotecas de parsing.
+
+    Com PARSE_POOL_ENABLED=false (ou se o pool não puder ser criado) as tarefas
+    rodam na própria thread, como antes. Com vários workers do gunicorn, ajuste
+    PARSE_WORKERS para não multiplicar processos além dos núcleos.
+    """
+
+    def __init__(self):
+        """Inicializa a configuração do pool (os processos sobem sob demanda)"""
+        self.enabled = os.getenv('PARSE_POOL_ENABLED', 'true').lower() == 'true'
+        self.workers = int(os.getenv('PARSE_WORKERS', os.cpu_count() or 1))
+        self.task_timeout = float(os.getenv('PARSE_TASK_TIMEOUT', 30))
+        self.max_pending = int(os.getenv('PARSE_MAX_PENDING', self.workers * 2))
+        self.max_tasks_per_child = int(os.getenv('PARSE_MAX_TASKS_PER_CHILD', 200))
+        # Tarefa na fila + tarefa rodando + folga para o alarme do processo filho
+        self.hard_timeout = self.task_timeout * 2 + 5
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self.stats = {'tasks': 0, 'inline': 0, 'timeouts': 0, 'failures': 0, 'restarts': 0}
+
+    def _ensure_executor(self) -> Optional[ProcessPoolExecutor]:
+        with self._lock:
+            if not self.enabled:
+                return None
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                kwargs = {}
+                if sys.version_info >= (3, 11):
+                    kwargs['max_tasks_per_child'] = self.max_tasks_per_child
+                try:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'), **kwargs
+                    )
+                    logger.info(f"🧮 Parse Pool iniciado com {self.workers} processos")
+                except (OSError, NotImplementedError, ValueError) as e:
+                    logger.warning(f"⚠️ Parse Pool indisponível, parsing seguirá na thread: {e}")
+                    self.enabled = False
+                    return None
+            return self._executor
+
+    def _restart(self, failed: Optional[ProcessPoolExecutor]):
+        """Encerra os processos do pool que falhou (o próximo submit cria outro)"""
+        with self._lock:
+            if failed is None or self._executor is not failed:
+                return
+            self._executor = None
+            self.stats['restarts'] += 1
+        for process in list((getattr(failed, '_processes', None) or {}).values()):
+            process.terminate()
+        failed.shutdown(wait=False, cancel_futures=True)
+        logger.warning("♻️ Parse Pool reciclado")
+
+    def _inline(self, fn: Callable, args: tuple) -> Future:
+        self.stats['inline'] += 1
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Agenda fn(*args) em um processo (fn e args precisam ser serializáveis).
+
+        Bloqueia enquanto o pool estiver cheio; se nenhuma vaga abrir dentro do
+        tempo limite, considera o pool travado e o recicla.
+        """
+        executor = self._ensure_executor()
+        if executor is None:
+            return self._inline(fn, args)
+
+        if not self._slots.acquire(timeout=self.hard_timeout):
+            logger.warning("⚠️ Parse Pool sem vagas dentro do tempo limite")
+            self._restart(executor)
+            return self.submit(fn, *args)
+
+        try:
+            future = executor.submit(_run_with_deadline, self.task_timeout, fn, args)
+        except (BrokenProcessPool, RuntimeError):
+            self._slots.release()
+            self._restart(executor)
+            executor = self._ensure_executor()
+            if executor is None:
+                return self._inline(fn, args)
+            self._slots.acquire()
+            future = executor.submit(_run_with_deadline, self.task_timeout, fn, args)
+
+        future.add_done_callback(lambda _: self._slots.release())
+        future.parse_executor = executor
+        future.parse_task = (fn, args)
+        self.stats['tasks'] += 1
+        return future
+
+    def result(self, future: Future, retry: bool = True) -> Any:
+        """Resultado da tarefa (ParseTimeout se passar do tempo limite)"""
+        try:
+            return future.result(timeout=self.hard_timeout)
+        except ParseTimeout:
+            self.stats['timeouts'] += 1
+            raise
+        except FutureTimeout:
+            # O processo não respondeu ao alarme: só encerrando-o
+            self.stats['timeouts'] += 1
+            self._restart(getattr(future, 'parse_executor', None))
+            raise ParseTimeout("processo de parsing travado")
+        except (BrokenProcessPool, CancelledError):
+            # Pool quebrado ou reciclado enquanto a tarefa esperava: reenvia uma vez
+            self.stats['failures'] += 1
+            self._restart(getattr(future, 'parse_executor', None))
+            if not retry:
+                raise
+            fn, args = future.parse_task
+            return self.result(self.submit(fn, *args), retry=False)
+
+    def run(self, fn: Callable, *args) -> Any:
+        """submit() + result()"""
+        return self.result(self.submit(fn, *args))
+
+    def shutdown(self):
+        """Encerra os processos do pool"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=True, cancel_futures=True)
+            logger.info("🧹 Parse Pool encerrado")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Configuração e contadores de tarefas, timeouts e reciclagens"""
+        return {
+            'enabled': self.enabled,
+            'running': self._executor is not None,
+            'workers': self.workers,
+            'task_timeout': self.task_timeout,
+            'max_pending': self.max_pending,
+            **self.stats
+        }
+
+
+# Instância global
+parse_pool = ParsePool()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Parsed Document
+HTML parseado uma única vez (lxml) e compartilhado pela cascata de extratores
+"""
+
+import re
+import copy
+import logging
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+try:
+    import lxml.html
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+logger = logging.getLogger(__name__)
+
+# lxml não aceita str com declaração de encoding
+_XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>', re.I)
+
+
+def css_to_xpath(selector: str) -> str:
+    """Converte os seletores simples dos extratores (tag, .classe, #id, [atributo]) em XPath"""
+    if selector.startswith('.'):
+        return f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {selector[1:]} ')]"
+    if selector.startswith('#'):
+        return f"//*[@id='{selector[1:]}']"
+    if selector.startswith('[') and selector.endswith(']'):
+        return f"//*[@{selector[1:-1]}]"
+    return f"//{selector}"
+
+
+class ParsedDocument:
+    """HTML de uma página parseado uma vez com lxml.
+
+    A árvore base nunca é alterada: estratégias que removem elementos usam
+    pruned(), que guarda uma cópia podada por conjunto de tags, e bibliotecas
+    que modificam a árvore recebida (trafilatura, readability) usam
+    tree_copy(). Copiar a árvore é bem mais barato que parsear de novo. O HTML
+    em texto continua disponível para quem só aceita string (newspaper).
+    """
+
+    def __init__(self, html: str, url: str = ''):
+        self.html = html
+        self.url = url
+        self._tree = None
+        self._parsed = False
+        self._text: Optional[str] = None
+        self._pruned: Dict[FrozenSet[str], object] = {}
+
+    @property
+    def tree(self):
+        """Árvore lxml do documento (None sem lxml ou se o HTML não puder ser parseado)"""
+        if not self._parsed:
+            self._parsed = True
+            if HAS_LXML and self.html and self.html.strip():
+                try:
+                    # Comentários e instruções de processamento não são conteúdo
+                    parser = lxml.html.HTMLParser(remove_comments=True, remove_pis=True)
+                    self._tree = lxml.html.document_fromstring(_XML_DECLARATION.sub('', self.html), parser=parser)
+                except (etree.ParserError, ValueError) as e:
+                    logger.warning(f"⚠️ HTML não parseável em {self.url}: {e}")
+        return self._tree
+
+    def tree_copy(self):
+        """Cópia da árvore para bibliotecas que a modificam"""
+        return copy.deepcopy(self.tree) if self.tree is not None else None
+
+    def pruned(self, tags: Tuple[str, ...]):
+        """Cópia da árvore sem as tags indicadas (o texto após cada tag é mantido)"""
+        key = frozenset(tags)
+        if key not in self._pruned:
+            tree = self.tree_copy()
+            if tree is not None:
+                etree.strip_elements(tree, *tags, with_tail=False)
+            self._pruned[key] = tree
+        return self._pruned[key]
+
+    @property
+    def text(self) -> str:
+        """Texto do documento inteiro (o próprio HTML se não houver árvore)"""
+        if self._text is None:
+            self._text = self.tree.text_content() if self.tree is not None else self.html
+        return self._text
+
+    @staticmethod
+    def fragment_text(html: str) -> str:
+        """Texto de um trecho de HTML (ex.: o resumo gerado pelo readability)"""
+        if not HAS_LXML:
+            return re.sub(r'<[^>]+>', '', html)
+        return lxml.html.fragment_fromstring(html, create_parent='div').text_content()
+
+    @staticmethod
+    def select(tree, selector: str) -> List:
+        """Elementos da árvore que casam com o seletor simples"""
+        return tree.xpath(css_to_xpath(selector))
+
+    @staticmethod
+    def element_text(element, strip: bool = False) -> str:
+        """Texto do elemento; strip=True junta os trechos sem espaços nas pontas"""
+        if strip:
+            return ''.join(part.strip() for part in element.itertext())
+        return element.text_content()
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Persistent Cache
+Cache em disco (SQLite) compartilhado entre workers, com TTL e eviction LRU
+"""
+
+import os
+import json
+import atexit
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.getenv('PERSISTENT_CACHE_PATH', 'cache/arqv30_cache.sqlite3')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    label TEXT,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache_entries (namespace, last_access);
+CREATE INDEX IF NOT EXISTS idx_cache_expiry ON cache_entries (namespace, expires_at);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    namespace TEXT NOT NULL,
+    label TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    evictions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (namespace, label)
+);
+"""
+
+# Totais por namespace mantidos por triggers: a checagem de limites não precisa de COUNT/SUM.
+# INSERT OR REPLACE dispara o trigger de DELETE com PRAGMA recursive_triggers=ON; o INSERT do
+# trigger evita conflito porque herdaria a política OR REPLACE do comando externo.
+_USAGE_SCHEMA = (
+    """CREATE TABLE cache_usage (
+        namespace TEXT PRIMARY KEY,
+        entries INTEGER NOT NULL DEFAULT 0,
+        bytes INTEGER NOT NULL DEFAULT 0
+    )""",
+    """INSERT INTO cache_usage (namespace, entries, bytes)
+        SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries GROUP BY namespace""",
+    """CREATE TRIGGER cache_usage_insert AFTER INSERT ON cache_entries BEGIN
+        INSERT INTO cache_usage (namespace)
+            SELECT NEW.namespace WHERE NOT EXISTS (SELECT 1 FROM cache_usage WHERE namespace = NEW.namespace);
+        UPDATE cache_usage SET entries = entries + 1, bytes = bytes + NEW.size WHERE namespace = NEW.namespace;
+    END""",
+    """CREATE TRIGGER cache_usage_delete AFTER DELETE ON cache_entries BEGIN
+        UPDATE cache_usage SET entries = entries - 1, bytes = bytes - OLD.size WHERE namespace = OLD.namespace;
+    END"""
+)
+
+
+class PersistentCache:
+    """Cache chave/valor em SQLite, seguro para múltiplos processos e threads.
+
+    Leituras quase nunca escrevem: last_access (ordem do LRU) só é atualizado
+    se tiver mais de PERSISTENT_CACHE_TOUCH_INTERVAL segundos, e os contadores
+    de hits/misses/evictions são acumulados em memória e gravados em lote.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        db_path: Optional[str] = None,
+        ttl: int = 3600,
+        max_entries: int = 5000,
+        max_bytes: int = 100 * 1024 * 1024,
+        enabled: bool = True
+    ):
+        """Inicializa o cache de um namespace"""
+        self.namespace = namespace
+        self.db_path = Path(db_path or DEFAULT_CACHE_PATH)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        # Conexões por thread; recriadas após fork (gunicorn preload_app)
+        self._local = threading.local()
+
+        self.touch_interval = float(os.getenv('PERSISTENT_CACHE_TOUCH_INTERVAL', 60))
+        self.stats_flush_interval = float(os.getenv('PERSISTENT_CACHE_STATS_FLUSH_INTERVAL', 10))
+        self.sweep_interval = float(os.getenv('PERSISTENT_CACHE_SWEEP_INTERVAL', 60))
+        self._stats_lock = threading.Lock()
+        self._pending_stats: Dict[tuple, int] = {}
+        self._stats_pid = os.getpid()
+        self._stats_flushed_at = time.time()
+        self._swept_at = 0.0
+
+        if self.enabled:
+            try:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                self._connection()
+                atexit.register(self.flush_stats)
+                logger.info(f"✅ Persistent Cache '{namespace}' inicializado: {self.db_path}")
+            except Exception as e:
+                logger.warning(f"⚠️ Cache '{namespace}' desabilitado: {e}")
+                self.enabled = False
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Gera chave determinística (sha256) a partir das partes informadas"""
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Retorna conexão da thread atual, abrindo uma nova se necessário"""
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != pid:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA recursive_triggers=ON')
+            conn.executescript(_SCHEMA)
+            self._ensure_usage_table(conn)
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    @staticmethod
+    def _ensure_usage_table(conn: sqlite3.Connection):
+        """Cria a tabela de totais e seus triggers (com a contagem inicial) uma única vez por arquivo"""
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cache_usage'").fetchone():
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Outro processo pode ter criado entre a checagem e o lock
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cache_usage'").fetchone():
+                for statement in _USAGE_SCHEMA:
+                    conn.execute(statement)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _bump(self, label: str, column: str, amount: int = 1, flush: bool = True):
+        """Incrementa um contador de estatísticas (em memória; gravado em lote por flush_stats).
+
+        Dentro de uma transação já aberta, use flush=False.
+        """
+        with self._stats_lock:
+            if self._stats_pid != os.getpid():
+                # Processo filho (fork): os pendentes pertencem ao pai
+                self._stats_pid = os.getpid()
+                self._pending_stats = {}
+            key = (label, column)
+            self._pending_stats[key] = self._pending_stats.get(key, 0) + amount
+            due = time.time() - self._stats_flushed_at >= self.stats_flush_interval
+        if due and flush:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Grava os contadores acumulados numa única transação"""
+        with self._stats_lock:
+            pending, self._pending_stats = self._pending_stats, {}
+            self._stats_flushed_at = time.time()
+        if not pending or not self.enabled:
+            return
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for (label, column), amount in pending.items():
+                    conn.execute(
+                        "INSERT INTO cache_stats (namespace, label) VALUES (?, ?) "
+                        "ON CONFLICT(namespace, label) DO NOTHING",
+                        (self.namespace, label)
+                    )
+                    conn.execute(
+                        f"UPDATE cache_stats SET {column} = {column} + ? WHERE namespace = ? AND label = ?",
+                        (amount, self.namespace, label)
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao gravar estatísticas do cache '{self.namespace}': {e}")
+
+    def get(self, key: str, label: str = 'default') -> Optional[Any]:
+        """Retorna valor em cache ou None (miss, expirado ou erro)"""
+        blob = self._read(key, label)
+        if blob is None:
+            return None
+        try:
+            return json.loads(blob.decode('utf-8'))
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao ler cache '{self.namespace}': {e}")
+            return None
+
+    def get_bytes(self, key: str, label: str = 'default') -> Optional[bytes]:
+        """Retorna bytes gravados com set_bytes (ou None)"""
+        return self._read(key, label)
+
+    def _read(self, key: str, label: str) -> Optional[bytes]:
+        """Lê e descomprime o valor bruto de uma entrada válida"""
+        if not self.enabled:
+            return None
+
+        try:
+            conn = self._connection()
+            now = time.time()
+            row = conn.execute(
+                "SELECT value, expires_at, last_access FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+
+            if row and row[1] > now:
+                # Precisão de touch_interval basta para o LRU e evita uma escrita por leitura
+                if now - row[2] >= self.touch_interval:
+                    conn.execute(
+                        "UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                        (now, self.namespace, key)
+                    )
+                self._bump(label, 'hits')
+                return zlib.decompress(row[0])
+
+            if row:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                )
+            self._bump(label, 'misses')
+            return None
+
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao ler cache '{self.namespace}': {e}")
+            return None
+
+    def set(self, key: str, value: Any, label: str = 'default', ttl: Optional[int] = None) -> bool:
+        """Armazena valor (serializável em JSON) e aplica limites de tamanho"""
+        if not self.enabled:
+            return False
+        try:
+            data = json.dumps(value, ensure_ascii=False, default=str).encode('utf-8')
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao gravar cache '{self.namespace}': {e}")
+            return False
+        return self._write(key, data, label, ttl)
+
+    def set_bytes(self, key: str, data: bytes, label: str = 'default', ttl: Optional[int] = None) -> bool:
+        """Armazena bytes brutos (comprimidos, sem passar por JSON)"""
+        if not self.enabled:
+            return False
+        return self._write(key, data, label, ttl)
+
+    def _write(self, key: str, data: bytes, label: str, ttl: Optional[int]) -> bool:
+        """Comprime e grava o valor bruto, aplicando os limites de tamanho"""
+        try:
+            blob = zlib.compress(data)
+            now = time.time()
+            expires_at = now + (ttl if ttl is not None else self.ttl)
+
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries "
+                    "(namespace, key, label, value, size, created_at, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.namespace, key, label, blob, len(blob), now, expires_at, now)
+                )
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return True
+
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao gravar cache '{self.namespace}': {e}")
+            return False
+
+    def add(self, key: str, value: Any, label: str = 'default', ttl: Optional[int] = None) -> bool:
+        """Armazena apenas se a chave não existir (ou estiver expirada); operação atômica entre processos"""
+        if not self.enabled:
+            return False
+
+        try:
+            blob = zlib.compress(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+            now = time.time()
+            expires_at = now + (ttl if ttl is not None else self.ttl)
+
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                    (self.namespace, key, now)
+                )
+                added = conn.execute(
+                    "INSERT OR IGNORE INTO cache_entries "
+                    "(namespace, key, label, value, size, created_at, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.namespace, key, label, blob, len(blob), now, expires_at, now)
+                ).rowcount == 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return added
+
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao gravar cache '{self.namespace}': {e}")
+            return False
+
+    def update(self, key: str, fn: Callable[[Optional[Any]], Any], label: str = 'default',
+               ttl: Optional[int] = None) -> Any:
+        """Lê, transforma com fn e grava o valor numa única transação (atômico entre processos).
+
+        fn recebe o valor atual (None se ausente ou expirado) e devolve o novo valor,
+        que também é o retorno. Com o cache desabilitado ou em erro, devolve fn(None)
+        sem gravar.
+        """
+        if not self.enabled:
+            return fn(None)
+
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = conn.execute(
+                    "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                    (self.namespace, key, now)
+                ).fetchone()
+                current = json.loads(zlib.decompress(row[0]).decode('utf-8')) if row else None
+                value = fn(current)
+                blob = zlib.compress(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries "
+                    "(namespace, key, label, value, size, created_at, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.namespace, key, label, blob, len(blob), now, now + (ttl if ttl is not None else self.ttl), now)
+                )
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return value
+
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao atualizar cache '{self.namespace}': {e}")
+            return fn(None)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Remove expirados (a cada sweep_interval) e, se preciso, os menos usados recentemente (LRU)"""
+        expired = 0
+        if now - self._swept_at >= self.sweep_interval:
+            self._swept_at = now
+            expired = conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+                (self.namespace, now)
+            ).rowcount
+
+        row = conn.execute(
+            "SELECT entries, bytes FROM cache_usage WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        count, total = row if row else (0, 0)
+
+        evicted = 0
+        if count > self.max_entries or total > self.max_bytes:
+            # Libera até 90% dos limites para amortizar o custo da eviction
+            target_entries = int(self.max_entries * 0.9)
+            target_bytes = int(self.max_bytes * 0.9)
+            rows = conn.execute(
+                "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY last_access ASC",
+                (self.namespace,)
+            )
+            to_delete = []
+            for row_key, size in rows:
+                if count <= target_entries and total <= target_bytes:
+                    break
+                to_delete.append((self.namespace, row_key))
+                count -= 1
+                total -= size
+            conn.executemany(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", to_delete
+            )
+            evicted = len(to_delete)
+
+        if expired or evicted:
+            self._bump('__global__', 'evictions', expired + evicted, flush=False)
+            logger.info(f"🧹 Cache '{self.namespace}': {expired} expirados, {evicted} removidos por LRU")
+
+    def delete(self, key: str) -> bool:
+        """Remove uma entrada específica"""
+        if not self.enabled:
+            return False
+        try:
+            self._connection().execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao remover do cache '{self.namespace}': {e}")
+            return False
+
+    def purge(self, expired_only: bool = False) -> int:
+        """Limpa o namespace (ou apenas entradas expiradas) e retorna quantas foram removidas"""
+        if not self.enabled:
+            return 0
+        try:
+            conn = self._connection()
+            if expired_only:
+                removed = conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+                    (self.namespace, time.time())
+                ).rowcount
+            else:
+                removed = conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,)
+                ).rowcount
+            logger.info(f"🧹 Cache '{self.namespace}' limpo: {removed} entradas removidas")
+            return removed
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao limpar cache '{self.namespace}': {e}")
+            return 0
+
+    def get_label_stats(self, label: str) -> Dict[str, int]:
+        """Retorna hits/misses de um rótulo (ex.: provedor)"""
+        stats = {'hits': 0, 'misses': 0}
+        if not self.enabled:
+            return stats
+        self.flush_stats()
+        try:
+            row = self._connection().execute(
+                "SELECT hits, misses FROM cache_stats WHERE namespace = ? AND label = ?",
+                (self.namespace, label)
+            ).fetchone()
+            if row:
+                stats = {'hits': row[0], 'misses': row[1]}
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao ler estatísticas do cache '{self.namespace}': {e}")
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas agregadas do namespace"""
+        stats = {
+            'enabled': self.enabled,
+            'namespace': self.namespace,
+            'path': str(self.db_path),
+            'ttl': self.ttl,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'entries': 0,
+            'bytes': 0,
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'hit_rate': 0.0,
+            'labels': {}
+        }
+        if not self.enabled:
+            return stats
+
+        self.flush_stats()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT entries, bytes FROM cache_usage WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+            if row:
+                stats['entries'], stats['bytes'] = row
+
+            for label, hits, misses, evictions in conn.execute(
+                "SELECT label, hits, misses, evictions FROM cache_stats WHERE namespace = ?",
+                (self.namespace,)
+            ):
+                stats['hits'] += hits
+                stats['misses'] += misses
+                stats['evictions'] += evictions
+                if label != '__global__':
+                    stats['labels'][label] = {'hits': hits, 'misses': misses}
+
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao ler estatísticas do cache '{self.namespace}': {e}")
+
+        return stats
@@ -410,7 +410,7 @@ RETORNE APENAS JSON VÁLIDO:
 ```
 """
             
-            response = ai_manager.generate_analysis(prompt, max_tokens=2500)
+            response = ai_manager.generate_analysis(prompt, max_tokens=2500, component='pre_pitch')
             
             if response:
                 clean_response = response.strip()
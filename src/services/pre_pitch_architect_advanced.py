@@ -95,7 +95,7 @@ class PrePitchArchitectAdvanced:
             )
             
             # Executa orquestração com IA
-            response = ai_manager.generate_analysis(orchestration_prompt, max_tokens=8192)
+            response = ai_manager.generate_analysis(orchestration_prompt, max_tokens=8192, component='pre_pitch_orchestration')
             
             if not response:
                 raise Exception("MESTRE DO PRÉ-PITCH FALHOU: IA não respondeu")
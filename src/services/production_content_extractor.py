@@ -30,10 +30,10 @@ class ProductionContentExtractor:
         """Redireciona para RobustContentExtractor"""
         # RobustContentExtractor não tem extract_metadata, então mantém funcionalidade básica
         try:
-            import requests
             from bs4 import BeautifulSoup
+            from services.http_fetcher import http_fetcher
 
-            response = requests.get(url, timeout=15)
+            response = http_fetcher.fetch(url, timeout=15)
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
                 title_tag = soup.find('title')
@@ -9,12 +9,18 @@ import os
 import logging
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from typing import Dict, List, Optional, Any
-from urllib.parse import quote_plus
+from urllib.parse import quote_plus, urlsplit
 from bs4 import BeautifulSoup
 import json
 import random
 from services.exa_client import exa_client
+from services.circuit_breaker import CircuitBreaker
+from services.single_flight import SingleFlight
+from services.cassette import cassette
+from services.search_cache import search_cache
+from services.rate_limiter import rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -72,50 +78,71 @@ class ProductionSearchManager:
             'DNT': '1',
             'Connection': 'keep-alive'
         }
+        # Raspagem dos buscadores passa pelo limite de taxa por host
+        self.session = rate_limiter.session(self.headers)
         
-        self.cache = {}
-        self.cache_ttl = 3600  # 1 hora
+        # Saúde dos provedores compartilhada entre workers
+        self.circuit_breaker = CircuitBreaker('search', failure_threshold=3, failure_window=300)
+        if cassette.replaying:
+            self.circuit_breaker.enabled = False
+        
+        # Buscas idênticas simultâneas compartilham uma única requisição
+        self.single_flight = SingleFlight('search')
+        
+        # Fan-out: consulta os N melhores provedores ao mesmo tempo em vez de um após o outro
+        self.fanout_enabled = os.getenv('SEARCH_FANOUT_ENABLED', 'false').lower() == 'true'
+        self.fanout_width = int(os.getenv('SEARCH_FANOUT_PROVIDERS', 3))
+        self.fanout_deadline = float(os.getenv('SEARCH_FANOUT_DEADLINE', 8))
+        self._fanout_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('SEARCH_FANOUT_MAX_WORKERS', 8)),
+            thread_name_prefix='search-fanout'
+        )
         
         enabled_count = sum(1 for p in self.providers.values() if p['enabled'])
         logger.info(f"Production Search Manager inicializado com {enabled_count} provedores")
     
-    def search_with_fallback(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
-        """Realiza busca com sistema de fallback automático"""
+    def search_with_fallback(self, query: str, max_results: int = 10, fanout: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """Realiza busca com sistema de fallback automático (buscas idênticas em andamento são compartilhadas)
         
-        # Verifica cache primeiro
-        cache_key = f"{query}_{max_results}"
-        if cache_key in self.cache:
-            cache_data = self.cache[cache_key]
-            if time.time() - cache_data['timestamp'] < self.cache_ttl:
-                logger.info(f"🔄 Resultado do cache para: {query}")
-                return cache_data['results']
+        Args:
+            fanout (bool): Consulta vários provedores em paralelo (True) ou em sequência (False);
+                None usa SEARCH_FANOUT_ENABLED.
+        """
+        fanout = self.fanout_enabled if fanout is None else fanout
+        key = SingleFlight.make_key('search', query.lower(), max_results, fanout)
+        return self.single_flight.do(key, lambda: self._search_with_fallback(query, max_results, fanout))
+    
+    def _search_with_fallback(self, query: str, max_results: int, fanout: bool = False) -> List[Dict[str, Any]]:
+        """Implementação de search_with_fallback (sem deduplicação)"""
+        
+        # Verifica cache primeiro (compartilhado entre workers)
+        cache_provider = 'production:fanout' if fanout else 'production'
+        cached = search_cache.get(cache_provider, query, max_results)
+        if cached is not None:
+            return cached
+        
+        if fanout:
+            results = self._search_fanout(query, max_results)
+            search_cache.set(cache_provider, query, max_results, results)
+            return results
         
         # Busca com fallback
         for provider_name in self._get_provider_order():
             if not self._is_provider_available(provider_name):
                 continue
             
+            # Em meio-aberto só um worker testa o provedor; os demais seguem para o próximo
+            if not self.circuit_breaker.allow(provider_name):
+                continue
+            
             try:
                 logger.info(f"🔍 Buscando com {provider_name}: {query}")
-                
-                if provider_name == 'google':
-                    results = self._search_google(query, max_results)
-                elif provider_name == 'serper':
-                    results = self._search_serper(query, max_results)
-                elif provider_name == 'bing':
-                    results = self._search_bing(query, max_results)
-                elif provider_name == 'duckduckgo':
-                    results = self._search_duckduckgo(query, max_results)
-                else:
-                    continue
+                results = self._search_provider(provider_name, query, max_results)
+                self.circuit_breaker.record_success(provider_name)
                 
                 if results:
                     # Cache resultado
-                    self.cache[cache_key] = {
-                        'results': results,
-                        'timestamp': time.time(),
-                        'provider': provider_name
-                    }
+                    search_cache.set(cache_provider, query, max_results, results)
                     
                     logger.info(f"✅ {provider_name}: {len(results)} resultados")
                     return results
@@ -130,6 +157,107 @@ class ProductionSearchManager:
         logger.error("❌ Todos os provedores de busca falharam")
         return []
     
+    def _search_provider(self, provider_name: str, query: str, max_results: int) -> List[Dict[str, Any]]:
+        """Executa a busca no provedor informado (respeitando o limite de taxa do provedor)"""
+        rate_limiter.acquire_provider(provider_name)
+        if provider_name == 'exa':
+            return self._search_exa(query, max_results)
+        elif provider_name == 'google':
+            return self._search_google(query, max_results)
+        elif provider_name == 'serper':
+            return self._search_serper(query, max_results)
+        elif provider_name == 'bing':
+            return self._search_bing(query, max_results)
+        elif provider_name == 'duckduckgo':
+            return self._search_duckduckgo(query, max_results)
+        return []
+    
+    def _search_fanout(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        """Consulta os melhores provedores em paralelo e junta os resultados conforme chegam.
+        
+        Retorna assim que houver max_results resultados de qualidade (sem duplicatas)
+        ou quando o prazo SEARCH_FANOUT_DEADLINE esgotar; os provedores restantes são
+        cancelados (ou, se já em execução, têm o resultado apenas registrado na saúde).
+        """
+        candidates = []
+        for provider_name in self._get_provider_order():
+            if len(candidates) >= self.fanout_width:
+                break
+            if self.circuit_breaker.allow(provider_name):
+                candidates.append(provider_name)
+        
+        if not candidates:
+            logger.error("❌ Nenhum provedor de busca disponível")
+            return []
+        
+        logger.info(f"🔀 Fan-out de busca em {', '.join(candidates)}: {query}")
+        futures = {}
+        for provider_name in candidates:
+            future = self._fanout_executor.submit(cassette.bind(self._search_provider), provider_name, query, max_results)
+            future.add_done_callback(lambda f, name=provider_name: self._record_search_outcome(name, f))
+            futures[future] = provider_name
+        
+        merged = {}
+        deadline = time.time() + self.fanout_deadline
+        pending = set(futures)
+        while pending and len(merged) < max_results:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.time()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is not None:
+                    continue
+                provider_name = futures[future]
+                results = future.result() or []
+                logger.info(f"✅ {provider_name}: {len(results)} resultados")
+                for rank, result in enumerate(results):
+                    if self._is_quality_result(result):
+                        merged.setdefault(
+                            self.normalize_url(result['url']),
+                            (rank, self.providers[provider_name]['priority'], result)
+                        )
+        
+        for future in pending:
+            # Busca que nem começou: devolve a vaga de teste do circuito meio-aberto
+            # reservada por allow() nesta thread (o callback ignora futures cancelados)
+            if future.cancel():
+                self.circuit_breaker.release(futures[future])
+        if pending:
+            logger.info(f"⏹️ Fan-out encerrado sem aguardar: {', '.join(futures[f] for f in pending)}")
+        
+        # Intercala os provedores: melhores posições primeiro, empates pela prioridade
+        ordered = [result for _, _, result in sorted(merged.values(), key=lambda x: (x[0], x[1]))]
+        if not ordered:
+            logger.error("❌ Todos os provedores de busca falharam")
+        return ordered[:max_results]
+    
+    def _record_search_outcome(self, provider_name: str, future):
+        """Registra na saúde do provedor o resultado de uma busca do fan-out"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            self.circuit_breaker.record_success(provider_name)
+        else:
+            logger.error(f"❌ Erro em {provider_name}: {str(error)}")
+            self._record_provider_error(provider_name)
+    
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """URL canônica para deduplicação (sem esquema, www, fragmento e barra final)"""
+        parts = urlsplit(url.strip())
+        netloc = parts.netloc.lower()
+        if netloc.startswith('www.'):
+            netloc = netloc[4:]
+        path = parts.path.rstrip('/')
+        return f"{netloc}{path}?{parts.query}" if parts.query else f"{netloc}{path}"
+    
+    @staticmethod
+    def _is_quality_result(result: Dict[str, Any]) -> bool:
+        """Resultado aproveitável: URL http(s) e título ou trecho não vazios"""
+        url = result.get('url') or ''
+        return url.startswith(('http://', 'https://')) and bool(result.get('title') or result.get('snippet'))
+    
     def _get_provider_order(self) -> List[str]:
         """Retorna provedores ordenados por prioridade"""
         available_providers = [
@@ -145,16 +273,13 @@ class ProductionSearchManager:
     def _is_provider_available(self, provider_name: str) -> bool:
         """Verifica se provedor está disponível"""
         provider = self.providers.get(provider_name, {})
-        return (provider.get('enabled', False) and 
-                provider.get('error_count', 0) < provider.get('max_errors', 3))
+        return provider.get('enabled', False) and self.circuit_breaker.available(provider_name)
     
     def _record_provider_error(self, provider_name: str):
         """Registra erro do provedor"""
         if provider_name in self.providers:
             self.providers[provider_name]['error_count'] += 1
-            
-            if self.providers[provider_name]['error_count'] >= self.providers[provider_name]['max_errors']:
-                logger.warning(f"⚠️ Provedor {provider_name} desabilitado temporariamente")
+            self.circuit_breaker.record_failure(provider_name, threshold=self.providers[provider_name]['max_errors'])
     
     def _search_google(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando Google Custom Search API"""
@@ -237,7 +362,7 @@ class ProductionSearchManager:
         """Busca usando Bing (scraping)"""
         search_url = f"{self.providers['bing']['base_url']}?q={quote_plus(query)}&cc=br&setlang=pt-br&count={max_results}"
         
-        response = requests.get(search_url, headers=self.headers, timeout=15)
+        response = self.session.get(search_url, timeout=15)
         
         if response.status_code == 200:
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -272,7 +397,7 @@ class ProductionSearchManager:
         """Busca usando DuckDuckGo (scraping)"""
         search_url = f"{self.providers['duckduckgo']['base_url']}?q={quote_plus(query)}"
         
-        response = requests.get(search_url, headers=self.headers, timeout=15)
+        response = self.session.get(search_url, timeout=15)
         
         if response.status_code == 200:
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -311,7 +436,8 @@ class ProductionSearchManager:
                 'available': self._is_provider_available(name),
                 'priority': provider['priority'],
                 'error_count': provider['error_count'],
-                'max_errors': provider['max_errors']
+                'max_errors': provider['max_errors'],
+                'circuit': self.circuit_breaker.get_state(name)
             }
         
         return status
@@ -321,15 +447,17 @@ class ProductionSearchManager:
         if provider_name:
             if provider_name in self.providers:
                 self.providers[provider_name]['error_count'] = 0
+                self.circuit_breaker.reset(provider_name)
                 logger.info(f"🔄 Reset erros do provedor: {provider_name}")
         else:
             for provider in self.providers.values():
                 provider['error_count'] = 0
+            self.circuit_breaker.reset()
             logger.info("🔄 Reset erros de todos os provedores")
     
     def clear_cache(self):
         """Limpa cache de busca"""
-        self.cache = {}
+        search_cache.purge()
         logger.info("🧹 Cache de busca limpo")
     
     def test_provider(self, provider_name: str) -> bool:
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Prompt Budgeter
+Orçamento de tokens para montagem de prompts com contexto de pesquisa
+"""
+
+import os
+import re
+import math
+import logging
+from typing import Dict, List, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Perfis aproximados por provedor: caracteres por token (texto em português) e janela de contexto
+PROVIDER_PROFILES = {
+    'gemini': {'chars_per_token': 3.6, 'context_window': 1000000},
+    'groq': {'chars_per_token': 3.4, 'context_window': 8192},
+    'openai': {'chars_per_token': 3.3, 'context_window': 16385},
+    'huggingface': {'chars_per_token': 3.0, 'context_window': 4096},
+    'default': {'chars_per_token': 3.3, 'context_window': 8192}
+}
+
+_CONTEXT_OVERFLOW_MARKER = 'excede a janela de contexto'
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class ContextWindowExceeded(Exception):
+    """Prompt maior que a janela de contexto do provedor"""
+
+
+def is_context_overflow(error: Any) -> bool:
+    """Indica se o erro (exceção ou mensagem) é de estouro da janela de contexto"""
+    return isinstance(error, ContextWindowExceeded) or _CONTEXT_OVERFLOW_MARKER in str(error)
+
+
+class PromptBudgeter:
+    """Estimativa local de tokens e alocação de orçamento entre fontes de pesquisa"""
+
+    def __init__(self):
+        """Inicializa o budgeter"""
+        self.default_budget = int(os.getenv('PROMPT_CONTEXT_BUDGET', 6000))
+        self.min_source_tokens = 120
+        logger.info(f"✅ Prompt Budgeter inicializado (orçamento padrão: {self.default_budget} tokens)")
+
+    def _profile(self, provider: Optional[str]) -> Dict[str, Any]:
+        return PROVIDER_PROFILES.get(provider or 'default', PROVIDER_PROFILES['default'])
+
+    def estimate_tokens(self, text: Optional[str], provider: Optional[str] = None) -> int:
+        """Estimativa rápida de tokens: razão caracteres/token do provedor, corrigida por palavras"""
+        if not text:
+            return 0
+        by_chars = len(text) / self._profile(provider)['chars_per_token']
+        # Textos com muitas palavras curtas/números tokenizam pior que a média
+        by_words = len(_WORD_RE.findall(text)) * 1.3
+        return int(math.ceil(max(by_chars, by_words)))
+
+    def context_window(self, provider: Optional[str]) -> int:
+        """Janela de contexto (entrada + saída) do provedor"""
+        return self._profile(provider)['context_window']
+
+    def fit_max_tokens(self, provider: str, prompt: str, max_tokens: int) -> int:
+        """Reduz max_tokens para caber na janela; falha se o prompt sozinho não couber"""
+        window = self.context_window(provider)
+        prompt_tokens = self.estimate_tokens(prompt, provider)
+        room = window - prompt_tokens - int(window * 0.05)
+        if room < 256:
+            raise ContextWindowExceeded(
+                f"Prompt com ~{prompt_tokens} tokens {_CONTEXT_OVERFLOW_MARKER} de {provider} ({window})"
+            )
+        if room < max_tokens:
+            logger.info(f"✂️ max_tokens ajustado de {max_tokens} para {room} para caber na janela de {provider}")
+        return min(max_tokens, room)
+
+    def available_budget(
+        self,
+        provider: Optional[str] = None,
+        max_output_tokens: int = 0,
+        reserved_tokens: int = 0,
+        target: Optional[int] = None
+    ) -> int:
+        """Tokens disponíveis para o contexto de pesquisa.
+
+        Limitado pelo alvo configurado e pela janela do provedor, reservando a saída
+        (até metade da janela) e a parte fixa do prompt.
+        """
+        target = target or self.default_budget
+        window = self.context_window(provider)
+        output_reserve = min(max_output_tokens, window // 2)
+        room = window - output_reserve - reserved_tokens - int(window * 0.05)
+        return max(0, min(target, room))
+
+    def score_relevance(self, text: str, keywords: Optional[List[str]]) -> float:
+        """Relevância (0.5 a 1.0) pela fração de palavras-chave presentes no texto"""
+        terms = {t.lower() for k in (keywords or []) if k for t in _WORD_RE.findall(str(k)) if len(t) > 3}
+        if not terms or not text:
+            return 1.0
+        text_lower = text.lower()
+        hits = sum(1 for term in terms if term in text_lower)
+        return 0.5 + 0.5 * hits / len(terms)
+
+    def truncate(self, text: str, max_tokens: int, provider: Optional[str] = None) -> str:
+        """Corta o texto para caber em max_tokens, preferindo fim de frase ou palavra"""
+        if not text or self.estimate_tokens(text, provider) <= max_tokens:
+            return text or ''
+        max_chars = int(max_tokens * self._profile(provider)['chars_per_token'])
+        cut = text[:max_chars]
+        # Garante que a correção por palavras também respeite o limite
+        while cut and self.estimate_tokens(cut, provider) > max_tokens:
+            cut = cut[:int(len(cut) * 0.9)]
+        boundary = max(cut.rfind('. '), cut.rfind('\n'))
+        if boundary > len(cut) * 0.7:
+            return cut[:boundary + 1]
+        space = cut.rfind(' ')
+        return cut[:space] if space > len(cut) * 0.7 else cut
+
+    def allocate(
+        self,
+        sources: List[Dict[str, Any]],
+        budget: int,
+        provider: Optional[str] = None,
+        keywords: Optional[List[str]] = None,
+        overhead_tokens: int = 40,
+        content_key: str = 'content'
+    ) -> List[Dict[str, Any]]:
+        """Distribui o orçamento entre fontes proporcionalmente a qualidade x relevância.
+
+        Fontes curtas recebem só o que precisam e a sobra é redistribuída (water-filling).
+        Fontes que não alcançam o mínimo útil são descartadas, começando pelas de menor peso.
+        Retorna [{'source', 'tokens', 'weight'}] na ordem de peso decrescente.
+        """
+        candidates = []
+        for source in sources:
+            content = source.get(content_key) or ''
+            if not content:
+                continue
+            quality = float(source.get('quality_score', source.get('relevance_score', 50)) or 50)
+            quality = quality / 100.0 if quality > 1 else quality
+            weight = max(0.01, quality) * self.score_relevance(content, keywords)
+            candidates.append({
+                'source': source,
+                'weight': weight,
+                'needed': self.estimate_tokens(content, provider),
+                'tokens': 0
+            })
+        candidates.sort(key=lambda c: c['weight'], reverse=True)
+
+        # Mantém apenas as fontes que cabem com o mínimo útil
+        while candidates and len(candidates) * (self.min_source_tokens + overhead_tokens) > budget:
+            candidates.pop()
+
+        remaining = budget - overhead_tokens * len(candidates)
+        pending = list(candidates)
+        while pending and remaining > 0:
+            total_weight = sum(c['weight'] for c in pending)
+            satisfied = [c for c in pending if c['needed'] <= remaining * c['weight'] / total_weight]
+            if not satisfied:
+                for c in pending:
+                    c['tokens'] = int(remaining * c['weight'] / total_weight)
+                break
+            for c in satisfied:
+                c['tokens'] = c['needed']
+                remaining -= c['needed']
+                pending.remove(c)
+
+        return [{'source': c['source'], 'tokens': c['tokens'], 'weight': c['weight']} for c in candidates if c['tokens'] > 0]
+
+    def build_context(
+        self,
+        sources: List[Dict[str, Any]],
+        budget: int,
+        formatter: Callable[[int, Dict[str, Any], str], str],
+        provider: Optional[str] = None,
+        keywords: Optional[List[str]] = None,
+        content_key: str = 'content'
+    ) -> str:
+        """Monta o contexto de pesquisa dentro do orçamento.
+
+        formatter(indice, fonte, conteudo_cortado) devolve o bloco de texto de cada fonte.
+        """
+        if not sources or budget <= 0:
+            return ''
+        sample = next((s for s in sources if s.get(content_key)), sources[0])
+        overhead = self.estimate_tokens(formatter(1, sample, ''), provider)
+
+        allocation = self.allocate(sources, budget, provider, keywords, overhead, content_key)
+        blocks = [
+            formatter(i, item['source'], self.truncate(item['source'].get(content_key, ''), item['tokens'], provider))
+            for i, item in enumerate(allocation, 1)
+        ]
+        context = ''.join(blocks)
+        logger.info(
+            f"📐 Contexto montado: {len(allocation)}/{len(sources)} fontes, "
+            f"~{self.estimate_tokens(context, provider)}/{budget} tokens"
+        )
+        return context
+
+
+# Instância global
+prompt_budgeter = PromptBudgeter()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Provider Admission Controller
+Controle de admissão por provedor: token bucket (RPM/TPM) + limite de concorrência AIMD
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Limites padrão por provedor (sobrescritos por AI_LIMIT_<PROVEDOR>_RPM/_TPM/_CONCURRENCY)
+DEFAULT_LIMITS = {
+    'gemini': {'rpm': 60, 'tpm': 1000000, 'concurrency': 8},
+    'groq': {'rpm': 30, 'tpm': 30000, 'concurrency': 4},
+    'openai': {'rpm': 500, 'tpm': 200000, 'concurrency': 8},
+    'huggingface': {'rpm': 30, 'tpm': 0, 'concurrency': 2}
+}
+
+_RATE_LIMIT_MARKERS = ('429', 'rate limit', 'rate_limit', 'ratelimit', 'too many requests',
+                       'quota', 'resource_exhausted', 'resource exhausted', 'fila de admissão')
+# Cota/crédito esgotados (ex.: "insufficient_quota" da OpenAI, cota diária) não passam esperando
+_QUOTA_EXHAUSTED_MARKERS = ('insufficient_quota', 'exceeded your current quota', 'billing', 'credit balance',
+                            'payment required', 'per day', 'perday', 'daily limit')
+_TIMEOUT_MARKERS = ('timeout', 'timed out', 'deadline')
+
+
+def is_quota_exhausted_error(error: Any) -> bool:
+    """Indica se o erro (exceção ou mensagem) é de cota ou crédito esgotado (falha definitiva)"""
+    text = str(error).lower()
+    return any(m in text for m in _QUOTA_EXHAUSTED_MARKERS)
+
+
+def is_rate_limit_error(error: Any) -> bool:
+    """Indica se o erro (exceção ou mensagem) é de limite de taxa/cota transitório"""
+    if is_quota_exhausted_error(error):
+        return False
+    text = str(error).lower()
+    return type(error).__name__ == 'RateLimitError' or any(m in text for m in _RATE_LIMIT_MARKERS)
+
+
+def is_timeout_error(error: Any) -> bool:
+    """Indica se o erro (exceção ou mensagem) é de timeout"""
+    text = str(error).lower()
+    return isinstance(error, TimeoutError) or any(m in text for m in _TIMEOUT_MARKERS)
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Estimativa rápida de tokens (~4 caracteres por token)"""
+    return len(text) // 4 + 1 if text else 0
+
+
+class AdmissionTimeout(Exception):
+    """Tempo máximo na fila de admissão excedido"""
+
+
+class TokenBucket:
+    """Token bucket com reposição contínua; aceita débito para consumo posterior"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def can_take(self, amount: float) -> bool:
+        """Permite se houver saldo, ou se o bucket estiver cheio (pedidos maiores que a capacidade)"""
+        if self.unlimited:
+            return True
+        self.refill()
+        return self.tokens >= amount or self.tokens >= self.capacity
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self.refill()
+            self.tokens -= amount
+
+    def wait_time(self, amount: float) -> float:
+        """Segundos até haver saldo para o pedido"""
+        if self.unlimited:
+            return 0.0
+        self.refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else 1.0
+
+
+class _ProviderGate:
+    """Estado de admissão de um provedor"""
+
+    def __init__(self, name: str, rpm: int, tpm: int, concurrency: int):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max(1, concurrency)
+        self.limit = float(min(2, self.max_concurrency))
+        self.in_flight = 0
+        self.waiting = 0
+        self.last_decrease = 0.0
+        self.cond = threading.Condition()
+
+        # Métricas
+        self.admitted = 0
+        self.timeouts = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_queue_depth = 0
+
+
+class ProviderAdmissionController:
+    """Fila de admissão compartilhada por todas as chamadas de IA do processo"""
+
+    def __init__(self, queue_timeout: Optional[float] = None):
+        """Inicializa o controlador com os limites de cada provedor"""
+        self.queue_timeout = queue_timeout or float(os.getenv('AI_ADMISSION_TIMEOUT', 300))
+        self.decrease_cooldown = 2.0
+        self.gates: Dict[str, _ProviderGate] = {}
+        self._lock = threading.Lock()
+
+        for name in DEFAULT_LIMITS:
+            self._gate(name)
+
+        logger.info(f"✅ Provider Admission Controller inicializado para {len(self.gates)} provedores")
+
+    def _gate(self, provider: str) -> _ProviderGate:
+        """Retorna (criando se preciso) o estado de admissão do provedor"""
+        gate = self.gates.get(provider)
+        if gate is None:
+            with self._lock:
+                gate = self.gates.get(provider)
+                if gate is None:
+                    defaults = DEFAULT_LIMITS.get(provider, {'rpm': 60, 'tpm': 0, 'concurrency': 4})
+                    prefix = f"AI_LIMIT_{provider.upper()}"
+                    gate = _ProviderGate(
+                        provider,
+                        rpm=int(os.getenv(f"{prefix}_RPM", defaults['rpm'])),
+                        tpm=int(os.getenv(f"{prefix}_TPM", defaults['tpm'])),
+                        concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", defaults['concurrency']))
+                    )
+                    self.gates[provider] = gate
+        return gate
+
+    def _try_admit(self, gate: _ProviderGate, tokens: int) -> float:
+        """Tenta admitir (com gate.cond adquirido); retorna 0 se admitiu ou a pausa sugerida"""
+        has_slot = gate.in_flight < int(gate.limit)
+        if has_slot and gate.requests.can_take(1) and gate.tokens.can_take(tokens):
+            gate.requests.take(1)
+            gate.tokens.take(tokens)
+            gate.in_flight += 1
+            gate.admitted += 1
+            return 0.0
+
+        # Sem vaga de concorrência: espera um release; sem saldo: espera a reposição
+        if not has_slot:
+            return 1.0
+        return max(0.05, gate.requests.wait_time(1), gate.tokens.wait_time(tokens))
+
+    def _queue_timeout(self, gate: _ProviderGate, provider: str, timeout: float):
+        gate.timeouts += 1
+        raise AdmissionTimeout(f"{provider}: tempo máximo na fila de admissão excedido ({timeout:.0f}s)")
+
+    def _record_wait(self, gate: _ProviderGate, provider: str, waited: float):
+        gate.total_wait += waited
+        gate.max_wait = max(gate.max_wait, waited)
+        if waited > 1:
+            logger.info(f"⏳ {provider}: chamada admitida após {waited:.1f}s na fila")
+
+    def acquire(self, provider: str, tokens: int = 0, timeout: Optional[float] = None) -> float:
+        """Bloqueia até o provedor admitir a chamada; retorna o tempo de espera em segundos"""
+        gate = self._gate(provider)
+        timeout = self.queue_timeout if timeout is None else timeout
+        start = time.monotonic()
+
+        with gate.cond:
+            gate.waiting += 1
+            gate.max_queue_depth = max(gate.max_queue_depth, gate.waiting)
+            try:
+                while True:
+                    pause = self._try_admit(gate, tokens)
+                    if not pause:
+                        break
+                    remaining = timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        self._queue_timeout(gate, provider, timeout)
+                    gate.cond.wait(min(pause, remaining))
+            finally:
+                gate.waiting -= 1
+
+        waited = time.monotonic() - start
+        self._record_wait(gate, provider, waited)
+        return waited
+
+    async def aacquire(self, provider: str, tokens: int = 0, timeout: Optional[float] = None) -> float:
+        """Versão assíncrona de acquire: aguarda na fila sem bloquear o event loop"""
+        gate = self._gate(provider)
+        timeout = self.queue_timeout if timeout is None else timeout
+        start = time.monotonic()
+
+        with gate.cond:
+            gate.waiting += 1
+            gate.max_queue_depth = max(gate.max_queue_depth, gate.waiting)
+        try:
+            while True:
+                with gate.cond:
+                    pause = self._try_admit(gate, tokens)
+                if not pause:
+                    break
+                remaining = timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    with gate.cond:
+                        self._queue_timeout(gate, provider, timeout)
+                # Sem notificação entre threads e event loop: faz polling curto
+                await asyncio.sleep(min(pause, remaining, 0.25))
+        finally:
+            with gate.cond:
+                gate.waiting -= 1
+
+        waited = time.monotonic() - start
+        self._record_wait(gate, provider, waited)
+        return waited
+
+    def release(self, provider: str, error: Any = None, output_tokens: int = 0, success: bool = True):
+        """Libera a vaga e ajusta o limite AIMD conforme o desfecho da chamada"""
+        gate = self._gate(provider)
+        with gate.cond:
+            gate.in_flight = max(0, gate.in_flight - 1)
+            gate.tokens.take(output_tokens)
+
+            if error is not None and (is_rate_limit_error(error) or is_timeout_error(error)):
+                if is_rate_limit_error(error):
+                    gate.rate_limited += 1
+                now = time.monotonic()
+                # Decremento multiplicativo, no máximo uma vez por janela de cooldown
+                if now - gate.last_decrease > self.decrease_cooldown:
+                    gate.last_decrease = now
+                    gate.limit = max(1.0, gate.limit / 2)
+                    logger.warning(f"📉 {provider}: limite de concorrência reduzido para {gate.limit:.1f}")
+            elif error is None and success:
+                # Incremento aditivo: ~+1 a cada 'limit' sucessos
+                gate.limit = min(float(gate.max_concurrency), gate.limit + 1.0 / gate.limit)
+
+            gate.cond.notify_all()
+
+    @contextmanager
+    def admit(self, provider: str, tokens: int = 0):
+        """Context manager: admite, executa e libera registrando o desfecho.
+
+        O bloco pode atribuir ctx['output_tokens'] para contabilizar o TPM da resposta.
+        """
+        self.acquire(provider, tokens)
+        ctx = {'output_tokens': 0}
+        try:
+            yield ctx
+        except Exception as e:
+            self.release(provider, error=e, success=False)
+            raise
+        except BaseException:
+            # Ex.: gerador de streaming abandonado pelo consumidor
+            self.release(provider, success=False)
+            raise
+        self.release(provider, output_tokens=ctx['output_tokens'])
+
+    @asynccontextmanager
+    async def aadmit(self, provider: str, tokens: int = 0):
+        """Versão assíncrona de admit"""
+        await self.aacquire(provider, tokens)
+        ctx = {'output_tokens': 0}
+        try:
+            yield ctx
+        except Exception as e:
+            self.release(provider, error=e, success=False)
+            raise
+        except BaseException:
+            # Ex.: tarefa cancelada
+            self.release(provider, success=False)
+            raise
+        self.release(provider, output_tokens=ctx['output_tokens'])
+
+    def max_concurrency(self, provider: Optional[str]) -> int:
+        """Teto de chamadas simultâneas configurado para o provedor"""
+        return self._gate(provider).max_concurrency if provider else 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Retorna métricas de fila e limites por provedor"""
+        metrics = {}
+        for name, gate in self.gates.items():
+            metrics[name] = {
+                'concurrency_limit': round(gate.limit, 2),
+                'max_concurrency': gate.max_concurrency,
+                'in_flight': gate.in_flight,
+                'queue_depth': gate.waiting,
+                'max_queue_depth': gate.max_queue_depth,
+                'admitted': gate.admitted,
+                'admission_timeouts': gate.timeouts,
+                'rate_limited': gate.rate_limited,
+                'avg_wait_seconds': round(gate.total_wait / gate.admitted, 3) if gate.admitted else 0.0,
+                'max_wait_seconds': round(gate.max_wait, 3),
+                'rpm_limit': gate.requests.capacity,
+                'tpm_limit': gate.tokens.capacity
+            }
+        return metrics
+
+
+# Instância global
+provider_admission = ProviderAdmissionController()
@@ -5,16 +5,37 @@ ARQV30 Enhanced v2.0 - Psychological Agents System
 Sistema completo de agentes psicológicos especializados
 """
 
+import os
 import logging
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from services.ai_manager import ai_manager
+from services.provider_admission import provider_admission
+from services.prompt_budgeter import prompt_budgeter
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from services.cassette import cassette
 
 logger = logging.getLogger(__name__)
 
+_SHARED_CONTEXT_NOTE = "Ver CONTEXTO DA SESSÃO no início deste prompt"
+
+
+def _context_block(data: Dict[str, Any], session_id: Optional[str], limit: int) -> str:
+    """Dados do projeto embutidos no prompt, ou referência ao contexto compartilhado da sessão"""
+    if ai_manager.get_session_context(session_id):
+        return _SHARED_CONTEXT_NOTE
+    context_data = {k: v for k, v in data.items() if k != 'resultados_agentes'}
+    return json.dumps(context_data, indent=2, ensure_ascii=False)[:limit]
+
+
+def _with_session_context(prompt: str, session_id: Optional[str]) -> str:
+    """Antepõe o contexto compartilhado da sessão (prefixo reaproveitado entre agentes)"""
+    context = ai_manager.get_session_context(session_id)
+    return context.prompt(prompt) if context else prompt
+
 class PsychologicalAgentsSystem:
     """Sistema de agentes psicológicos especializados"""
     
@@ -48,26 +69,18 @@ class PsychologicalAgentsSystem:
             'psychological_metrics': {}
         }
         
-        # Executa cada agente em sequência
-        for agent_name, agent in self.agents.items():
-            try:
-                logger.info(f"🎭 Executando agente: {agent_name}")
-                
-                agent_result = agent.execute_analysis(data, session_id)
-                results['agents_results'][agent_name] = agent_result
-                
-                # Salva resultado de cada agente
-                salvar_etapa(f"agente_{agent_name}", agent_result, categoria="analise_completa")
-                
-                logger.info(f"✅ Agente {agent_name} concluído")
-                
-            except Exception as e:
-                logger.error(f"❌ Erro no agente {agent_name}: {e}")
-                salvar_erro(f"agente_{agent_name}", e, contexto=data)
-                results['agents_results'][agent_name] = {
-                    'error': str(e),
-                    'status': 'failed'
-                }
+        # Contexto comum a todos os agentes, enviado uma única vez por sessão (só com cache de prefixo no provedor)
+        if session_id:
+            ai_manager.create_session_context(session_id, self._shared_context_text(data))
+        
+        # Executa os agentes respeitando as dependências declaradas (depends_on);
+        # agentes independentes rodam em paralelo
+        try:
+            agents_results = self._execute_agents_dag(data, session_id)
+        finally:
+            if session_id:
+                results['shared_context'] = ai_manager.release_session_context(session_id)
+        results['agents_results'] = {name: agents_results[name] for name in self.agents if name in agents_results}
         
         # Consolida análise final
         results['consolidated_analysis'] = self._consolidate_psychological_analysis(results['agents_results'])
@@ -78,6 +91,78 @@ class PsychologicalAgentsSystem:
         
         return results
     
+    def _shared_context_text(self, data: Dict[str, Any]) -> str:
+        """Contexto de pesquisa/avatar comum aos agentes, limitado por SESSION_CONTEXT_MAX_TOKENS"""
+        max_tokens = int(os.getenv('SESSION_CONTEXT_MAX_TOKENS', 12000))
+        context_json = json.dumps(data, indent=2, ensure_ascii=False, default=str)
+        return "## CONTEXTO DA SESSÃO (DADOS DO PROJETO E PESQUISA):\n" + prompt_budgeter.truncate(context_json, max_tokens)
+    
+    def _max_workers(self) -> int:
+        """Paralelismo limitado pela concorrência do provedor de IA em uso"""
+        configured = os.getenv('PSYCHOLOGICAL_AGENTS_MAX_WORKERS')
+        if configured:
+            return max(1, int(configured))
+        return max(1, min(len(self.agents), provider_admission.max_concurrency(ai_manager.get_best_provider())))
+    
+    def _execute_agent(self, agent_name: str, agent: Any, data: Dict[str, Any], session_id: str) -> Dict[str, Any]:
+        """Executa um agente isolado"""
+        logger.info(f"🎭 Executando agente: {agent_name}")
+        start = time.time()
+        result = agent.execute_analysis(data, session_id)
+        logger.info(f"✅ Agente {agent_name} concluído em {time.time() - start:.1f}s")
+        return result
+    
+    def _execute_agents_dag(self, data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
+        """Executa os agentes em ordem topológica, disparando cada um assim que suas dependências terminam"""
+        
+        agents_results = {}
+        pending = dict(self.agents)
+        running = {}
+        
+        with ThreadPoolExecutor(max_workers=self._max_workers(), thread_name_prefix='psych_agent') as executor:
+            while pending or running:
+                # Dispara os agentes cujas dependências já concluíram
+                ready = [
+                    name for name, agent in pending.items()
+                    if all(dep in agents_results or dep not in self.agents for dep in getattr(agent, 'depends_on', []))
+                ]
+                for agent_name in ready:
+                    agent = pending.pop(agent_name)
+                    agent_data = data
+                    if getattr(agent, 'depends_on', []):
+                        agent_data = dict(data, resultados_agentes={
+                            dep: agents_results[dep] for dep in agent.depends_on if dep in agents_results
+                        })
+                    future = executor.submit(cassette.bind(self._execute_agent), agent_name, agent, agent_data, session_id)
+                    running[future] = agent_name
+                
+                if not running:
+                    # Dependência circular: nada pronto e nada executando
+                    for agent_name in pending:
+                        logger.error(f"❌ Dependência circular no agente {agent_name}")
+                        agents_results[agent_name] = {'error': 'Dependência circular', 'status': 'failed'}
+                    break
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    agent_name = running.pop(future)
+                    try:
+                        agent_result = future.result()
+                        agents_results[agent_name] = agent_result
+                        
+                        # Salva resultado de cada agente
+                        salvar_etapa(f"agente_{agent_name}", agent_result, categoria="analise_completa")
+                        
+                    except Exception as e:
+                        logger.error(f"❌ Erro no agente {agent_name}: {e}")
+                        salvar_erro(f"agente_{agent_name}", e, contexto=data)
+                        agents_results[agent_name] = {
+                            'error': str(e),
+                            'status': 'failed'
+                        }
+        
+        return agents_results
+    
     def _consolidate_psychological_analysis(self, agents_results: Dict[str, Any]) -> Dict[str, Any]:
         """Consolida resultados de todos os agentes"""
         
@@ -154,6 +239,8 @@ class PsychologicalAgentsSystem:
 class ArchaeologistAgent:
     """ARQUEÓLOGO MESTRE DA PERSUASÃO"""
     
+    depends_on: List[str] = []
+    
     def execute_analysis(self, data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
         """Executa análise arqueológica em 12 camadas"""
         
@@ -188,7 +275,7 @@ Execute uma análise ULTRA-PROFUNDA seguindo estas camadas:
 RETORNE JSON ESTRUTURADO ULTRA-COMPLETO com análise arqueológica detalhada.
 """
         
-        response = ai_manager.generate_analysis(prompt, max_tokens=8192)
+        response = ai_manager.stream_analysis_to_session(_with_session_context(prompt, session_id), session_id, 'agente_arqueologist', max_tokens=8192)
         
         if response:
             return self._process_archaeological_response(response, data)
@@ -264,6 +351,8 @@ RETORNE JSON ESTRUTURADO ULTRA-COMPLETO com análise arqueológica detalhada.
 class VisceralMasterAgent:
     """MESTRE DA PERSUASÃO VISCERAL"""
     
+    depends_on: List[str] = []
+    
     def execute_analysis(self, data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
         """Executa engenharia reversa psicológica profunda"""
         
@@ -274,7 +363,7 @@ Linguagem: Direta, brutalmente honesta, carregada de tensão psicológica.
 Missão: Realizar Engenharia Reversa Psicológica PROFUNDA.
 
 ## DADOS PARA ENGENHARIA REVERSA:
-{json.dumps(data, indent=2, ensure_ascii=False)[:3000]}
+{_context_block(data, session_id, 3000)}
 
 ## EXECUTE ENGENHARIA REVERSA PSICOLÓGICA PROFUNDA:
 
@@ -345,7 +434,7 @@ RETORNE JSON com análise visceral completa:
 ```
 """
         
-        response = ai_manager.generate_analysis(prompt, max_tokens=8192)
+        response = ai_manager.stream_analysis_to_session(_with_session_context(prompt, session_id), session_id, 'agente_visceral_master', max_tokens=8192)
         
         if response:
             return self._process_visceral_response(response, data)
@@ -407,6 +496,8 @@ RETORNE JSON com análise visceral completa:
 class DriversArchitectAgent:
     """ARQUITETO DE DRIVERS MENTAIS"""
     
+    depends_on: List[str] = []
+    
     def execute_analysis(self, data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
         """Cria arsenal completo de drivers mentais"""
         
@@ -437,7 +528,7 @@ Missão: Criar gatilhos psicológicos que funcionam como âncoras emocionais e r
 19. DRIVER DO MÉTODO VS SORTE
 
 ## CONTEXTO DO PROJETO:
-{json.dumps(data, indent=2, ensure_ascii=False)[:2000]}
+{_context_block(data, session_id, 2000)}
 
 ## CRIE DRIVERS MENTAIS CUSTOMIZADOS:
 
@@ -493,7 +584,7 @@ RETORNE JSON com drivers customizados completos:
 ```
 """
         
-        response = ai_manager.generate_analysis(prompt, max_tokens=8192)
+        response = ai_manager.stream_analysis_to_session(_with_session_context(prompt, session_id), session_id, 'agente_drivers_architect', max_tokens=8192)
         
         if response:
             return self._process_drivers_response(response, data)
@@ -538,6 +629,8 @@ RETORNE JSON com drivers customizados completos:
 class VisualDirectorAgent:
     """DIRETOR SUPREMO DE EXPERIÊNCIAS TRANSFORMADORAS"""
     
+    depends_on: List[str] = []
+    
     def execute_analysis(self, data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
         """Cria arsenal completo de PROVIs"""
         
@@ -555,7 +648,7 @@ Missão: Transformar TODOS os conceitos abstratos em experiências físicas ines
 - **PROVAS DE MÉTODO**: Demonstrações de eficácia
 
 ## CONTEXTO PARA CRIAÇÃO:
-{json.dumps(data, indent=2, ensure_ascii=False)[:2000]}
+{_context_block(data, session_id, 2000)}
 
 ## CRIE ARSENAL COMPLETO DE PROVIS:
 
@@ -632,7 +725,7 @@ RETORNE JSON com arsenal completo de PROVIs:
 ```
 """
         
-        response = ai_manager.generate_analysis(prompt, max_tokens=8192)
+        response = ai_manager.stream_analysis_to_session(_with_session_context(prompt, session_id), session_id, 'agente_visual_director', max_tokens=8192)
         
         if response:
             return self._process_visual_response(response, data)
@@ -673,6 +766,8 @@ RETORNE JSON com arsenal completo de PROVIs:
 class AntiObjectionAgent:
     """ESPECIALISTA EM PSICOLOGIA DE VENDAS"""
     
+    depends_on: List[str] = []
+    
     def execute_analysis(self, data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
         """Cria sistema anti-objeção completo"""
         
@@ -694,7 +789,7 @@ Missão: Criar ARSENAL PSICOLÓGICO para identificar, antecipar e neutralizar TO
 5. **AUTOESTIMA DESTRUÍDA**: "Não confio em mim"
 
 ## CONTEXTO PARA ANÁLISE:
-{json.dumps(data, indent=2, ensure_ascii=False)[:2000]}
+{_context_block(data, session_id, 2000)}
 
 ## CRIE SISTEMA ANTI-OBJEÇÃO COMPLETO:
 
@@ -764,7 +859,7 @@ RETORNE JSON com sistema anti-objeção completo:
 ```
 """
         
-        response = ai_manager.generate_analysis(prompt, max_tokens=8192)
+        response = ai_manager.stream_analysis_to_session(_with_session_context(prompt, session_id), session_id, 'agente_anti_objection', max_tokens=8192)
         
         if response:
             return self._process_anti_objection_response(response, data)
@@ -805,9 +900,16 @@ RETORNE JSON com sistema anti-objeção completo:
 class PrePitchArchitectAgent:
     """MESTRE DO PRÉ-PITCH INVISÍVEL"""
     
+    # Orquestra os drivers criados pelo arquiteto (recebidos em data['resultados_agentes'])
+    depends_on: List[str] = ['drivers_architect']
+    
     def execute_analysis(self, data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
         """Cria orquestração psicológica completa"""
         
+        upstream = data.get('resultados_agentes', {})
+        drivers = upstream.get('drivers_architect', {}).get('drivers_customizados', [])
+        drivers_context = json.dumps(drivers, indent=2, ensure_ascii=False)[:3000] if drivers else "Nenhum driver disponível - crie drivers adequados ao contexto"
+        
         prompt = f"""
 # VOCÊ É O MESTRE DO PRÉ-PITCH INVISÍVEL
 
@@ -830,7 +932,10 @@ Missão: Orquestrar SINFONIA DE TENSÃO PSICOLÓGICA que prepara terreno mental.
 - Cases com métricas específicas
 
 ## CONTEXTO:
-{json.dumps(data, indent=2, ensure_ascii=False)[:2000]}
+{_context_block(data, session_id, 2000)}
+
+## DRIVERS MENTAIS A ORQUESTRAR:
+{drivers_context}
 
 ## CRIE PRÉ-PITCH COMPLETO:
 
@@ -889,7 +994,7 @@ RETORNE JSON com orquestração completa:
 ```
 """
         
-        response = ai_manager.generate_analysis(prompt, max_tokens=8192)
+        response = ai_manager.stream_analysis_to_session(_with_session_context(prompt, session_id), session_id, 'agente_pre_pitch_architect', max_tokens=8192)
         
         if response:
             return self._process_pre_pitch_response(response, data)
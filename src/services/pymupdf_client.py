@@ -8,7 +8,6 @@ Cliente para processamento avançado de PDFs com PyMuPDF Pro
 import os
 import logging
 import tempfile
-import requests
 from typing import Dict, List, Optional, Any, Union
 from datetime import datetime
 
@@ -19,6 +18,8 @@ try:
 except ImportError:
     HAS_PYMUPDF = False
 
+from services.http_fetcher import http_fetcher
+
 logger = logging.getLogger(__name__)
 
 class PyMuPDFProClient:
@@ -168,8 +169,9 @@ class PyMuPDFProClient:
             return {'success': False, 'error': 'PyMuPDF não disponível'}
         
         try:
-            # Baixa PDF temporariamente
-            response = requests.get(url, timeout=60)
+            # Baixa PDF temporariamente (via cache de páginas compartilhado; páginas
+            # HTML e arquivos acima de FETCH_MAX_PDF_MB são abortados no início)
+            response = http_fetcher.fetch(url, timeout=60, accept=('pdf',))
             response.raise_for_status()
             
             with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
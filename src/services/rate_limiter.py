@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Rate Limiter
+Token buckets por host e por provedor de busca, no lugar de pausas fixas (time.sleep)
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, Any, Callable, Optional, Tuple
+from urllib.parse import urlsplit
+
+from services.cassette import cassette
+
+logger = logging.getLogger(__name__)
+
+try:
+    import requests
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+
+# Hosts raspados diretamente (sem API) toleram bem menos requisições
+_DEFAULT_HOST_LIMITS = {
+    'google.com': (0.4, 1),
+    'bing.com': (1.0, 2),
+    'duckduckgo.com': (1.0, 1),
+    'search.yahoo.com': (1.0, 1)
+}
+
+
+def _parse_limits(raw: str) -> Dict[str, Tuple[float, int]]:
+    """Interpreta "nome=rps[/burst],..." (ex.: "google.com=0.5/1,serper=5")"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in (raw or '').split(','))):
+        try:
+            name, spec = item.split('=', 1)
+            rate, _, burst = spec.partition('/')
+            limits[name.strip().lower()] = (float(rate), int(burst) if burst else max(1, int(float(rate))))
+        except ValueError:
+            logger.warning(f"⚠️ Limite de taxa inválido ignorado: {item}")
+    return limits
+
+
+class _TokenBucket:
+    """Balde de tokens; tokens negativos representam a fila de reservas já feitas"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.requests = 0
+        self.waited = 0
+        self.wait_time = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Consome um token e retorna quanto o chamador deve esperar por ele"""
+        self._refill(time.monotonic())
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        self.requests += 1
+        if wait:
+            self.waited += 1
+            self.wait_time += wait
+        return wait
+
+    def penalize(self, seconds: float):
+        """Garante que o próximo token só fique disponível daqui a `seconds`"""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+class RateLimiter:
+    """Limites de taxa compartilhados por todo o código de busca e extração.
+
+    Cada host tem seu próprio balde, aplicado às requisições do http_fetcher e
+    das sessões criadas com session() (raspagem dos buscadores), então
+    requisições para domínios diferentes seguem em paralelo enquanto cada
+    domínio respeita o seu limite. Chamadas às APIs de IA e de busca não passam
+    pelos baldes de host: provedores de busca têm baldes próprios
+    (acquire_provider / limited) para respeitar a cota de cada API. Respostas
+    429 atrasam o host pelo Retry-After. Os baldes valem por processo.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, max_buckets: int = 5000):
+        """Inicializa o limitador com os limites configurados"""
+        if enabled is None:
+            enabled = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+        # Em replay não há tráfego real a proteger
+        self.enabled = enabled and not cassette.replaying
+
+        self.host_rate = float(os.getenv('RATE_LIMIT_HOST_RPS', 2.0))
+        self.host_burst = int(os.getenv('RATE_LIMIT_HOST_BURST', 2))
+        self.provider_rate = float(os.getenv('RATE_LIMIT_PROVIDER_RPS', 2.0))
+        self.provider_burst = int(os.getenv('RATE_LIMIT_PROVIDER_BURST', 2))
+        self.backoff_429 = float(os.getenv('RATE_LIMIT_429_BACKOFF', 15))
+
+        self.host_limits = {**_DEFAULT_HOST_LIMITS, **_parse_limits(os.getenv('RATE_LIMIT_HOSTS', ''))}
+        self.provider_limits = _parse_limits(os.getenv('RATE_LIMIT_PROVIDERS', 'serper=5/5,exa=5/5'))
+
+        self.max_buckets = max_buckets
+        self._buckets: 'OrderedDict[str, _TokenBucket]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return (urlsplit(url).hostname or '').lower()
+
+    def _host_limit(self, host: str) -> Tuple[float, int]:
+        """Limite do host ou do domínio pai mais próximo configurado"""
+        parts = host.split('.')
+        for i in range(len(parts) - 1):
+            limit = self.host_limits.get('.'.join(parts[i:]))
+            if limit:
+                return limit
+        return self.host_rate, self.host_burst
+
+    def _bucket(self, key: str, limit: Tuple[float, int]) -> _TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _TokenBucket(*limit)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _reserve(self, key: str, limit: Tuple[float, int]) -> float:
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            wait = self._bucket(key, limit).reserve()
+        if wait > 0:
+            logger.debug(f"⏳ Rate limit {key}: aguardando {wait:.2f}s")
+        return wait
+
+    def _acquire(self, key: str, limit: Tuple[float, int]) -> float:
+        wait = self._reserve(key, limit)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def _reserve_host(self, url: str) -> float:
+        host = self.host_of(url)
+        if not host:
+            return 0.0
+        return self._reserve(f"host:{host}", self._host_limit(host))
+
+    def acquire_host(self, url: str) -> float:
+        """Aguarda a vez do host da URL; retorna o tempo esperado"""
+        wait = self._reserve_host(url)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire_host(self, url: str) -> float:
+        """Versão assíncrona de acquire_host (não bloqueia o event loop)"""
+        wait = self._reserve_host(url)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def acquire_provider(self, provider: str) -> float:
+        """Aguarda a vez do provedor de busca; retorna o tempo esperado"""
+        limit = self.provider_limits.get(provider.lower(), (self.provider_rate, self.provider_burst))
+        return self._acquire(f"provider:{provider.lower()}", limit)
+
+    def limited(self, provider: str) -> Callable:
+        """Decorador que consome um token do provedor antes de cada chamada"""
+        def decorator(fn: Callable) -> Callable:
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                self.acquire_provider(provider)
+                return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def backoff(self, url: str, seconds: Optional[float] = None):
+        """Adia as próximas requisições ao host (ex.: após HTTP 429)"""
+        host = self.host_of(url)
+        if not self.enabled or not host:
+            return
+        seconds = self.backoff_429 if seconds is None else seconds
+        with self._lock:
+            self._bucket(f"host:{host}", self._host_limit(host)).penalize(seconds)
+        logger.warning(f"⚠️ {host} pediu para desacelerar: pausando {seconds:.1f}s")
+
+    @staticmethod
+    def retry_after(headers) -> Optional[float]:
+        """Segundos pedidos pelo cabeçalho Retry-After (None se ausente ou em formato de data)"""
+        try:
+            return float(headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
+
+    def session(self, headers: Optional[Dict[str, str]] = None) -> 'requests.Session':
+        """requests.Session cujas requisições (e redirecionamentos) respeitam o limite de cada host"""
+        session = RateLimitedSession(self)
+        if headers:
+            session.headers.update(headers)
+        return session
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Requisições e esperas por balde (host:... e provider:...)"""
+        with self._lock:
+            buckets = {
+                key: {
+                    'rate': bucket.rate,
+                    'burst': bucket.burst,
+                    'requests': bucket.requests,
+                    'waited': bucket.waited,
+                    'wait_time': round(bucket.wait_time, 2)
+                }
+                for key, bucket in self._buckets.items()
+            }
+        return {'enabled': self.enabled, 'buckets': buckets}
+
+
+if HAS_REQUESTS:
+    class RateLimitedSession(requests.Session):
+        """Session que aguarda o balde do host antes de cada envio e respeita 429"""
+
+        def __init__(self, limiter: RateLimiter):
+            super().__init__()
+            self.limiter = limiter
+
+        def send(self, request, **kwargs):
+            self.limiter.acquire_host(request.url)
+            response = super().send(request, **kwargs)
+            if getattr(response, 'status_code', None) == 429:
+                self.limiter.backoff(request.url, self.limiter.retry_after(response.headers))
+            return response
+
+
+# Instância global
+rate_limiter = RateLimiter()
@@ -38,12 +38,6 @@ try:
 except ImportError:
     HAS_NEWSPAPER = False
 
-try:
-    from bs4 import BeautifulSoup
-    HAS_BEAUTIFULSOUP = True
-except ImportError:
-    HAS_BEAUTIFULSOUP = False
-
 try:
     import PyPDF2
     HAS_PYPDF2 = True
@@ -63,6 +57,9 @@ except ImportError:
     HAS_PYMUPDF = False
 
 from services.url_resolver import url_resolver
+from services.http_fetcher import http_fetcher, FetchError, FetchResponse
+from services.parse_pool import parse_pool, ParseTimeout
+from services.parsed_document import ParsedDocument, HAS_LXML
 
 logger = logging.getLogger(__name__)
 
@@ -70,26 +67,18 @@ class RobustContentExtractor:
     """Extrator de conteúdo multicamadas e robusto com suporte aprimorado a PDF"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        })
-        
         self.timeout = 30
         self.min_content_length = 200  # Reduzido de 500 para 200
         self.max_content_length = 50000  # 50K chars max
+        # Tipos de conteúdo baixados (o tipo real é identificado no início do download)
+        self.accepted_types = ('html', 'text', 'pdf')
         
         # Estatísticas dos extratores
         self.stats = {
             'trafilatura': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_TRAFILATURA},
             'readability': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_READABILITY},
             'newspaper': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_NEWSPAPER},
-            'beautifulsoup': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_BEAUTIFULSOUP},
+            'dom': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_LXML},
             'pdf_pypdf2': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_PYPDF2},
             'pdf_pdfplumber': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_PDFPLUMBER},
             'pdf_pymupdf': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_PYMUPDF},
@@ -104,10 +93,13 @@ class RobustContentExtractor:
         logger.info("🔧 Robust Content Extractor inicializado")
         logger.info(f"📚 Extratores disponíveis: {self._get_available_extractors()}")
     
-    def extract_content(self, url: str) -> Optional[str]:
+    def extract_content(self, url: str, html: Optional[str] = None) -> Optional[str]:
         """
         Extrai conteúdo usando múltiplos extratores em ordem de prioridade
         Agora com suporte aprimorado a PDF e melhor fallback
+        
+        Args:
+            html (str): HTML já baixado da URL (ex.: por batch_extract); evita novo download
         """
         if not url or not url.startswith('http'):
             logger.error(f"❌ URL inválida: {url}")
@@ -138,120 +130,32 @@ class RobustContentExtractor:
                 self._update_global_stats()
                 return None
             
-            # 2. Verifica se é PDF
-            if self._is_pdf_url(url):
-                logger.info("📄 Detectado PDF - usando extratores especializados")
-                content = self._extract_pdf_content(url)
-                if content and self._validate_content(content, url):
-                    # Salva extração de PDF bem-sucedida
-                    salvar_etapa("extracao_pdf", {
-                        "url": url,
-                        "content_length": len(content),
-                        "extractor": "pdf_specialized"
-                    }, categoria="pesquisa_web")
-                    self.stats['global']['total_successes'] += 1
+            # 2. Etapa de I/O: baixa a página (bytes; o tipo vem dos cabeçalhos e dos primeiros bytes)
+            if html:
+                content_bytes, encoding = html.encode('utf-8'), 'utf-8'
+            else:
+                response = self._fetch_page(url)
+                if response is None:
+                    logger.error(f"❌ Falha ao baixar HTML para {url}")
+                    salvar_erro("download_html", Exception(f"Falha no download: {url}"))
+                    self.stats['global']['total_failures'] += 1
                     self._update_global_stats()
-                    return content
-            
-            # 3. Baixa conteúdo HTML
-            html_content = self._fetch_html(url)
-            if not html_content:
-                logger.error(f"❌ Falha ao baixar HTML para {url}")
-                salvar_erro("download_html", Exception(f"Falha no download: {url}"))
-                self.stats['global']['total_failures'] += 1
-                self._update_global_stats()
-                return None
+                    return None
+                
+                # 3. PDF: extratores especializados
+                if response.kind == 'pdf':
+                    return self._record_pdf(url, self._extract_pdf_content(url, response.content))
+                content_bytes, encoding = response.content, response.encoding
             
             # Valida HTML mínimo
-            if len(html_content) < 500:
-                logger.warning(f"⚠️ HTML muito pequeno: {len(html_content)} caracteres")
+            if len(content_bytes) < 500:
+                logger.warning(f"⚠️ HTML muito pequeno: {len(content_bytes)} bytes")
                 # Continua tentando extrair, mas com expectativas baixas
             
-            logger.info(f"📥 HTML baixado: {len(html_content)} caracteres")
-            
-            # 4. Verifica se é página dinâmica (JavaScript-heavy)
-            if self._is_dynamic_page(html_content):
-                logger.warning(f"⚠️ Página dinâmica detectada: {url}")
-                # Tenta extração mais agressiva
-                content = self._extract_dynamic_content(html_content, url)
-                if content and self._validate_content(content, url):
-                    # Salva extração dinâmica bem-sucedida
-                    salvar_etapa("extracao_dinamica", {
-                        "url": url,
-                        "content_length": len(content),
-                        "extractor": "dynamic_specialized"
-                    }, categoria="pesquisa_web")
-                    self.stats['global']['total_successes'] += 1
-                    self._update_global_stats()
-                    return content
-            
-            # 5. Tenta extratores em ordem de prioridade
-            extractors = [
-                ('trafilatura', self._extract_with_trafilatura),
-                ('readability', self._extract_with_readability),
-                ('newspaper', self._extract_with_newspaper),
-                ('beautifulsoup', self._extract_with_beautifulsoup)
-            ]
-            
-            for extractor_name, extractor_func in extractors:
-                if not self._is_extractor_available(extractor_name):
-                    continue
-                
-                try:
-                    logger.info(f"🔍 Tentando extração com {extractor_name}...")
-                    extractor_start = time.time()
-                    self.stats[extractor_name]['usage_count'] += 1
-                    
-                    content = extractor_func(html_content, url)
-                    extractor_time = time.time() - extractor_start
-                    
-                    if self._validate_content(content, url):
-                        self.stats[extractor_name]['success'] += 1
-                        self.stats[extractor_name]['total_time'] += extractor_time
-                        self.stats['global']['total_successes'] += 1
-                        self._update_global_stats()
-                        
-                        # Salva extração bem-sucedida
-                        salvar_etapa("extracao_sucesso", {
-                            "url": url,
-                            "extractor": extractor_name,
-                            "content_length": len(content),
-                            "extraction_time": extractor_time
-                        }, categoria="pesquisa_web")
-                        
-                        logger.info(f"✅ Extração bem-sucedida com {extractor_name}: {len(content)} caracteres em {extractor_time:.2f}s")
-                        return content
-                    else:
-                        self.stats[extractor_name]['failed'] += 1
-                        logger.warning(f"⚠️ Conteúdo insuficiente com {extractor_name}: {len(content) if content else 0} caracteres")
-                        
-                except Exception as e:
-                    self.stats[extractor_name]['failed'] += 1
-                    logger.error(f"❌ Erro com {extractor_name}: {str(e)}")
-                    salvar_erro(f"extrator_{extractor_name}", e, contexto={"url": url})
-                    continue
-            
-            # 6. Fallback final - extração agressiva
-            logger.warning(f"⚠️ Todos os extratores padrão falharam, tentando extração agressiva...")
-            content = self._aggressive_fallback_extraction(html_content, url)
-            if content and len(content) >= 100:  # Critério mais flexível para fallback
-                logger.info(f"✅ Extração agressiva bem-sucedida: {len(content)} caracteres")
-                # Salva fallback bem-sucedido
-                salvar_etapa("extracao_fallback", {
-                    "url": url,
-                    "content_length": len(content),
-                    "extractor": "aggressive_fallback"
-                }, categoria="pesquisa_web")
-                self.stats['global']['total_successes'] += 1
-                self._update_global_stats()
-                return content
+            logger.info(f"📥 HTML baixado: {len(content_bytes)} bytes")
             
-            # Todos os extratores falharam
-            logger.error(f"❌ FALHA CRÍTICA: Todos os extratores falharam para {url}")
-            salvar_erro("extracao_total_falha", Exception(f"Todos extratores falharam: {url}"))
-            self.stats['global']['total_failures'] += 1
-            self._update_global_stats()
-            return None
+            # 4. Etapa de CPU: cascata de extratores no parse_pool
+            return self._record_parse(url, self._parse(url, content_bytes, encoding))
             
         except Exception as e:
             logger.error(f"❌ Erro crítico na extração de {url}: {str(e)}")
@@ -260,23 +164,41 @@ class RobustContentExtractor:
             self._update_global_stats()
             return None
     
-    def _is_pdf_url(self, url: str) -> bool:
-        """Verifica se a URL aponta para um PDF"""
-        return (url.lower().endswith('.pdf') or 
-                'pdf' in url.lower() or 
-                'application/pdf' in url.lower())
+    def _record_pdf(self, url: str, content: Optional[str]) -> Optional[str]:
+        """Aplica as estatísticas e registros de uma extração de PDF"""
+        if content and self._validate_content(content, url, is_pdf=True):
+            # Salva extração de PDF bem-sucedida
+            salvar_etapa("extracao_pdf", {
+                "url": url,
+                "content_length": len(content),
+                "extractor": "pdf_specialized"
+            }, categoria="pesquisa_web")
+            self.stats['global']['total_successes'] += 1
+            self._update_global_stats()
+            return content
+        
+        logger.error(f"❌ FALHA CRÍTICA: Nenhum conteúdo válido no PDF {url}")
+        self.stats['global']['total_failures'] += 1
+        self._update_global_stats()
+        return None
     
-    def _extract_pdf_content(self, url: str) -> Optional[str]:
-        """Extrai conteúdo de PDF usando múltiplas estratégias"""
+    def _extract_pdf_content(self, url: str, pdf_bytes: Optional[bytes] = None) -> Optional[str]:
+        """Extrai conteúdo de PDF usando múltiplas estratégias
+        
+        Args:
+            pdf_bytes (bytes): PDF já baixado; sem ele, baixa a URL aceitando apenas PDF
+        """
         
         try:
-            # Baixa o PDF
-            response = self.session.get(url, timeout=self.timeout)
-            response.raise_for_status()
+            # Baixa o PDF (streaming com limite de FETCH_MAX_PDF_MB)
+            if pdf_bytes is None:
+                response = http_fetcher.fetch(url, timeout=self.timeout, accept=('pdf',))
+                response.raise_for_status()
+                pdf_bytes = response.content
             
             # Salva temporariamente
             with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                temp_file.write(response.content)
+                temp_file.write(pdf_bytes)
                 temp_path = temp_file.name
             
             try:
@@ -382,8 +304,9 @@ class RobustContentExtractor:
             logger.error(f"Erro PyMuPDF: {e}")
             return None
     
-    def _is_dynamic_page(self, html: str) -> bool:
+    def _is_dynamic_page(self, doc: ParsedDocument) -> bool:
         """Verifica se é página dinâmica (JavaScript-heavy)"""
+        html = doc.html
         if not html:
             return False
         
@@ -399,24 +322,19 @@ class RobustContentExtractor:
         js_indicators = sum(1 for indicator in dynamic_indicators if indicator in html_lower)
         
         # Se tem muitos indicadores JS e pouco conteúdo de texto
-        text_content = BeautifulSoup(html, 'html.parser').get_text() if HAS_BEAUTIFULSOUP else html
-        text_ratio = len(text_content.strip()) / len(html) if html else 0
+        text_ratio = len(doc.text.strip()) / len(html)
         
         return js_indicators > 3 and text_ratio < 0.1
     
-    def _extract_dynamic_content(self, html: str, url: str) -> Optional[str]:
+    def _extract_dynamic_content(self, doc: ParsedDocument, url: str) -> Optional[str]:
         """Extração especializada para conteúdo dinâmico"""
         
-        if not HAS_BEAUTIFULSOUP:
+        # Remove scripts e elementos dinâmicos
+        tree = doc.pruned(('script', 'style', 'noscript', 'iframe'))
+        if tree is None:
             return None
         
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Remove scripts e elementos dinâmicos
-            for element in soup(['script', 'style', 'noscript', 'iframe']):
-                element.decompose()
-            
             # Busca por elementos com conteúdo pré-renderizado
             content_selectors = [
                 '[data-content]', '[data-text]', '.content-loaded',
@@ -428,42 +346,34 @@ class RobustContentExtractor:
             extracted_content = []
             
             for selector in content_selectors:
-                try:
-                    elements = soup.select(selector)
-                    for element in elements:
-                        text = element.get_text(strip=True)
-                        if len(text) > 50:  # Conteúdo substancial
-                            extracted_content.append(text)
-                except:
-                    continue
+                for element in doc.select(tree, selector):
+                    text = doc.element_text(element, strip=True)
+                    if len(text) > 50:  # Conteúdo substancial
+                        extracted_content.append(text)
             
             if extracted_content:
                 combined = '\n\n'.join(extracted_content)
                 return self._clean_content(combined)
             
             # Fallback: extrai todo texto disponível
-            all_text = soup.get_text()
+            all_text = tree.text_content()
             return self._clean_content(all_text) if len(all_text) > 100 else None
             
         except Exception as e:
             logger.error(f"Erro na extração dinâmica: {e}")
             return None
     
-    def _aggressive_fallback_extraction(self, html: str, url: str) -> Optional[str]:
+    def _aggressive_fallback_extraction(self, doc: ParsedDocument, url: str) -> Optional[str]:
         """Extração agressiva como último recurso"""
         
-        if not HAS_BEAUTIFULSOUP:
+        # Remove apenas elementos críticos
+        tree = doc.pruned(('script', 'style'))
+        if tree is None:
             return None
         
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Remove apenas elementos críticos
-            for element in soup(['script', 'style']):
-                element.decompose()
-            
             # Coleta todo texto disponível
-            all_text = soup.get_text()
+            all_text = tree.text_content()
             
             # Filtra linhas com conteúdo significativo
             lines = all_text.split('\n')
@@ -486,57 +396,136 @@ class RobustContentExtractor:
             logger.error(f"Erro na extração agressiva: {e}")
             return None
     
-    def _fetch_html(self, url: str) -> Optional[str]:
-        """Baixa conteúdo HTML da URL com retry"""
-        max_retries = 3
+    def _fetch_page(self, url: str) -> Optional[FetchResponse]:
+        """Baixa a página da URL (retry com backoff fica a cargo do http_fetcher;
+        binários e corpos acima do limite são abortados no início do download)"""
+        try:
+            response = http_fetcher.fetch(url, timeout=self.timeout, accept=self.accepted_types)
+            response.raise_for_status()
+        except FetchError as e:
+            logger.error(f"❌ Erro ao baixar {url}: {str(e)}")
+            return None
+        return response
+    
+    def _parse(self, url: str, content: bytes, encoding: Optional[str]) -> Dict[str, Any]:
+        """Roda _parse_html em um processo do parse_pool"""
+        try:
+            return parse_pool.run(_parse_page, url, content, encoding)
+        except ParseTimeout as e:
+            logger.error(f"⏱️ Parsing de {url} interrompido: {e}")
+            return {'content': None, 'extractor': None, 'attempts': []}
+    
+    def _parse_html(self, html: str, url: str) -> Dict[str, Any]:
+        """
+        Etapa de CPU: cascata de extratores sobre o HTML
+        
+        Não faz I/O nem altera estatísticas (pode rodar em outro processo);
+        _record_parse aplica o resultado no processo principal.
+        """
+        attempts = []
+        # Parseado uma única vez; todas as estratégias consomem o mesmo documento
+        doc = ParsedDocument(html, url)
+        
+        # Página dinâmica (JavaScript-heavy): tenta extração mais agressiva
+        if self._is_dynamic_page(doc):
+            logger.warning(f"⚠️ Página dinâmica detectada: {url}")
+            content = self._extract_dynamic_content(doc, url)
+            if content and self._validate_content(content, url):
+                return {'content': content, 'extractor': 'dynamic', 'attempts': attempts}
+        
+        # Extratores em ordem de prioridade
+        extractors = [
+            ('trafilatura', self._extract_with_trafilatura),
+            ('readability', self._extract_with_readability),
+            ('newspaper', self._extract_with_newspaper),
+            ('dom', self._extract_with_dom)
+        ]
         
-        for attempt in range(max_retries):
+        for extractor_name, extractor_func in extractors:
+            if not self._is_extractor_available(extractor_name):
+                continue
+            
+            logger.info(f"🔍 Tentando extração com {extractor_name}...")
+            extractor_start = time.time()
             try:
-                response = self.session.get(
-                    url,
-                    timeout=self.timeout,
-                    verify=False,  # Para evitar problemas de SSL
-                    allow_redirects=True
-                )
-                
-                response.raise_for_status()
-                
-                # Detecta encoding
-                if response.encoding is None:
-                    response.encoding = 'utf-8'
-                
-                html = response.text
-                
-                if len(html) < 500:
-                    logger.warning(f"⚠️ HTML muito pequeno (tentativa {attempt + 1}): {len(html)} caracteres")
-                    if attempt < max_retries - 1:
-                        time.sleep(2)  # Aguarda antes de tentar novamente
-                        continue
-                
-                return html
-                
-            except requests.exceptions.Timeout:
-                logger.warning(f"⏰ Timeout na tentativa {attempt + 1} para {url}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 + random.uniform(0, 2))  # Delay aleatório
-                    continue
+                content = extractor_func(doc, url)
+                valid = self._validate_content(content, url)
+                attempts.append({'extractor': extractor_name, 'success': valid, 'time': time.time() - extractor_start})
+                if valid:
+                    return {'content': content, 'extractor': extractor_name, 'attempts': attempts}
+                logger.warning(f"⚠️ Conteúdo insuficiente com {extractor_name}: {len(content) if content else 0} caracteres")
             except Exception as e:
-                logger.error(f"❌ Erro ao baixar {url} (tentativa {attempt + 1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 + random.uniform(0, 2))  # Delay aleatório
-                    continue
+                attempts.append({'extractor': extractor_name, 'success': False, 'time': time.time() - extractor_start, 'error': str(e)})
+                logger.error(f"❌ Erro com {extractor_name}: {str(e)}")
         
-        return None
+        # Fallback final - extração agressiva
+        logger.warning(f"⚠️ Todos os extratores padrão falharam, tentando extração agressiva...")
+        content = self._aggressive_fallback_extraction(doc, url)
+        if content and len(content) >= 100:  # Critério mais flexível para fallback
+            return {'content': content, 'extractor': 'aggressive_fallback', 'attempts': attempts}
+        
+        return {'content': None, 'extractor': None, 'attempts': attempts}
     
-    def _extract_with_trafilatura(self, html: str, url: str) -> Optional[str]:
+    def _record_parse(self, url: str, result: Dict[str, Any]) -> Optional[str]:
+        """Aplica no processo principal as estatísticas e registros da etapa de parsing"""
+        for attempt in result['attempts']:
+            stats = self.stats[attempt['extractor']]
+            stats['usage_count'] += 1
+            if attempt['success']:
+                stats['success'] += 1
+                stats['total_time'] += attempt['time']
+            else:
+                stats['failed'] += 1
+                if attempt.get('error'):
+                    salvar_erro(f"extrator_{attempt['extractor']}", Exception(attempt['error']), contexto={"url": url})
+        
+        content, extractor = result['content'], result['extractor']
+        if not content:
+            # Todos os extratores falharam
+            logger.error(f"❌ FALHA CRÍTICA: Todos os extratores falharam para {url}")
+            salvar_erro("extracao_total_falha", Exception(f"Todos extratores falharam: {url}"))
+            self.stats['global']['total_failures'] += 1
+            self._update_global_stats()
+            return None
+        
+        if extractor == 'dynamic':
+            salvar_etapa("extracao_dinamica", {
+                "url": url,
+                "content_length": len(content),
+                "extractor": "dynamic_specialized"
+            }, categoria="pesquisa_web")
+        elif extractor == 'aggressive_fallback':
+            logger.info(f"✅ Extração agressiva bem-sucedida: {len(content)} caracteres")
+            salvar_etapa("extracao_fallback", {
+                "url": url,
+                "content_length": len(content),
+                "extractor": "aggressive_fallback"
+            }, categoria="pesquisa_web")
+        else:
+            extractor_time = result['attempts'][-1]['time']
+            salvar_etapa("extracao_sucesso", {
+                "url": url,
+                "extractor": extractor,
+                "content_length": len(content),
+                "extraction_time": extractor_time
+            }, categoria="pesquisa_web")
+            logger.info(f"✅ Extração bem-sucedida com {extractor}: {len(content)} caracteres em {extractor_time:.2f}s")
+        
+        self.stats['global']['total_successes'] += 1
+        self._update_global_stats()
+        return content
+    
+    def _extract_with_trafilatura(self, doc: ParsedDocument, url: str) -> Optional[str]:
         """Extrai com Trafilatura (prioridade 1) com configurações aprimoradas"""
         if not HAS_TRAFILATURA:
             return None
         
         try:
             # Configurações mais agressivas para trafilatura
+            # (recebe uma cópia da árvore já parseada: trafilatura poda a árvore)
+            tree = doc.tree_copy()
             content = trafilatura.extract(
-                html, 
+                tree if tree is not None else doc.html,
                 include_comments=False,
                 include_tables=True,
                 include_formatting=False,
@@ -556,25 +545,21 @@ class RobustContentExtractor:
             logger.error(f"Erro Trafilatura: {e}")
             return None
     
-    def _extract_with_readability(self, html: str, url: str) -> Optional[str]:
+    def _extract_with_readability(self, doc: ParsedDocument, url: str) -> Optional[str]:
         """Extrai com Readability (prioridade 2) com configurações aprimoradas"""
         if not HAS_READABILITY:
             return None
         
         try:
             # Configurações mais inclusivas
-            doc = Document(html, positive_keywords=['content', 'article', 'post', 'text', 'main'])
-            content = doc.summary()
+            # (readability trabalha sobre uma cópia limpa da árvore recebida)
+            tree = doc.tree
+            document = Document(tree if tree is not None else doc.html, positive_keywords=['content', 'article', 'post', 'text', 'main'])
+            content = document.summary()
             
             if content:
                 # Remove tags HTML
-                if HAS_BEAUTIFULSOUP:
-                    soup = BeautifulSoup(content, 'html.parser')
-                    content = soup.get_text()
-                else:
-                    # Remove tags manualmente
-                    content = re.sub(r'<[^>]+>', '', content)
-                
+                content = ParsedDocument.fragment_text(content)
                 content = self._clean_content(content)
                 return content
             
@@ -584,14 +569,15 @@ class RobustContentExtractor:
             logger.error(f"Erro Readability: {e}")
             return None
     
-    def _extract_with_newspaper(self, html: str, url: str) -> Optional[str]:
+    def _extract_with_newspaper(self, doc: ParsedDocument, url: str) -> Optional[str]:
         """Extrai com Newspaper3k (prioridade 3) com configurações aprimoradas"""
         if not HAS_NEWSPAPER:
             return None
         
         try:
+            # newspaper só aceita o HTML em texto e parseia internamente
             article = Article(url)
-            article.set_html(html)
+            article.set_html(doc.html)
             article.parse()
             
             content = article.text
@@ -605,28 +591,24 @@ class RobustContentExtractor:
             logger.error(f"Erro Newspaper: {e}")
             return None
     
-    def _extract_with_beautifulsoup(self, html: str, url: str) -> Optional[str]:
-        """Extrai com BeautifulSoup (fallback final) com estratégia aprimorada"""
-        if not HAS_BEAUTIFULSOUP:
+    def _extract_with_dom(self, doc: ParsedDocument, url: str) -> Optional[str]:
+        """Extrai por heurísticas sobre a árvore (fallback final) com estratégia aprimorada"""
+        # Remove scripts, styles e navegação
+        tree = doc.pruned(('script', 'style', 'nav', 'header', 'footer', 'aside', 'form'))
+        if tree is None:
             return None
         
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Remove scripts e styles
-            for script in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'form']):
-                script.decompose()
-            
             # Estratégia em camadas para encontrar conteúdo
             content_strategies = [
                 # Estratégia 1: Elementos semânticos
-                lambda: self._extract_semantic_content(soup),
+                lambda: self._extract_semantic_content(tree),
                 # Estratégia 2: Elementos por classe/ID
-                lambda: self._extract_by_selectors(soup),
+                lambda: self._extract_by_selectors(tree),
                 # Estratégia 3: Maior bloco de texto
-                lambda: self._extract_largest_text_block(soup),
+                lambda: self._extract_largest_text_block(tree),
                 # Estratégia 4: Todo o body
-                lambda: self._extract_full_body(soup)
+                lambda: self._extract_full_body(tree)
             ]
             
             for strategy in content_strategies:
@@ -640,17 +622,17 @@ class RobustContentExtractor:
             return None
             
         except Exception as e:
-            logger.error(f"Erro BeautifulSoup: {e}")
+            logger.error(f"Erro DOM: {e}")
             return None
     
-    def _extract_semantic_content(self, soup) -> Optional[str]:
+    def _extract_semantic_content(self, tree) -> Optional[str]:
         """Extrai usando elementos semânticos HTML5"""
-        semantic_elements = soup.find_all(['article', 'main', 'section'])
+        semantic_elements = tree.xpath('//article | //main | //section')
         
         if semantic_elements:
             content_parts = []
             for element in semantic_elements:
-                text = element.get_text()
+                text = element.text_content()
                 if len(text) > 50:
                     content_parts.append(text)
             
@@ -659,7 +641,7 @@ class RobustContentExtractor:
         
         return None
     
-    def _extract_by_selectors(self, soup) -> Optional[str]:
+    def _extract_by_selectors(self, tree) -> Optional[str]:
         """Extrai usando seletores CSS comuns"""
         content_selectors = [
             '.content', '#content', '.post', '.article',
@@ -669,44 +651,39 @@ class RobustContentExtractor:
         ]
         
         for selector in content_selectors:
-            try:
-                elements = soup.select(selector)
-                if elements:
-                    content_parts = []
-                    for element in elements:
-                        text = element.get_text()
-                        if len(text) > 50:
-                            content_parts.append(text)
-                    
-                    if content_parts:
-                        return '\n\n'.join(content_parts)
-            except:
-                continue
+            elements = ParsedDocument.select(tree, selector)
+            if elements:
+                content_parts = []
+                for element in elements:
+                    text = element.text_content()
+                    if len(text) > 50:
+                        content_parts.append(text)
+                
+                if content_parts:
+                    return '\n\n'.join(content_parts)
         
         return None
     
-    def _extract_largest_text_block(self, soup) -> Optional[str]:
+    def _extract_largest_text_block(self, tree) -> Optional[str]:
         """Encontra e extrai o maior bloco de texto"""
-        all_divs = soup.find_all(['div', 'section', 'article'])
-        
         largest_text = ""
         largest_size = 0
         
-        for div in all_divs:
-            text = div.get_text()
+        for div in tree.iter('div', 'section', 'article'):
+            text = div.text_content()
             if len(text) > largest_size:
                 largest_size = len(text)
                 largest_text = text
         
         return largest_text if largest_size > 100 else None
     
-    def _extract_full_body(self, soup) -> Optional[str]:
+    def _extract_full_body(self, tree) -> Optional[str]:
         """Extrai todo o conteúdo do body como último recurso"""
-        body = soup.find('body')
-        if body:
-            return body.get_text()
+        body = tree.find('body')
+        if body is not None:
+            return body.text_content()
         else:
-            return soup.get_text()
+            return tree.text_content()
     
     def _clean_content(self, content: str) -> str:
         """Limpa e normaliza o conteúdo extraído com melhorias"""
@@ -744,21 +721,21 @@ class RobustContentExtractor:
         
         return content
     
-    def _validate_content(self, content: str, url: str) -> bool:
+    def _validate_content(self, content: str, url: str, is_pdf: bool = False) -> bool:
         """Valida se o conteúdo extraído é válido com critérios aprimorados"""
         if not content:
             logger.warning(f"⚠️ Conteúdo vazio para {url}")
             return False
         
         # Verifica tamanho mínimo mais rigoroso
-        min_length = 500 if not self._is_pdf_url(url) else 200
+        min_length = 500 if not is_pdf else 200
         if len(content) < min_length:
             logger.warning(f"⚠️ Conteúdo pequeno para {url}: {len(content)} < {self.min_content_length}")
             return False
         
         # Verifica densidade de palavras
         words = content.split()
-        min_words = 100 if not self._is_pdf_url(url) else 50
+        min_words = 100 if not is_pdf else 50
         if len(words) < min_words:
             logger.warning(f"⚠️ Poucas palavras para {url}: {len(words)}")
             return False
@@ -838,8 +815,8 @@ class RobustContentExtractor:
                     stats['reason'] = 'Biblioteca readability-lxml não instalada'
                 elif extractor_name == 'newspaper' and not HAS_NEWSPAPER:
                     stats['reason'] = 'Biblioteca newspaper3k não instalada'
-                elif extractor_name == 'beautifulsoup' and not HAS_BEAUTIFULSOUP:
-                    stats['reason'] = 'Biblioteca beautifulsoup4 não instalada'
+                elif extractor_name == 'dom' and not HAS_LXML:
+                    stats['reason'] = 'Biblioteca lxml não instalada'
                 elif extractor_name == 'pdf_pypdf2' and not HAS_PYPDF2:
                     stats['reason'] = 'Biblioteca PyPDF2 não instalada'
                 elif extractor_name == 'pdf_pdfplumber' and not HAS_PDFPLUMBER:
@@ -877,20 +854,54 @@ class RobustContentExtractor:
             logger.info("🔄 Reset estatísticas de todos os extratores")
     
     def batch_extract(self, urls: List[str], max_workers: int = 5) -> Dict[str, Optional[str]]:
-        """Extrai conteúdo de múltiplas URLs em paralelo"""
+        """Extrai conteúdo de múltiplas URLs em duas etapas: todos os downloads de
+        uma vez pelo http_fetcher (I/O, limite por host) e o parsing das páginas
+        no parse_pool (CPU, em paralelo nos processos)"""
         results = {}
+        resolved = {}
+        for url in urls:
+            if url and url.startswith('http'):
+                resolved[url] = url_resolver.resolve_redirect_url(url)
+            else:
+                results[url] = None
+        
+        pages = http_fetcher.fetch_many(list(resolved.values()), timeout=self.timeout, accept=self.accepted_types)
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_url = {executor.submit(self.extract_content, url): url for url in urls}
+            pdf_futures = {}
+            parse_futures = {}
+            for url, target in resolved.items():
+                response = pages.get(target)
+                if response is None or not response.ok:
+                    logger.warning(f"⚠️ Download falhou para {target}")
+                    results[url] = None
+                    continue
+                self.stats['global']['total_extractions'] += 1
+                if response.kind == 'pdf':
+                    pdf_futures[executor.submit(self._extract_pdf_content, target, response.content)] = url
+                else:
+                    # submit bloqueia quando o parse_pool está cheio (backpressure)
+                    parse_futures[url] = parse_pool.submit(_parse_page, target, response.content, response.encoding)
             
-            for future in as_completed(future_to_url):
-                url = future_to_url[future]
+            for url, future in parse_futures.items():
+                try:
+                    result = parse_pool.result(future)
+                except ParseTimeout as e:
+                    logger.error(f"⏱️ Parsing de {resolved[url]} interrompido: {e}")
+                    result = {'content': None, 'extractor': None, 'attempts': []}
+                except Exception as e:
+                    logger.error(f"Erro na extração paralela de {url}: {e}")
+                    result = {'content': None, 'extractor': None, 'attempts': []}
+                results[url] = self._record_parse(resolved[url], result)
+            
+            for future in as_completed(pdf_futures):
+                url = pdf_futures[future]
                 try:
                     content = future.result()
-                    results[url] = content
                 except Exception as e:
                     logger.error(f"Erro na extração paralela de {url}: {e}")
-                    results[url] = None
+                    content = None
+                results[url] = self._record_pdf(resolved[url], content)
         
         return results
     
@@ -935,12 +946,15 @@ class RobustContentExtractor:
     
     def clear_cache(self):
         """Limpa cache de sessão"""
-        self.session.close()
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        })
+        http_fetcher.close()
         logger.info("🧹 Cache de extração limpo")
 
+
+def _parse_page(url: str, content: bytes, encoding: Optional[str]) -> Dict[str, Any]:
+    """Tarefa do parse_pool: decodifica o HTML e roda a cascata de extratores"""
+    html = content.decode(encoding or 'utf-8', errors='replace')
+    return robust_content_extractor._parse_html(html, url)
+
+
 # Instância global
 robust_content_extractor = RobustContentExtractor()
\ No newline at end of file
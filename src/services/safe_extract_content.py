@@ -11,6 +11,7 @@ from typing import Optional, Dict, Any, Tuple, List  # Added List import
 from services.robust_content_extractor import robust_content_extractor
 from services.content_quality_validator import content_quality_validator
 from services.url_resolver import url_resolver
+from services.cassette import cassette
 
 logger = logging.getLogger(__name__)
 
@@ -177,7 +178,7 @@ class SafeContentExtractor:
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_url = {
-                executor.submit(self.safe_extract_content, url, context): url 
+                executor.submit(cassette.bind(self.safe_extract_content), url, context): url 
                 for url in urls
             }
             
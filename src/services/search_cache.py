@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Search Cache
+Cache de resultados de busca compartilhado por todos os gerenciadores de busca
+"""
+
+import os
+import logging
+from functools import wraps
+from typing import Dict, List, Any, Callable, Optional
+
+from services.persistent_cache import PersistentCache
+
+logger = logging.getLogger(__name__)
+
+
+class SearchCache:
+    """Cache em disco, com TTL e limite de tamanho (LRU), dos resultados de busca.
+
+    A chave é consulta normalizada + implementação + max_results, então o
+    mesmo resultado é reaproveitado entre workers e reinícios. Cada
+    gerenciador monta sua própria requisição (consulta ampliada, filtros de
+    data, filtro de relevância, rótulo "source"), por isso a implementação
+    ("origem:provedor", ex.: "websailor:google") faz parte da chave: só
+    chamadas que geram a mesma requisição e o mesmo pós-processamento
+    compartilham entradas.
+    Listas vazias não são armazenadas para não fixar falhas temporárias.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        """Inicializa o cache de busca"""
+        if enabled is None:
+            enabled = os.getenv('SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+        self.store = PersistentCache(
+            'search_results',
+            ttl=int(os.getenv('SEARCH_CACHE_TTL', 3600)),
+            max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 5000)),
+            max_bytes=int(float(os.getenv('SEARCH_CACHE_MAX_MB', 50)) * 1024 * 1024),
+            enabled=enabled
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.store.enabled
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Consulta em minúsculas com espaços colapsados"""
+        return ' '.join((query or '').lower().split())
+
+    def make_key(self, provider: str, query: str, max_results: int, *extra: Any) -> str:
+        """Chave do cache para a consulta no provedor"""
+        return PersistentCache.make_key(provider, self.normalize_query(query), max_results, *extra)
+
+    def get(self, provider: str, query: str, max_results: int, *extra: Any,
+            label: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Resultados armazenados (None se ausentes ou expirados); label só afeta as estatísticas"""
+        label = label or provider
+        results = self.store.get(self.make_key(provider, query, max_results, *extra), label=label)
+        if results is not None:
+            logger.info(f"🔄 Busca em cache ({label}): {query}")
+        return results
+
+    def set(self, provider: str, query: str, max_results: int, results: List[Dict[str, Any]], *extra: Any,
+            label: Optional[str] = None):
+        """Armazena os resultados (listas vazias são ignoradas)"""
+        if results:
+            self.store.set(self.make_key(provider, query, max_results, *extra), results, label=label or provider)
+
+    def cached(self, source: str, provider: str) -> Callable:
+        """Decorador para métodos de busca com assinatura (self, query, max_results, ...).
+
+        A chave usa a implementação ("origem:provedor"), que também é o rótulo
+        das estatísticas. Argumentos adicionais (ex.: contexto) entram na
+        chave do cache.
+        """
+        label = f"{source}:{provider}"
+
+        def decorator(fn: Callable) -> Callable:
+            @wraps(fn)
+            def wrapper(instance, query: str, max_results: int = 10, *args, **kwargs):
+                extra = (args, kwargs) if args or kwargs else ()
+                results = self.get(label, query, max_results, *extra)
+                if results is not None:
+                    return results
+                results = fn(instance, query, max_results, *args, **kwargs)
+                self.set(label, query, max_results, results, *extra)
+                return results
+            return wrapper
+        return decorator
+
+    def purge(self, expired_only: bool = False) -> int:
+        """Remove todas as entradas (ou apenas as expiradas)"""
+        return self.store.purge(expired_only=expired_only)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache (entradas, bytes, hit rate e rótulos origem:provedor)"""
+        return self.store.get_stats()
+
+
+# Instância global
+search_cache = SearchCache()
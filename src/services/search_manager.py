@@ -9,10 +9,14 @@ import os
 import logging
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any
 from urllib.parse import quote_plus
 from bs4 import BeautifulSoup
 import json
+from services.search_cache import search_cache
+from services.rate_limiter import rate_limiter
+from services.cassette import cassette
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +63,8 @@ class SearchManager:
             'DNT': '1',
             'Connection': 'keep-alive'
         }
+        # Raspagem dos buscadores passa pelo limite de taxa por host
+        self.session = rate_limiter.session(self.headers)
         
         self.initialize_providers()
         logger.info(f"Search Manager inicializado com {len([p for p in self.providers.values() if p['available']])} provedores disponíveis")
@@ -130,6 +136,8 @@ class SearchManager:
         
         return []
     
+    @search_cache.cached('search', 'google')
+    @rate_limiter.limited('google')
     def _search_google(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando Google Custom Search API"""
         try:
@@ -170,6 +178,8 @@ class SearchManager:
                 self.providers['google']['rate_limit_reset'] = time.time() + 3600
             raise e
     
+    @search_cache.cached('search', 'serper')
+    @rate_limiter.limited('serper')
     def _search_serper(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando Serper API"""
         try:
@@ -212,12 +222,14 @@ class SearchManager:
                 self.providers['serper']['rate_limit_reset'] = time.time() + 3600
             raise e
     
+    @search_cache.cached('search', 'bing')
+    @rate_limiter.limited('bing')
     def _search_bing(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando Bing (scraping)"""
         try:
             search_url = f"https://www.bing.com/search?q={quote_plus(query)}&cc=br&setlang=pt-br&count={max_results}"
             
-            response = requests.get(search_url, headers=self.headers, timeout=15)
+            response = self.session.get(search_url, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -252,12 +264,14 @@ class SearchManager:
         except Exception as e:
             raise e
     
+    @search_cache.cached('search', 'duckduckgo')
+    @rate_limiter.limited('duckduckgo')
     def _search_duckduckgo(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando DuckDuckGo (scraping)"""
         try:
             search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
             
-            response = requests.get(search_url, headers=self.headers, timeout=15)
+            response = self.session.get(search_url, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -331,34 +345,31 @@ class SearchManager:
         """Realiza busca em múltiplos provedores simultaneamente"""
         all_results = []
         
-        for provider_name in ['google', 'serper', 'bing', 'duckduckgo']:
-            if not self.providers[provider_name]['available']:
-                continue
-                
-            if self.providers[provider_name]['error_count'] >= 3:
-                continue
-            
-            try:
-                logger.info(f"🔍 Buscando em {provider_name}...")
-                
-                if provider_name == 'google':
-                    results = self._search_google(query, max_results_per_provider)
-                elif provider_name == 'serper':
-                    results = self._search_serper(query, max_results_per_provider)
-                elif provider_name == 'bing':
-                    results = self._search_bing(query, max_results_per_provider)
-                elif provider_name == 'duckduckgo':
-                    results = self._search_duckduckgo(query, max_results_per_provider)
-                else:
-                    continue
-                
-                all_results.extend(results)
-                time.sleep(1)  # Rate limiting
-                
-            except Exception as e:
-                logger.warning(f"⚠️ Erro em {provider_name}: {str(e)}")
-                self.providers[provider_name]['error_count'] += 1
-                continue
+        provider_names = [
+            name for name in ['google', 'serper', 'bing', 'duckduckgo']
+            if self.providers[name]['available'] and self.providers[name]['error_count'] < 3
+        ]
+        search_functions = {
+            'google': self._search_google,
+            'serper': self._search_serper,
+            'bing': self._search_bing,
+            'duckduckgo': self._search_duckduckgo
+        }
+        
+        if provider_names:
+            logger.info(f"🔍 Buscando em {', '.join(provider_names)}...")
+            with ThreadPoolExecutor(max_workers=len(provider_names)) as executor:
+                futures = {
+                    executor.submit(cassette.bind(search_functions[name]), query, max_results_per_provider): name
+                    for name in provider_names
+                }
+                # Mantém a ordem de prioridade dos provedores na lista final
+                for future, provider_name in futures.items():
+                    try:
+                        all_results.extend(future.result())
+                    except Exception as e:
+                        logger.warning(f"⚠️ Erro em {provider_name}: {str(e)}")
+                        self.providers[provider_name]['error_count'] += 1
         
         # Remove duplicatas baseado na URL
         seen_urls = set()
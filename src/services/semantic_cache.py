@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Semantic Cache
+Cache local de respostas para prompts quase idênticos (similaridade de n-gramas)
+"""
+
+import os
+import re
+import time
+import zlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SemanticCache:
+    """Cache em memória indexado por vetores de n-gramas com hashing (feature hashing).
+
+    Cada prompt vira um vetor esparso de palavras, bigramas e 4-gramas de
+    caracteres projetado em `dim` posições; a busca é um produto matricial
+    contra todas as entradas do mesmo escopo (ex.: agente + max_tokens).
+    Prompts que diferem só em espaços, ordem de trechos ou pequenas palavras
+    ficam acima do limiar de similaridade de cosseno.
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        ttl: Optional[int] = None,
+        dim: int = 4096
+    ):
+        """Inicializa o cache semântico"""
+        if enabled is None:
+            enabled = os.getenv('LLM_SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true'
+        self.enabled = enabled and HAS_NUMPY
+        self.threshold = threshold or float(os.getenv('LLM_SEMANTIC_CACHE_THRESHOLD', 0.98))
+        self.max_entries = max_entries or int(os.getenv('LLM_SEMANTIC_CACHE_MAX_ENTRIES', 1000))
+        self.ttl = ttl or int(os.getenv('LLM_SEMANTIC_CACHE_TTL', 86400))
+        self.dim = dim
+
+        self._lock = threading.Lock()
+        self._slots: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()
+        self._free = list(range(self.max_entries - 1, -1, -1))
+        self._scope_ids: Dict[str, int] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'similarity_sum': 0.0}
+
+        if self.enabled:
+            self._vectors = np.zeros((self.max_entries, dim), dtype=np.float32)
+            self._slot_scope = np.full(self.max_entries, -1, dtype=np.int32)
+            logger.info(f"✅ Semantic Cache habilitado (limiar {self.threshold}, até {self.max_entries} entradas)")
+        elif enabled and not HAS_NUMPY:
+            logger.warning("⚠️ Semantic Cache requer numpy; desabilitado")
+
+    def embed(self, text: str) -> 'np.ndarray':
+        """Vetor L2-normalizado de n-gramas com hashing assinado"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = _TOKEN_RE.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            if len(word) > 4:
+                features.extend(f"#{word[i:i + 4]}" for i in range(len(word) - 3))
+
+        for feature in features:
+            h = zlib.crc32(feature.encode('utf-8'))
+            vector[h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+
+        # tf sublinear preserva o sinal do hashing
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _scope_id(self, scope: str) -> int:
+        if scope not in self._scope_ids:
+            self._scope_ids[scope] = len(self._scope_ids)
+        return self._scope_ids[scope]
+
+    def _release(self, slot: int):
+        self._slots.pop(slot, None)
+        self._slot_scope[slot] = -1
+        self._free.append(slot)
+
+    def lookup(self, prompt: str, scope: str = 'default') -> Tuple[Optional[str], float]:
+        """Retorna (resposta, similaridade) da entrada mais parecida do escopo, se acima do limiar"""
+        if not self.enabled:
+            return None, 0.0
+
+        vector = self.embed(prompt)
+        with self._lock:
+            scope_id = self._scope_ids.get(scope)
+            best_slot, best_score = None, 0.0
+            if scope_id is not None and self._slots:
+                scores = self._vectors @ vector
+                scores[self._slot_scope != scope_id] = -1.0
+                best_slot = int(np.argmax(scores))
+                best_score = float(scores[best_slot])
+
+            entry = self._slots.get(best_slot) if best_slot is not None else None
+            if entry and time.time() - entry['created_at'] > self.ttl:
+                self._release(best_slot)
+                self.stats['expired'] += 1
+                entry = None
+
+            if entry and best_score >= self.threshold:
+                self._slots.move_to_end(best_slot)
+                self.stats['hits'] += 1
+                self.stats['similarity_sum'] += best_score
+                return entry['answer'], best_score
+
+            self.stats['misses'] += 1
+            return None, best_score
+
+    def store(self, prompt: str, answer: str, scope: str = 'default'):
+        """Armazena a resposta; remove a entrada menos usada recentemente se o cache estiver cheio"""
+        if not self.enabled or not answer:
+            return
+
+        vector = self.embed(prompt)
+        with self._lock:
+            if not self._free:
+                oldest = next(iter(self._slots))
+                self._release(oldest)
+                self.stats['evictions'] += 1
+            slot = self._free.pop()
+            self._vectors[slot] = vector
+            self._slot_scope[slot] = self._scope_id(scope)
+            self._slots[slot] = {'answer': answer, 'scope': scope, 'created_at': time.time()}
+
+    def clear(self) -> int:
+        """Esvazia o cache e retorna quantas entradas foram removidas"""
+        with self._lock:
+            removed = len(self._slots)
+            for slot in list(self._slots):
+                self._release(slot)
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Entradas, hit rate, similaridade média dos hits e evictions"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            'enabled': self.enabled,
+            'threshold': self.threshold,
+            'entries': len(self._slots),
+            'max_entries': self.max_entries,
+            'hits': self.stats['hits'],
+            'misses': self.stats['misses'],
+            'evictions': self.stats['evictions'],
+            'expired': self.stats['expired'],
+            'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0.0,
+            'avg_hit_similarity': round(self.stats['similarity_sum'] / self.stats['hits'], 4) if self.stats['hits'] else None
+        }
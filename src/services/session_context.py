@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Session Context
+Contexto compartilhado (prefixo) reaproveitado pelos agentes de uma mesma sessão
+"""
+
+import time
+import hashlib
+import threading
+from typing import Any, Dict
+
+
+class SessionContext:
+    """Prefixo de contexto comum a todas as chamadas de IA de uma sessão.
+
+    Só é criado quando o provedor guarda o prefixo (conteúdo em cache no
+    Gemini, enviado uma única vez); se uma chamada cair em outro provedor,
+    vai com um corte do contexto do tamanho do bloco de dados original. O
+    cache do Gemini exige google-generativeai >= 0.7; com a versão fixada em
+    requirements.txt (0.3.2) nenhum contexto é criado e os agentes mantêm o
+    bloco de dados truncado de cada prompt.
+    """
+
+    def __init__(self, session_id: str, text: str, ttl: int = 3600):
+        self.session_id = session_id
+        self.text = text
+        self.ttl = ttl
+        self.created_at = time.time()
+        self.fingerprint = hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+        # Preenchidos sob demanda pelo AIManager (um por processo)
+        self.lock = threading.Lock()
+        self.gemini_model: Any = None
+        self.gemini_unavailable = False
+        self.stats = {'prompts': 0, 'cached_prefix': 0, 'fallback': 0}
+
+    def prompt(self, instruction: str) -> 'ContextualPrompt':
+        """Monta o prompt completo (contexto + instrução específica do agente)"""
+        return ContextualPrompt(self, instruction)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas de uso do contexto"""
+        return {
+            'session_id': self.session_id,
+            'context_chars': len(self.text),
+            'gemini_cached': self.gemini_model is not None,
+            **self.stats
+        }
+
+
+class ContextualPrompt(str):
+    """Prompt cujo valor é o texto completo (contexto + instrução).
+
+    Por ser uma str comum para o restante do pipeline (cache, admissão,
+    hedging, fallback), só a chamada final ao provedor precisa saber que
+    o prefixo pode ser substituído por cache ou resumo.
+    """
+
+    def __new__(cls, context: SessionContext, instruction: str):
+        obj = super().__new__(cls, f"{context.text}\n\n{instruction}")
+        obj.context = context
+        obj.instruction = instruction
+        return obj
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Single Flight
+Deduplicação de chamadas idênticas em andamento (LLM e busca)
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+from services.persistent_cache import PersistentCache
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Garante uma única execução por chave enquanto ela estiver em andamento.
+
+    Chamadores concorrentes com a mesma chave esperam o Future do primeiro
+    (o "líder"). Com shared=True, a liderança também vale entre workers: o
+    líder reserva a chave no cache persistente e publica o resultado lá para
+    os seguidores de outros processos.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        shared: Optional[bool] = None,
+        lease_ttl: int = 300,
+        result_ttl: int = 120,
+        poll_interval: float = 0.25
+    ):
+        """Inicializa o grupo de deduplicação"""
+        self.name = name
+        self.lease_ttl = lease_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {'leaders': 0, 'followers': 0, 'remote_followers': 0}
+
+        if shared is None:
+            shared = os.getenv('SINGLE_FLIGHT_SHARED', 'false').lower() == 'true'
+        self.store = PersistentCache(f"single_flight_{name}", ttl=result_ttl) if shared else None
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Chave normalizada: espaços colapsados nas partes textuais"""
+        normalized = [' '.join(p.split()) if isinstance(p, str) else p for p in parts]
+        return PersistentCache.make_key(*normalized)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Executa fn uma única vez por chave em andamento e devolve o resultado a todos"""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.stats['leaders'] += 1
+            else:
+                self.stats['followers'] += 1
+
+        if not leader:
+            logger.info(f"🔗 {self.name}: aguardando chamada idêntica em andamento")
+            return future.result()
+
+        try:
+            result = self._run_leader(key, fn)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def ado(self, key: str, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Versão assíncrona de do(); deduplica também contra chamadas síncronas da mesma chave"""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.stats['leaders'] += 1
+            else:
+                self.stats['followers'] += 1
+
+        if not leader:
+            logger.info(f"🔗 {self.name}: aguardando chamada idêntica em andamento")
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await self._arun_leader(key, coro_fn)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def _arun_leader(self, key: str, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Versão assíncrona de _run_leader (acesso ao cache persistente fora do event loop)"""
+        if not (self.store and self.store.enabled):
+            return await coro_fn()
+
+        lease_key, result_key = f"lease:{key}", f"result:{key}"
+        deadline = time.time() + self.lease_ttl
+        waited = False
+        while True:
+            claimed = await asyncio.to_thread(self.store.add, lease_key, os.getpid(), label='lease', ttl=self.lease_ttl)
+            if waited or not claimed:
+                cached = await asyncio.to_thread(self.store.get, result_key, label='result')
+                if cached is not None:
+                    if claimed:
+                        await asyncio.to_thread(self.store.delete, lease_key)
+                    self.stats['remote_followers'] += 1
+                    logger.info(f"🔗 {self.name}: resultado reaproveitado de outro worker")
+                    return cached['value']
+            if claimed or time.time() > deadline:
+                break
+            waited = True
+            await asyncio.sleep(self.poll_interval)
+
+        try:
+            result = await coro_fn()
+            if result is not None:
+                await asyncio.to_thread(self.store.set, result_key, {'value': result}, label='result', ttl=self.result_ttl)
+            return result
+        finally:
+            await asyncio.to_thread(self.store.delete, lease_key)
+
+    def _run_leader(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Executa como líder local; com store compartilhado, coordena com os outros workers"""
+        if not (self.store and self.store.enabled):
+            return fn()
+
+        lease_key, result_key = f"lease:{key}", f"result:{key}"
+        deadline = time.time() + self.lease_ttl
+        waited = False
+        while True:
+            claimed = self.store.add(lease_key, os.getpid(), label='lease', ttl=self.lease_ttl)
+            # Outro worker é (ou acabou de ser) o líder: usa o resultado publicado
+            if waited or not claimed:
+                cached = self.store.get(result_key, label='result')
+                if cached is not None:
+                    if claimed:
+                        self.store.delete(lease_key)
+                    self.stats['remote_followers'] += 1
+                    logger.info(f"🔗 {self.name}: resultado reaproveitado de outro worker")
+                    return cached['value']
+            if claimed or time.time() > deadline:
+                break
+            waited = True
+            time.sleep(self.poll_interval)
+
+        try:
+            result = fn()
+            if result is not None:
+                self.store.set(result_key, {'value': result}, label='result', ttl=self.result_ttl)
+            return result
+        finally:
+            self.store.delete(lease_key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas de deduplicação"""
+        with self._lock:
+            in_flight = len(self._inflight)
+        return {'shared': bool(self.store and self.store.enabled), 'in_flight': in_flight, **self.stats}
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Stream Broker
+Canal de eventos por sessão para transmitir tokens das IAs ao navegador (SSE)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stream_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stream_session ON stream_events (session_id, id);
+"""
+
+
+class StreamBroker:
+    """Publica e entrega eventos de streaming por sessão.
+
+    Os eventos ficam em SQLite para que o endpoint SSE funcione mesmo quando
+    é atendido por um worker diferente do que executa a análise.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, retention: int = 1800, poll_interval: float = 0.25):
+        """Inicializa o broker de streaming"""
+        self.db_path = Path(db_path or os.getenv('STREAM_BROKER_PATH', 'cache/llm_streams.sqlite3'))
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._last_cleanup = 0.0
+        self.enabled = True
+
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection()
+            logger.info(f"✅ Stream Broker inicializado: {self.db_path}")
+        except Exception as e:
+            logger.warning(f"⚠️ Stream Broker desabilitado: {e}")
+            self.enabled = False
+
+    def _connection(self) -> sqlite3.Connection:
+        """Retorna conexão da thread atual (recriada após fork)"""
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != pid:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def publish(self, session_id: str, event: str, data: Dict[str, Any]) -> bool:
+        """Publica um evento para todos os assinantes da sessão"""
+        if not self.enabled or not session_id:
+            return False
+
+        try:
+            conn = self._connection()
+            now = time.time()
+            conn.execute(
+                "INSERT INTO stream_events (session_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, event, json.dumps(data, ensure_ascii=False, default=str), now)
+            )
+
+            if now - self._last_cleanup > 60:
+                self._last_cleanup = now
+                conn.execute("DELETE FROM stream_events WHERE created_at < ?", (now - self.retention,))
+            return True
+
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao publicar evento de streaming: {e}")
+            return False
+
+    def close(self, session_id: str):
+        """Sinaliza que a sessão não terá mais eventos"""
+        self.publish(session_id, 'close', {'session_id': session_id})
+
+    def subscribe(
+        self,
+        session_id: str,
+        last_event_id: Optional[int] = None,
+        idle_timeout: float = 300,
+        keepalive: float = 15
+    ) -> Iterator[Dict[str, Any]]:
+        """Gera eventos da sessão a partir de last_event_id até 'close' ou inatividade.
+
+        Sem last_event_id (nova conexão, não uma reconexão do EventSource) começa
+        depois do último 'close' da sessão: o navegador reaproveita o mesmo
+        session_id entre análises e não deve receber de novo a execução anterior.
+        Emite {'event': 'keepalive'} periodicamente para manter a conexão aberta.
+        """
+        if not self.enabled:
+            return
+
+        conn = self._connection()
+        if last_event_id is None:
+            row = conn.execute(
+                "SELECT MAX(id) FROM stream_events WHERE session_id = ? AND event = 'close'",
+                (session_id,)
+            ).fetchone()
+            last_event_id = row[0] or 0
+        last_activity = time.time()
+        last_keepalive = last_activity
+
+        while True:
+            rows = conn.execute(
+                "SELECT id, event, data FROM stream_events WHERE session_id = ? AND id > ? ORDER BY id LIMIT 500",
+                (session_id, last_event_id)
+            ).fetchall()
+
+            now = time.time()
+            if rows:
+                last_activity = now
+                for event_id, event, data in rows:
+                    last_event_id = event_id
+                    yield {'id': event_id, 'event': event, 'data': json.loads(data)}
+                    if event == 'close':
+                        return
+                continue
+
+            if now - last_activity > idle_timeout:
+                return
+
+            if now - last_keepalive > keepalive:
+                last_keepalive = now
+                yield {'id': last_event_id, 'event': 'keepalive', 'data': {}}
+
+            time.sleep(self.poll_interval)
+
+
+# Instância global
+stream_broker = StreamBroker()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Structured Output
+Saída JSON guiada por JSON Schema: extração, reparo local e validação das respostas
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from services.session_context import ContextualPrompt
+
+logger = logging.getLogger(__name__)
+
+_TYPES = {
+    'object': (dict,),
+    'array': (list,),
+    'string': (str,),
+    'number': (int, float),
+    'integer': (int,),
+    'boolean': (bool,),
+    'null': (type(None),)
+}
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+class StructuredPrompt(str):
+    """Prompt que exige resposta JSON; `json_schema` ativa o modo JSON nativo do provedor"""
+
+    def __new__(cls, text: str, schema: Dict[str, Any]):
+        obj = super().__new__(cls, text)
+        obj.json_schema = schema
+        return obj
+
+
+def schema_instruction(schema: Dict[str, Any]) -> str:
+    """Instrução anexada ao prompt descrevendo o formato obrigatório da resposta"""
+    return (
+        "RETORNE APENAS JSON VÁLIDO (sem markdown, sem comentários, sem texto fora do JSON) "
+        "que siga este JSON Schema:\n"
+        f"{json.dumps(schema, ensure_ascii=False)}"
+    )
+
+
+def with_schema(prompt: str, schema: Dict[str, Any]) -> str:
+    """Anexa a instrução de schema ao prompt, preservando o contexto de sessão se houver"""
+    instruction = schema_instruction(schema)
+    if isinstance(prompt, ContextualPrompt):
+        structured = prompt.context.prompt(f"{prompt.instruction}\n\n{instruction}")
+        structured.json_schema = schema
+        return structured
+    return StructuredPrompt(f"{prompt}\n\n{instruction}", schema)
+
+
+def json_schema_of(prompt: str) -> Optional[Dict[str, Any]]:
+    """Schema exigido pelo prompt (None para prompts de texto livre)"""
+    return getattr(prompt, 'json_schema', None)
+
+
+def _strip_fences(text: str) -> str:
+    if "```" not in text:
+        return text
+    start = text.find("```json")
+    start = start + 7 if start != -1 else text.find("```") + 3
+    end = text.find("```", start)
+    return text[start:end] if end != -1 else text[start:]
+
+
+def repair_json(fragment: str) -> str:
+    """Fecha strings, colchetes e chaves abertos e remove vírgulas sobrando.
+
+    Recupera a parte válida de respostas cortadas por max_tokens ou com
+    pequenos erros de sintaxe; o que vier depois do valor JSON é descartado.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = escape = False
+
+    for char in fragment:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+        elif char in '}]':
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+            if not stack:
+                break
+            expected = stack.pop()
+            out.append(expected)
+            if not stack:
+                break
+            continue
+        out.append(char)
+
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+
+    text = ''.join(out).rstrip()
+    while stack:
+        # Remove par chave/valor incompleto deixado pelo corte
+        text = text.rstrip().rstrip(',')
+        if text.endswith(':'):
+            text = text[:text.rfind('"', 0, text.rfind('"'))].rstrip().rstrip(',')
+        elif stack[-1] == '}' and text.endswith('"'):
+            last_open = text.rfind('"', 0, len(text) - 1)
+            if text[:last_open].rstrip().endswith((',', '{')):
+                text = text[:last_open].rstrip().rstrip(',')
+        text += stack.pop()
+    return text
+
+
+def extract_json(text: str) -> Any:
+    """Extrai o primeiro valor JSON da resposta, reparando-o se necessário (ValueError se impossível)"""
+    clean = _strip_fences(text.strip()).strip()
+    starts = [i for i in (clean.find('{'), clean.find('[')) if i != -1]
+    if not starts:
+        raise ValueError("Resposta não contém JSON")
+    clean = clean[min(starts):]
+
+    try:
+        value, _ = json.JSONDecoder(strict=False).raw_decode(clean)
+        return value
+    except json.JSONDecodeError:
+        pass
+
+    try:
+        return json.loads(repair_json(clean), strict=False)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON inválido mesmo após reparo: {e}")
+
+
+def coerce(value: Any, schema: Dict[str, Any]) -> Any:
+    """Ajustes de forma comuns antes da validação.
+
+    Modos JSON nativos só geram objetos na raiz, então uma lista esperada pode
+    vir embrulhada em {"chave": [...]}; e o último item de uma lista cortada
+    por max_tokens costuma ficar incompleto e é descartado.
+    """
+    expected = schema.get('type')
+    if expected == 'array' and isinstance(value, dict):
+        lists = [v for v in value.values() if isinstance(v, list)]
+        value = lists[0] if len(lists) == 1 else [value]
+
+    if isinstance(value, dict):
+        for key, sub_schema in schema.get('properties', {}).items():
+            if key in value:
+                value[key] = coerce(value[key], sub_schema)
+
+    if isinstance(value, list) and 'items' in schema:
+        value = [coerce(item, schema['items']) for item in value]
+        if len(value) > schema.get('minItems', 0) and validate(value[-1], schema['items']):
+            value.pop()
+    return value
+
+
+def validate(value: Any, schema: Dict[str, Any], path: str = '$') -> List[str]:
+    """Valida o subconjunto de JSON Schema usado pelos agentes (type, required,
+    properties, items, enum, minItems, maxItems); retorna a lista de erros"""
+    errors = []
+    expected = schema.get('type')
+    if expected:
+        types = expected if isinstance(expected, list) else [expected]
+        python_types = tuple(t for name in types for t in _TYPES[name])
+        is_bool = isinstance(value, bool) and 'boolean' not in types
+        if not isinstance(value, python_types) or is_bool:
+            return [f"{path}: esperado {'/'.join(types)}, recebido {type(value).__name__}"]
+
+    if 'enum' in schema and value not in schema['enum']:
+        errors.append(f"{path}: valor fora de {schema['enum']}")
+
+    if isinstance(value, dict):
+        for key in schema.get('required', []):
+            if key not in value:
+                errors.append(f"{path}: campo obrigatório ausente '{key}'")
+        for key, sub_schema in schema.get('properties', {}).items():
+            if key in value:
+                errors.extend(validate(value[key], sub_schema, f"{path}.{key}"))
+
+    if isinstance(value, list):
+        if len(value) < schema.get('minItems', 0):
+            errors.append(f"{path}: mínimo de {schema['minItems']} itens")
+        if 'maxItems' in schema and len(value) > schema['maxItems']:
+            errors.append(f"{path}: máximo de {schema['maxItems']} itens")
+        if 'items' in schema:
+            for i, item in enumerate(value):
+                errors.extend(validate(item, schema['items'], f"{path}[{i}]"))
+
+    return errors
+
+
+def parse_structured(text: str, schema: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    """Extrai, ajusta e valida a resposta; retorna (valor, erros)"""
+    try:
+        value = coerce(extract_json(text), schema)
+    except ValueError as e:
+        return None, [str(e)]
+    return value, validate(value, schema)
+
+
+class IncrementalJSONParser:
+    """Consome os trechos de uma resposta JSON em streaming e devolve cada seção
+    de primeiro nível (membro do objeto raiz ou item da lista raiz) assim que ela
+    se fecha, sem esperar o restante da resposta.
+
+    Texto antes do JSON (cercas markdown, introdução) é ignorado: a raiz só
+    começa em um `{`/`[` no início de uma linha, e uma raiz candidata cuja
+    primeira seção não é JSON válido (ex.: "[nota]" na introdução) é descartada
+    e a busca recomeça. Seções que não puderem ser interpretadas isoladamente
+    são puladas; a resposta completa continua sendo processada normalmente ao final.
+    """
+
+    def __init__(self):
+        self._line_start = True
+        self._reset()
+        self.done = False
+
+    def _reset(self):
+        """Volta a procurar a raiz do JSON"""
+        self._root: Optional[str] = None
+        self._depth = 0
+        self._member: List[str] = []
+        self._in_string = self._escape = False
+        self._index = 0
+        self._sections = 0
+
+    def feed(self, chunk: str) -> List[Tuple[Union[str, int], Any]]:
+        """Processa um trecho e retorna as seções (chave ou índice, valor) concluídas nele"""
+        completed = []
+        for char in chunk:
+            if self.done:
+                break
+
+            if self._root is None:
+                if char in '{[' and self._line_start:
+                    self._root = char
+                    self._depth = 1
+                elif char == '\n':
+                    self._line_start = True
+                elif not char.isspace():
+                    self._line_start = False
+                continue
+
+            if self._in_string:
+                self._member.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._emit(completed):
+                        self.done = True
+                    continue
+            elif char == ',' and self._depth == 1:
+                self._emit(completed)
+                continue
+            self._member.append(char)
+        return completed
+
+    def _emit(self, completed: List[Tuple[Union[str, int], Any]]) -> bool:
+        """Interpreta a seção acumulada; False se a raiz candidata foi descartada"""
+        text = ''.join(self._member).strip()
+        self._member = []
+        if not text:
+            return True
+        try:
+            if self._root == '{':
+                completed.extend(json.loads('{' + text + '}', strict=False).items())
+            else:
+                completed.append((self._index, json.loads(text, strict=False)))
+            self._sections += 1
+        except json.JSONDecodeError:
+            if not self._sections:
+                logger.debug(f"Raiz JSON descartada no streaming: {text[:80]}")
+                self._reset()
+                self._line_start = False
+                return False
+            logger.debug(f"Seção JSON ignorada no streaming: {text[:80]}")
+        if self._root == '[':
+            self._index += 1
+        return True
@@ -10,9 +10,12 @@ import random
 import os
 import logging
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from services.ai_manager import ai_manager
+from services.prompt_budgeter import prompt_budgeter
+from services.cassette import cassette
 from services.production_search_manager import production_search_manager
 from services.robust_content_extractor import robust_content_extractor
 from services.content_quality_validator import content_quality_validator
@@ -98,6 +101,11 @@ class UltraDetailedAnalysisEngine:
         self.quality_threshold = 70.0       # Reduzido para ser mais realista
         self.dependency_manager = ComponentDependencyManager()
 
+        # Pesquisa massiva concorrente: buscas em paralelo, downloads em lote (http_fetcher)
+        self.research_search_workers = int(os.getenv('RESEARCH_SEARCH_WORKERS', 6))
+        self.research_extract_workers = int(os.getenv('RESEARCH_EXTRACT_WORKERS', 8))
+        self.urls_per_query = 8  # Limita para performance
+
         logger.info("🚀 Ultra Detailed Analysis Engine CORRIGIDO inicializado")
 
     def generate_gigantic_analysis(
@@ -108,12 +116,24 @@ class UltraDetailedAnalysisEngine:
     ) -> Dict[str, Any]:
         """Gera análise GIGANTE ultra-detalhada - FALHA SE DADOS INSUFICIENTES"""
 
+        # Inicia sessão de salvamento automático
+        session_id = session_id or auto_save_manager.iniciar_sessao()
+
+        # Todo o tráfego externo da sessão pode ser gravado/reproduzido (CASSETTE_MODE)
+        with cassette.session(session_id):
+            return self._generate_gigantic_analysis(data, session_id, progress_callback)
+
+    def _generate_gigantic_analysis(
+        self, 
+        data: Dict[str, Any],
+        session_id: str,
+        progress_callback: Optional[callable] = None
+    ) -> Dict[str, Any]:
+        """Executa a análise GIGANTE da sessão"""
+
         start_time = time.time()
         logger.info(f"🚀 INICIANDO ANÁLISE GIGANTE CORRIGIDA para {data.get('segmento')}")
 
-        # Inicia sessão de salvamento automático
-        session_id = session_id or auto_save_manager.iniciar_sessao()
-        
         # Salva dados de entrada imediatamente
         salvar_etapa("analise_iniciada", {
             "input_data": data,
@@ -410,78 +430,47 @@ class UltraDetailedAnalysisEngine:
         # Salva queries geradas
         salvar_etapa("queries_geradas", {"queries": queries}, categoria="pesquisa_web")
 
-        all_results = []
-        extracted_content = []
-        total_content_length = 0
-        successful_extractions = 0
-
-        for i, query in enumerate(queries):
-            try:
-                # Busca com múltiplos provedores
-                search_results = production_search_manager.search_with_fallback(query, max_results=10)
+        # Todas as queries são buscadas ao mesmo tempo
+        search_results_by_query = self._search_queries_concurrently(queries)
+        all_results = [result for results in search_results_by_query for result in results]
 
-                if not search_results:
-                    logger.warning(f"⚠️ Query '{query}' retornou 0 resultados")
-                    continue
-
-                all_results.extend(search_results)
-
-                # Extrai conteúdo das URLs encontradas
-                logger.info(f"📄 Extraindo conteúdo de {len(search_results)} URLs...")
-
-                for result in search_results[:8]:  # Limita para performance
-                    try:
-                        content = robust_content_extractor.extract_content(result['url'])
-                        
-                        if content:
-                            # Valida qualidade do conteúdo
-                            validation = content_quality_validator.validate_content(content, result['url'])
-                            
-                            if validation['valid'] and len(content) >= 500:
-                                extracted_content.append({
-                                    'url': result['url'],
-                                    'title': result.get('title', 'Sem título'),
-                                    'content': content[:3000],  # Limita tamanho
-                                    'snippet': result.get('snippet', ''),
-                                    'quality_score': validation['score'],
-                                    'source': result.get('source', 'unknown')
-                                })
-                                total_content_length += len(content)
-                                successful_extractions += 1
-                                
-                                # Salva cada extração bem-sucedida
-                                salvar_etapa(f"conteudo_extraido_{i}_{len(extracted_content)}", {
-                                    "url": result['url'],
-                                    "title": result.get('title'),
-                                    "content_length": len(content),
-                                    "quality_score": validation['score']
-                                }, categoria="pesquisa_web")
-                                
-                                logger.info(f"✅ Conteúdo extraído e validado: {len(content)} chars, qualidade {validation['score']:.1f}%")
-                            else:
-                                logger.warning(f"⚠️ Conteúdo rejeitado por baixa qualidade: {validation['reason']}")
-                        else:
-                            logger.warning(f"⚠️ Nenhum conteúdo extraído de {result['url']}")
-                            
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao extrair {result['url']}: {str(e)}")
-                        salvar_erro("extracao_url", e, contexto={"url": result['url']})
-                        continue
-
-                time.sleep(1)  # Rate limiting
+        # União das URLs (deduplicadas) antes da extração
+        candidates = []
+        seen_urls = set()
+        for i, search_results in enumerate(search_results_by_query):
+            for result in search_results[:self.urls_per_query]:
+                url_key = production_search_manager.normalize_url(result.get('url', ''))
+                if result.get('url') and url_key not in seen_urls:
+                    seen_urls.add(url_key)
+                    candidates.append((i, result))
 
-            except Exception as e:
-                logger.error(f"❌ Erro na query '{query}': {str(e)}")
-                salvar_erro("query_busca", e, contexto={"query": query})
-                continue
+        logger.info(f"📄 Extraindo conteúdo de {len(candidates)} URLs únicas ({self.research_extract_workers} workers)...")
+        extractions = self._extract_results_concurrently(candidates)
 
-        # Remove duplicatas por URL
         unique_content = []
-        seen_urls = set()
-        for content_item in extracted_content:
-            if content_item['url'] not in seen_urls:
-                seen_urls.add(content_item['url'])
-                unique_content.append(content_item)
+        total_content_length = 0
+        for (i, result), extraction in zip(candidates, extractions):
+            if not extraction:
+                continue
+            content, validation = extraction
+            unique_content.append({
+                'url': result['url'],
+                'title': result.get('title', 'Sem título'),
+                'content': content[:3000],  # Limita tamanho
+                'snippet': result.get('snippet', ''),
+                'quality_score': validation['score'],
+                'source': result.get('source', 'unknown')
+            })
+            total_content_length += len(content)
+
+            # Salva cada extração bem-sucedida
+            salvar_etapa(f"conteudo_extraido_{i}_{len(unique_content)}", {
+                "url": result['url'],
+                "title": result.get('title'),
+                "content_length": len(content),
+                "quality_score": validation['score']
+            }, categoria="pesquisa_web")
+        successful_extractions = len(unique_content)
 
         research_data = {
             'queries_executed': queries,
@@ -530,6 +519,57 @@ class UltraDetailedAnalysisEngine:
         logger.info(f"✅ Pesquisa massiva: {len(unique_content)} páginas válidas, {total_content_length:,} caracteres")
         return research_data
 
+    def _search_queries_concurrently(self, queries: List[str]) -> List[List[Dict[str, Any]]]:
+        """Busca todas as queries em paralelo; retorna os resultados na ordem das queries"""
+
+        def search(query: str) -> List[Dict[str, Any]]:
+            try:
+                results = production_search_manager.search_with_fallback(query, max_results=10)
+                if not results:
+                    logger.warning(f"⚠️ Query '{query}' retornou 0 resultados")
+                return results or []
+            except Exception as e:
+                logger.error(f"❌ Erro na query '{query}': {str(e)}")
+                salvar_erro("query_busca", e, contexto={"query": query})
+                return []
+
+        if not queries:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.research_search_workers, len(queries)), thread_name_prefix='research-search') as executor:
+            return list(executor.map(cassette.bind(search), queries))
+
+    def _extract_results_concurrently(self, candidates: List[tuple]) -> List[Optional[tuple]]:
+        """Baixa todas as URLs de uma vez (http_fetcher, com limite por host), extrai
+        em um pool limitado e valida o conteúdo.
+
+        Retorna, na ordem dos candidatos, (conteúdo, validação) ou None se rejeitado.
+        """
+        urls = [result['url'] for _, result in candidates]
+        try:
+            contents = robust_content_extractor.batch_extract(urls, max_workers=self.research_extract_workers)
+        except Exception as e:
+            logger.error(f"❌ Erro na extração em lote: {str(e)}")
+            salvar_erro("extracao_lote", e, contexto={"urls": len(urls)})
+            contents = {}
+
+        extractions = []
+        for url in urls:
+            content = contents.get(url)
+            if not content:
+                logger.warning(f"⚠️ Nenhum conteúdo extraído de {url}")
+                extractions.append(None)
+                continue
+
+            # Valida qualidade do conteúdo
+            validation = content_quality_validator.validate_content(content, url)
+            if validation['valid'] and len(content) >= 500:
+                logger.info(f"✅ Conteúdo extraído e validado: {len(content)} chars, qualidade {validation['score']:.1f}%")
+                extractions.append((content, validation))
+            else:
+                logger.warning(f"⚠️ Conteúdo rejeitado por baixa qualidade: {validation['reason']}")
+                extractions.append(None)
+        return extractions
+
     def _validate_research_quality(self, research_data: Dict[str, Any]) -> bool:
         """Valida qualidade da pesquisa - FALHA SE INSUFICIENTE"""
 
@@ -569,8 +609,10 @@ class UltraDetailedAnalysisEngine:
     ) -> Dict[str, Any]:
         """Executa análise com IA REAL - FALHA SE IA NÃO RESPONDER"""
 
-        # Prepara contexto de pesquisa REAL
-        search_context = self._prepare_search_context(research_data)
+        # Prepara contexto de pesquisa REAL dentro do orçamento de tokens do provedor
+        provider = ai_manager.get_best_provider()
+        template_tokens = prompt_budgeter.estimate_tokens(self._build_gigantic_analysis_prompt(data, ''), provider)
+        search_context = self._prepare_search_context(research_data, data, provider, template_tokens)
 
         # Constrói prompt ULTRA-DETALHADO
         prompt = self._build_gigantic_analysis_prompt(data, search_context)
@@ -578,7 +620,7 @@ class UltraDetailedAnalysisEngine:
         logger.info("🤖 Executando análise com IA REAL...")
 
         # Executa com AI Manager (sistema de fallback automático)
-        ai_response = ai_manager.generate_analysis(prompt, max_tokens=8192)
+        ai_response = ai_manager.generate_analysis(prompt, max_tokens=8192, component='ultra_detailed_analysis')
 
         if not ai_response:
             raise Exception("IA NÃO RESPONDEU: Nenhum provedor de IA disponível ou funcionando")
@@ -588,37 +630,52 @@ class UltraDetailedAnalysisEngine:
 
         return processed_analysis
 
-    def _prepare_search_context(self, research_data: Dict[str, Any]) -> str:
-        """Prepara contexto de pesquisa para IA"""
+    def _prepare_search_context(
+        self,
+        research_data: Dict[str, Any],
+        data: Optional[Dict[str, Any]] = None,
+        provider: Optional[str] = None,
+        reserved_tokens: int = 0
+    ) -> str:
+        """Prepara contexto de pesquisa para IA, distribuindo o orçamento de tokens entre as fontes"""
 
         extracted_content = research_data.get('extracted_content', [])
 
         if not extracted_content:
             raise Exception("NENHUM CONTEÚDO EXTRAÍDO: Pesquisa web falhou completamente")
 
-        # Combina conteúdo das páginas mais relevantes
-        context = "PESQUISA WEB MASSIVA REAL EXECUTADA:\n\n"
-
-        # Ordena por qualidade
-        sorted_content = sorted(extracted_content, key=lambda x: x.get('quality_score', 0), reverse=True)
-
-        for i, content_item in enumerate(sorted_content[:10], 1):  # Top 10 páginas por qualidade
-            context += f"--- FONTE REAL {i}: {content_item['title']} ---\n"
-            context += f"URL: {content_item['url']}\n"
-            context += f"Qualidade: {content_item.get('quality_score', 0):.1f}%\n"
-            context += f"Conteúdo: {content_item['content'][:2000]}\n\n"
-
-        # Adiciona estatísticas da pesquisa
-        context += f"\n=== ESTATÍSTICAS DA PESQUISA REAL ===\n"
-        context += f"Total de queries executadas: {research_data.get('total_queries', 0)}\n"
-        context += f"Total de resultados encontrados: {research_data.get('total_results', 0)}\n"
-        context += f"Páginas únicas analisadas: {research_data.get('unique_sources', 0)}\n"
-        context += f"Extrações bem-sucedidas: {research_data.get('successful_extractions', 0)}\n"
-        context += f"Total de caracteres extraídos: {research_data.get('total_content_length', 0):,}\n"
-        context += f"Qualidade média do conteúdo: {research_data.get('quality_metrics', {}).get('avg_quality_score', 0):.1f}%\n"
-        context += f"Garantia de dados reais: 100%\n"
-
-        return context
+        # Estatísticas da pesquisa (parte fixa do contexto)
+        stats = f"\n=== ESTATÍSTICAS DA PESQUISA REAL ===\n"
+        stats += f"Total de queries executadas: {research_data.get('total_queries', 0)}\n"
+        stats += f"Total de resultados encontrados: {research_data.get('total_results', 0)}\n"
+        stats += f"Páginas únicas analisadas: {research_data.get('unique_sources', 0)}\n"
+        stats += f"Extrações bem-sucedidas: {research_data.get('successful_extractions', 0)}\n"
+        stats += f"Total de caracteres extraídos: {research_data.get('total_content_length', 0):,}\n"
+        stats += f"Qualidade média do conteúdo: {research_data.get('quality_metrics', {}).get('avg_quality_score', 0):.1f}%\n"
+        stats += f"Garantia de dados reais: 100%\n"
+
+        header = "PESQUISA WEB MASSIVA REAL EXECUTADA:\n\n"
+        budget = prompt_budgeter.available_budget(
+            provider,
+            max_output_tokens=8192,
+            reserved_tokens=reserved_tokens + prompt_budgeter.estimate_tokens(header + stats, provider)
+        )
+
+        # Fontes ponderadas por qualidade e aderência ao segmento/produto/público
+        data = data or {}
+        keywords = [data.get('segmento'), data.get('produto'), data.get('publico')]
+
+        def format_source(i: int, item: Dict[str, Any], content: str) -> str:
+            return (
+                f"--- FONTE REAL {i}: {item.get('title', '')} ---\n"
+                f"URL: {item.get('url', '')}\n"
+                f"Qualidade: {item.get('quality_score', 0):.1f}%\n"
+                f"Conteúdo: {content}\n\n"
+            )
+
+        sources = prompt_budgeter.build_context(extracted_content, budget, format_source, provider, keywords)
+
+        return header + sources + stats
 
     def _build_gigantic_analysis_prompt(self, data: Dict[str, Any], search_context: str) -> str:
         """Constrói prompt GIGANTE para análise ultra-detalhada"""
@@ -290,9 +290,6 @@ class UnifiedAnalysisEngine:
                         'extraction_method': 'robust_extractor'
                     })
                 
-                # Delay para rate limiting
-                time.sleep(0.3)
-                
             except Exception as e:
                 logger.error(f"❌ Erro ao extrair {url}: {e}")
                 continue
@@ -499,7 +496,7 @@ class UnifiedAnalysisEngine:
         
         # Análise com IA
         analysis_prompt = self._build_unified_analysis_prompt(data, extracted_content)
-        ai_response = ai_manager.generate_analysis(analysis_prompt, max_tokens=8192)
+        ai_response = ai_manager.generate_analysis(analysis_prompt, max_tokens=8192, component='unified_analysis')
         
         if not ai_response:
             raise Exception("IA não respondeu para análise unificada")
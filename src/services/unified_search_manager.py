@@ -15,6 +15,8 @@ from bs4 import BeautifulSoup
 import json
 import random
 from services.exa_client import exa_client
+from services.search_cache import search_cache
+from services.rate_limiter import rate_limiter
 from services.auto_save_manager import salvar_etapa, salvar_erro
 
 logger = logging.getLogger(__name__)
@@ -73,6 +75,8 @@ class UnifiedSearchManager:
             'DNT': '1',
             'Connection': 'keep-alive'
         }
+        # Raspagem dos buscadores passa pelo limite de taxa por host
+        self.session = rate_limiter.session(self.headers)
         
         # Domínios brasileiros preferenciais
         self.preferred_domains = [
@@ -195,6 +199,8 @@ class UnifiedSearchManager:
         
         return unified_result
     
+    @search_cache.cached('unified', 'exa')
+    @rate_limiter.limited('exa')
     def _search_with_exa(self, query: str, max_results: int, context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """Busca usando Exa API"""
         
@@ -238,6 +244,8 @@ class UnifiedSearchManager:
             logger.error(f"❌ Erro na busca Exa: {e}")
             return []
     
+    @search_cache.cached('unified', 'google')
+    @rate_limiter.limited('google')
     def _search_google(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando Google Custom Search API"""
         
@@ -283,6 +291,8 @@ class UnifiedSearchManager:
         except Exception as e:
             raise e
     
+    @search_cache.cached('unified', 'serper')
+    @rate_limiter.limited('serper')
     def _search_serper(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando Serper API"""
         
@@ -330,6 +340,8 @@ class UnifiedSearchManager:
         except Exception as e:
             raise e
     
+    @search_cache.cached('unified', 'bing')
+    @rate_limiter.limited('bing')
     def _search_bing(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando Bing (scraping)"""
         
@@ -337,7 +349,7 @@ class UnifiedSearchManager:
             enhanced_query = self._enhance_query_for_brazil(query)
             search_url = f"{self.providers['bing']['base_url']}?q={quote_plus(enhanced_query)}&cc=br&setlang=pt-br&count={max_results}"
             
-            response = requests.get(search_url, headers=self.headers, timeout=15)
+            response = self.session.get(search_url, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
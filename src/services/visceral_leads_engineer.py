@@ -64,7 +64,7 @@ class VisceralLeadsEngineer:
             visceral_prompt = self._build_visceral_prompt(processed_leads, context_data)
             
             # Executa engenharia reversa com IA
-            response = ai_manager.generate_analysis(visceral_prompt, max_tokens=8192)
+            response = ai_manager.generate_analysis(visceral_prompt, max_tokens=8192, component='visceral_leads')
             
             if not response:
                 raise Exception("MESTRE VISCERAL FALHOU: IA não respondeu")
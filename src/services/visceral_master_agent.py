@@ -11,6 +11,7 @@ import json
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from services.ai_manager import ai_manager
+from services.prompt_budgeter import prompt_budgeter
 from services.auto_save_manager import salvar_etapa, salvar_erro
 
 logger = logging.getLogger(__name__)
@@ -54,8 +55,11 @@ class VisceralMasterAgent:
             # Constrói prompt visceral ultra-detalhado
             visceral_prompt = self._build_visceral_prompt(data, research_data)
             
-            # Executa análise visceral com IA
-            response = ai_manager.generate_analysis(visceral_prompt, max_tokens=8192)
+            # Executa análise visceral com IA (cada seção do JSON é salva assim que se fecha)
+            response = ai_manager.stream_analysis_to_session(
+                visceral_prompt, session_id, 'visceral', max_tokens=8192,
+                on_section=lambda key, value: salvar_etapa(f"visceral_secao_{key}", value, categoria="analise_completa")
+            )
             
             if not response:
                 raise Exception("MESTRE VISCERAL FALHOU: IA não respondeu")
@@ -87,10 +91,16 @@ class VisceralMasterAgent:
         
         research_context = ""
         if research_data and research_data.get('extracted_content'):
+            provider = ai_manager.get_best_provider()
+            budget = prompt_budgeter.available_budget(provider, max_output_tokens=8192, target=1500)
             research_context = "\n## CONTEXTO DE PESQUISA REAL:\n"
-            for i, content in enumerate(research_data['extracted_content'][:5], 1):
-                research_context += f"FONTE {i}: {content.get('title', 'Sem título')}\n"
-                research_context += f"Conteúdo: {content.get('content', '')[:1000]}\n\n"
+            research_context += prompt_budgeter.build_context(
+                research_data['extracted_content'],
+                budget,
+                lambda i, item, content: f"FONTE {i}: {item.get('title', 'Sem título')}\nConteúdo: {content}\n\n",
+                provider,
+                keywords=[data.get('segmento'), data.get('produto'), data.get('publico')]
+            )
         
         prompt = f"""
 # VOCÊ É O MESTRE DA PERSUASÃO VISCERAL
@@ -323,7 +323,7 @@ RETORNE APENAS JSON VÁLIDO:
 Seja CRIATIVO, OUSADO e MEMORÁVEL. Esta PROVI deve ser tão impactante que se torne A HISTÓRIA que define o evento.
 """
         
-        response = ai_manager.generate_analysis(prompt, max_tokens=2000)
+        response = ai_manager.generate_analysis(prompt, max_tokens=2000, component='visual_proofs_director')
         
         if response:
             return self._process_provi_response(response, concept_data, provi_number)
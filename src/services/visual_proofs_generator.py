@@ -100,12 +100,21 @@ class VisualProofsGenerator:
             # Seleciona conceitos mais importantes
             priority_concepts = self._prioritize_concepts(concepts_to_prove, avatar_data)
             
-            # Gera provas visuais para cada conceito
+            # Gera provas visuais para cada conceito (chamadas de IA em paralelo)
             visual_proofs = []
+            selected = priority_concepts[:8]  # Máximo 8 provas
+            proof_types = [self._select_best_proof_type(concept, avatar_data) for concept in selected]
+            responses = ai_manager.generate_parallel_analysis([
+                {'id': i, 'prompt': self._build_proof_prompt(concept, proof_types[i], context_data, i+1)}
+                for i, concept in enumerate(selected)
+            ], max_tokens=800, component='visual_proofs')
             
-            for i, concept in enumerate(priority_concepts[:8]):  # Máximo 8 provas
+            for i, concept in enumerate(selected):
                 try:
-                    proof = self._generate_visual_proof_for_concept(concept, avatar_data, context_data, i+1)
+                    response = responses.get(i, {})
+                    if response.get('error'):
+                        logger.error(f"❌ Erro ao gerar prova visual: {response['error']}")
+                    proof = self._proof_from_response(response.get('content'), concept, proof_types[i], context_data, i+1)
                     if proof:
                         visual_proofs.append(proof)
                         # Salva cada prova gerada
@@ -160,23 +169,18 @@ class VisualProofsGenerator:
         
         return prioritized
     
-    def _generate_visual_proof_for_concept(
+    def _build_proof_prompt(
         self, 
         concept: str, 
-        avatar_data: Dict[str, Any], 
+        proof_type: Dict[str, Any], 
         context_data: Dict[str, Any],
         proof_number: int
-    ) -> Optional[Dict[str, Any]]:
-        """Gera prova visual para um conceito específico"""
+    ) -> str:
+        """Monta o prompt de IA da prova visual de um conceito"""
         
-        try:
-            segmento = context_data.get('segmento', 'negócios')
-            
-            # Seleciona tipo de prova mais adequado
-            proof_type = self._select_best_proof_type(concept, avatar_data)
-            
-            # Gera prova usando IA
-            prompt = f"""
+        segmento = context_data.get('segmento', 'negócios')
+        
+        return f"""
 Crie uma prova visual específica para o conceito: "{concept}"
 
 SEGMENTO: {segmento}
@@ -208,29 +212,33 @@ RETORNE APENAS JSON VÁLIDO:
 }}
 ```
 """
+    
+    def _proof_from_response(
+        self, 
+        response: Optional[str], 
+        concept: str, 
+        proof_type: Dict[str, Any], 
+        context_data: Dict[str, Any],
+        proof_number: int
+    ) -> Optional[Dict[str, Any]]:
+        """Converte a resposta da IA na prova visual (prova básica se a resposta for inválida)"""
+        
+        if response:
+            clean_response = response.strip()
+            if "```json" in clean_response:
+                start = clean_response.find("```json") + 7
+                end = clean_response.rfind("```")
+                clean_response = clean_response[start:end].strip()
             
-            response = ai_manager.generate_analysis(prompt, max_tokens=800)
-            
-            if response:
-                clean_response = response.strip()
-                if "```json" in clean_response:
-                    start = clean_response.find("```json") + 7
-                    end = clean_response.rfind("```")
-                    clean_response = clean_response[start:end].strip()
-                
-                try:
-                    proof = json.loads(clean_response)
-                    logger.info(f"✅ Prova visual {proof_number} gerada com IA")
-                    return proof
-                except json.JSONDecodeError:
-                    logger.warning(f"⚠️ IA retornou JSON inválido para prova {proof_number}")
-            
-            # Fallback para prova básica
-            return self._create_basic_proof(concept, proof_type, proof_number, context_data)
-            
-        except Exception as e:
-            logger.error(f"❌ Erro ao gerar prova visual: {str(e)}")
-            return self._create_basic_proof(concept, proof_type, proof_number, context_data)
+            try:
+                proof = json.loads(clean_response)
+                logger.info(f"✅ Prova visual {proof_number} gerada com IA")
+                return proof
+            except json.JSONDecodeError:
+                logger.warning(f"⚠️ IA retornou JSON inválido para prova {proof_number}")
+        
+        # Fallback para prova básica
+        return self._create_basic_proof(concept, proof_type, proof_number, context_data)
     
     def _select_best_proof_type(self, concept: str, avatar_data: Dict[str, Any]) -> Dict[str, Any]:
         """Seleciona melhor tipo de prova para o conceito"""
@@ -16,6 +16,8 @@ import re
 from datetime import datetime
 from bs4 import BeautifulSoup
 import random
+from services.http_fetcher import http_fetcher
+from services.rate_limiter import rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +45,8 @@ class WebSailorAgent:
             "Connection": "keep-alive",
             "Upgrade-Insecure-Requests": "1"
         }
+        # Raspagem dos buscadores passa pelo limite de taxa por host
+        self.session = rate_limiter.session(self.headers)
         
         # SEM CACHE - TUDO REAL!
         logger.info(f"WebSailor Agent REAL initialized - Enabled: {self.enabled}")
@@ -97,9 +101,6 @@ class WebSailorAgent:
                                     "source_type": "real_search",
                                     "search_engine": search_engine.__name__
                                 })
-                                
-                                # Delay para não sobrecarregar
-                                time.sleep(0.5)
                     
                 except Exception as e:
                     logger.warning(f"Erro em {search_engine.__name__}: {str(e)}")
@@ -123,7 +124,6 @@ class WebSailorAgent:
                                 "source_type": "internal_link",
                                 "parent_url": page["url"]
                             })
-                            time.sleep(0.3)
             
             # 3. PESQUISA DE QUERIES RELACIONADAS REAIS
             if aggressive_mode:
@@ -144,7 +144,6 @@ class WebSailorAgent:
                                     "source_type": "related_query",
                                     "original_query": related_query
                                 })
-                                time.sleep(0.4)
                     except Exception as e:
                         logger.warning(f"Erro em query relacionada '{related_query}': {str(e)}")
                         continue
@@ -224,11 +223,7 @@ class WebSailorAgent:
             # Bing search via scraping
             search_url = f"https://www.bing.com/search?q={quote_plus(query)}&cc=br&setlang=pt-br"
             
-            response = requests.get(
-                search_url,
-                headers=self.headers,
-                timeout=10
-            )
+            response = self.session.get(search_url, timeout=10)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -269,11 +264,7 @@ class WebSailorAgent:
         try:
             search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
             
-            response = requests.get(
-                search_url,
-                headers=self.headers,
-                timeout=10
-            )
+            response = self.session.get(search_url, timeout=10)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -311,11 +302,7 @@ class WebSailorAgent:
         try:
             search_url = f"https://br.search.yahoo.com/search?p={quote_plus(query)}"
             
-            response = requests.get(
-                search_url,
-                headers=self.headers,
-                timeout=10
-            )
+            response = self.session.get(search_url, timeout=10)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -380,11 +367,7 @@ class WebSailorAgent:
             
             jina_url = f"{self.jina_reader_url}{url}"
             
-            response = requests.get(
-                jina_url,
-                headers=headers,
-                timeout=30
-            )
+            response = http_fetcher.fetch(jina_url, headers=headers, timeout=30)
             
             if response.status_code == 200:
                 content = response.text
@@ -406,12 +389,7 @@ class WebSailorAgent:
         """Extração REAL direta usando requests + BeautifulSoup"""
         
         try:
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=20,
-                allow_redirects=True
-            )
+            response = http_fetcher.fetch(url, headers=self.headers, timeout=20)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
@@ -452,7 +430,7 @@ class WebSailorAgent:
         links = []
         try:
             # Faz nova requisição para obter HTML completo
-            response = requests.get(base_url, headers=self.headers, timeout=10)
+            response = http_fetcher.fetch(base_url, headers=self.headers, timeout=10)
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
                 base_domain = base_url.split('/')[2]
@@ -16,7 +16,8 @@ const UNIFIED_CONFIG = {
         searchUnified: '/api/unified/search_unified',
         uploadUnified: '/api/unified/upload_unified',
         resetSystem: '/api/unified/reset_system',
-        progress: '/api/progress'
+        progress: '/api/progress',
+        stream: '/api/stream'
     },
     polling: {
         interval: 2000,
@@ -195,6 +196,7 @@ function showUnifiedAnalysisProgress() {
                 <div id="unifiedProgressBar" style="background: linear-gradient(90deg, var(--accent-primary), var(--accent-secondary)); height: 100%; width: 0%; transition: width 0.5s;"></div>
             </div>
             <div id="unifiedProgressPercent" style="font-size: 14px; color: var(--text-muted);">0%</div>
+            <pre id="unifiedStreamPreview" style="display: none; max-width: 600px; max-height: 200px; overflow-y: auto; margin-top: 15px; text-align: left; white-space: pre-wrap; font-size: 12px; color: var(--text-secondary); background: var(--bg-surface); padding: 10px; border-radius: 8px;"></pre>
             <div style="margin-top: 20px; font-size: 12px; color: var(--text-muted);">
                 🔍 Exa Neural Search • 📄 PyMuPDF Pro • 🧠 Agentes Psicológicos • 🛡️ Sistema Ultra-Robusto
             </div>
@@ -211,6 +213,7 @@ function showUnifiedAnalysisProgress() {
     
     // Inicia polling de progresso
     startUnifiedProgressPolling();
+    startUnifiedTokenStream();
 }
 
 function hideUnifiedAnalysisProgress() {
@@ -219,6 +222,49 @@ function hideUnifiedAnalysisProgress() {
         progress.remove();
     }
     stopUnifiedProgressPolling();
+    stopUnifiedTokenStream();
+}
+
+let unifiedTokenStream = null;
+
+function startUnifiedTokenStream() {
+    if (unifiedTokenStream || !window.EventSource) return;
+    
+    const sessionId = getSessionId();
+    unifiedTokenStream = new EventSource(`${UNIFIED_CONFIG.endpoints.stream}/${sessionId}`);
+    
+    unifiedTokenStream.addEventListener('start', (event) => {
+        const previewEl = document.getElementById('unifiedStreamPreview');
+        const data = JSON.parse(event.data);
+        if (previewEl) {
+            previewEl.style.display = 'block';
+            previewEl.textContent = `▶ ${data.component}\n`;
+        }
+    });
+    
+    unifiedTokenStream.addEventListener('chunk', (event) => {
+        const previewEl = document.getElementById('unifiedStreamPreview');
+        const data = JSON.parse(event.data);
+        if (previewEl) {
+            previewEl.textContent += data.text;
+            previewEl.scrollTop = previewEl.scrollHeight;
+        }
+    });
+
+    // Seções JSON concluídas antes do fim da geração, para renderização antecipada
+    unifiedTokenStream.addEventListener('section', (event) => {
+        const data = JSON.parse(event.data);
+        document.dispatchEvent(new CustomEvent('unifiedSectionReady', { detail: data }));
+    });
+
+    unifiedTokenStream.addEventListener('close', stopUnifiedTokenStream);
+}
+
+function stopUnifiedTokenStream() {
+    if (unifiedTokenStream) {
+        unifiedTokenStream.close();
+        unifiedTokenStream = null;
+    }
 }
 
 let unifiedProgressPollingInterval = null;
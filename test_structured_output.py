@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Parser JSON Incremental
+Valida a detecção da raiz JSON em respostas com texto, cercas markdown e strings
+"""
+
+import os
+import sys
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.structured_output import IncrementalJSONParser
+
+
+def _feed_all(text, chunk_size=7):
+    """Alimenta o parser em trechos pequenos, como no streaming"""
+    parser = IncrementalJSONParser()
+    sections = []
+    for i in range(0, len(text), chunk_size):
+        sections.extend(parser.feed(text[i:i + chunk_size]))
+    return parser, sections
+
+
+def test_prosa_com_colchetes_antes_da_cerca():
+    """Colchetes na introdução não viram a raiz do JSON"""
+    text = 'Segue a análise [versão final]:\n```json\n{"avatar": {"nome": "Ana"}, "dores": ["tempo", "dinheiro"]}\n```'
+    parser, sections = _feed_all(text)
+    assert sections == [('avatar', {'nome': 'Ana'}), ('dores', ['tempo', 'dinheiro'])]
+    assert parser.done
+
+
+def test_raiz_candidata_invalida_e_descartada():
+    """Uma linha de prosa começando com colchete é descartada e a busca recomeça"""
+    text = '[nota do analista] dados de 2024\n{"mercado": "fitness", "tamanho": 10}'
+    parser, sections = _feed_all(text)
+    assert sections == [('mercado', 'fitness'), ('tamanho', 10)]
+    assert parser.done
+
+
+def test_strings_com_virgula_e_chave():
+    """Vírgulas e chaves dentro de strings não encerram seções"""
+    text = '```json\n{"frase": "isso, }não fecha", "lista": ["a,]", "b"], "n": 1}\n```'
+    parser, sections = _feed_all(text, chunk_size=3)
+    assert sections == [('frase', 'isso, }não fecha'), ('lista', ['a,]', 'b']), ('n', 1)]
+    assert parser.done
+
+
+def test_lista_raiz():
+    """Itens da lista raiz são emitidos com o índice"""
+    text = 'Resultado:\n[{"id": 1}, {"id": 2, "obs": "x, y"}]'
+    parser, sections = _feed_all(text)
+    assert sections == [(0, {'id': 1}), (1, {'id': 2, 'obs': 'x, y'})]
+    assert parser.done
+
+
+if __name__ == "__main__":
+    tests = [
+        test_prosa_com_colchetes_antes_da_cerca,
+        test_raiz_candidata_invalida_e_descartada,
+        test_strings_com_virgula_e_chave,
+        test_lista_raiz
+    ]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n🎉 {len(tests)} testes passaram")